@@ -14,97 +14,274 @@ import re
 import types
 import sys
 import csv
+import threading
+import Queue
+import sre_parse
+import sre_constants
 
 import tabulate
 
 import esbench
+import esbench.api
+import esbench.histogram
 
 
 logger = logging.getLogger(__name__)
 
 
-def _get_benchmarks(conn=None, stats_index_name=esbench.STATS_INDEX_NAME):
-    """Call the ES server for raw benchmark records."""
+# hits fetched per request; records are streamed, see esbench.api.search_hits()
+PAGE_SIZE = 100
+# observations are fetched for this many benchmarks at a time, with up to
+# FETCH_THREADS batches fetched concurrently, see _records()
+BATCH_SIZE = 10
+FETCH_THREADS = 4
+# most observations held in memory by all the batches being fetched, or
+# waiting to be read, together, see _Budget
+MAX_BUFFERED = 1000
 
-    path = "%s/bench/_search?sort=benchmark_start:asc&size=100" % (stats_index_name, )
-    resp = conn.get(path)
-    return resp
 
+def _get_benchmarks(conn=None, stats_index_name=esbench.STATS_INDEX_NAME, page_size=PAGE_SIZE):
+    """Call the ES server for raw benchmark records, yield them oldest first."""
 
-def _benchmarks(resp, benchmark_ids=None):
-    """Process response from _get_benchmarks(), yielding benchmark dicts."""
+    body = {'sort': [{'benchmark_start': 'asc'}]}
+    return esbench.api.search_hits(conn, stats_index_name, 'bench', body, size=page_size)
+
+
+def _select_benchmarks(benchmarks, benchmark_ids=None):
+    """Yield benchmarks (iterable of benchmark records) selected by ids.
+
+    Ids can be benchmark ids, 'all', 'first', 'last', or list indexes. A
+    single id which is a benchmark id or 'all' is matched as the records
+    are read; other selections need all the records first.
+    """
 
     if not benchmark_ids:
         benchmark_ids = ['all']
 
-    data = json.loads(resp.data)
-
-    try:
+    if len(benchmark_ids) > 1 or _positional(benchmark_ids[0]):
+        benchmarks = list(benchmarks)
 
-        benchmarks = data['hits']['hits']
-        for benchmark_id in benchmark_ids:
+    for benchmark_id in benchmark_ids:
 
-            if benchmark_id == 'first':
+        if benchmark_id == 'first':
+            if benchmarks:
                 yield benchmarks[0]
-                continue
+            continue
 
-            if benchmark_id == 'last':
+        if benchmark_id == 'last':
+            if benchmarks:
                 yield benchmarks[-1]
-                continue
+            continue
 
-            try:
-                yield benchmarks[int(benchmark_id)]
-                continue
-            except (ValueError, IndexError) as exc:
-#                 logger.info(exc)
-                pass
+        try:
+            yield benchmarks[int(benchmark_id)]
+            continue
+        except (ValueError, IndexError) as exc:
+#             logger.info(exc)
+            pass
 
-            for benchmark in benchmarks:
-                if (benchmark_id == 'all') or (benchmark_id == benchmark['_id']):
-                    yield benchmark
+        for benchmark in benchmarks:
+            if (benchmark_id == 'all') or (benchmark_id == benchmark['_id']):
+                yield benchmark
 
-    except KeyError:
-        logger.warning("no benchmarks found", exc_info=False)
 
-    return
+def _positional(benchmark_id):
+
+    if benchmark_id in ('first', 'last'):
+        return True
+    try:
+        int(benchmark_id)
+        return True
+    except ValueError:
+        return False
+
+
+def _get_observations(conn=None, benchmark_ids=None, stats_index_name=esbench.STATS_INDEX_NAME, page_size=PAGE_SIZE):
+    """Call the ES server for raw observation records of the benchmarks,
+    yield them by benchmark id, each benchmark's oldest first, with one
+    (paged) search for all the ids."""
+
+    if not benchmark_ids:
+        raise ValueError("invalid 'benchmark_ids'")
+
+    body = {
+        'query': {'filtered': {
+            'query': {'match_all': {}},
+            'filter': {'terms': {'meta.benchmark_id': list(benchmark_ids)}},
+        }},
+        'sort': [{'meta.benchmark_id': 'asc'}, {'meta.observation_start': 'asc'}],
+    }
+    return esbench.api.search_hits(conn, stats_index_name, 'obs', body, size=page_size)
+
+
+class _Budget(object):
+    """Counts the observations held in memory by the batches in flight.
+
+    Shared by all the batches fetched for one _records() call, so that
+    together they hold no more than 'limit' observations.
+    """
+
+    def __init__(self, limit):
 
+        self.limit = limit
+        self.used = 0
+        self._lock = threading.Lock()
 
-def _get_observations(conn=None, benchmark_id=None, stats_index_name=esbench.STATS_INDEX_NAME):
-    """Call the ES server for raw observation records."""
 
-    if not benchmark_id:
-        raise ValueError("invalid 'benchmark_id'")
+    def take(self):
+        """Return True if one more observation can be held."""
 
-    path = "%s/obs/_search?q=meta.benchmark_id:%s&sort=meta.observation_start:asc&size=10000" % (stats_index_name, benchmark_id, )
-    resp = conn.get(path)
-    return resp
+        with self._lock:
+            if self.used >= self.limit:
+                return False
+            self.used += 1
+            return True
 
 
-def _observations(resp):
-    """Process response from _get_observations(), yielding observation dicts."""
+    def release(self, n):
 
-    data = json.loads(resp.data)
-    for observation in data['hits']['hits']:
-        yield observation
+        with self._lock:
+            self.used -= n
 
 
-def get_data(conn=None, benchmark_ids=None):
+def _fetch_observations(conn, benchmarks, stats_index_name=esbench.STATS_INDEX_NAME, budget=None):
+    """Return [(benchmark, observations)] for a batch of benchmark records.
+
+    Observations are grouped by benchmark client side, so the batch is held
+    in memory, but only as many observations as the _Budget (by default
+    one of MAX_BUFFERED) allows: past that the search is dropped, and the
+    benchmarks whose observations weren't all read get None instead, to be
+    read on their own. The observations come sorted by benchmark id, so
+    those are the benchmark being read and the ones after it. Release the
+    observations held from the budget once done with them. Uses its own
+    connection, so that batches can be fetched concurrently.
+    """
+
+    budget = budget or _Budget(MAX_BUFFERED)
+    conn = conn.clone()
+    try:
+        grouped = collections.defaultdict(list)
+        truncated = None
+        hits = _get_observations(conn=conn, benchmark_ids=sorted(set([b['_id'] for b in benchmarks])), stats_index_name=stats_index_name)
+        for observation in hits:
+            if not budget.take():
+                truncated = observation['_source']['meta']['benchmark_id']
+                hits.close()
+                break
+            grouped[observation['_source']['meta']['benchmark_id']].append(observation)
+        if truncated is not None:
+            # those of the benchmark being read are dropped
+            budget.release(len(grouped.pop(truncated, [])))
+            logger.debug("more than %i observations buffered, streaming those of benchmarks from %s on", budget.limit, truncated)
+        return [
+            (benchmark, None if truncated is not None and benchmark['_id'] >= truncated else grouped.get(benchmark['_id'], []))
+            for benchmark in benchmarks
+        ]
+    finally:
+        conn.close()
+
+
+def _batches(items, size):
+    """Yield lists of up to 'size' items."""
+
+    items = iter(items)
+    while True:
+        batch = list(itertools.islice(items, size))
+        if not batch:
+            return
+        yield batch
+
+
+def _prefetch(f, items, threads=FETCH_THREADS):
+    """Yield f(item) for each item, in order.
+
+    Up to 'threads' calls run ahead of the consumer, each in its own
+    thread, so that round trips overlap; exceptions are re-raised when
+    the result is due. With 'threads' of 1 the calls are made in turn.
+    """
+
+    if threads <= 1:
+        for item in items:
+            yield f(item)
+        return
+
+    def _start(item):
+        result = Queue.Queue(maxsize=1)
+        def _run():
+            try:
+                result.put((True, f(item)))
+            except Exception as exc:
+                result.put((False, exc))
+        thread = threading.Thread(target=_run)
+        thread.daemon = True
+        thread.start()
+        return result
+
+    items = iter(items)
+    pending = collections.deque([_start(item) for item in itertools.islice(items, threads)])
+    while pending:
+        ok, value = pending.popleft().get()
+        for item in itertools.islice(items, 1):
+            pending.append(_start(item))
+        if not ok:
+            raise value
+        yield value
+
+
+def _records(conn=None, benchmark_ids=None, sink=None, stats_index_name=esbench.STATS_INDEX_NAME):
+    """Yield (benchmark, observations) raw records.
+
+    Records are read from the sink (see esbench.sink) if one is given, else
+    from the stats index on the ES server connected to with 'conn'.
+    """
+
+    if sink is not None:
+        # the observations of all the selected benchmarks are read in one
+        # go, rather than with a read (of the whole file) per benchmark
+        benchmarks = list(_select_benchmarks(sink.benchmarks(), benchmark_ids=benchmark_ids))
+        observations = sink.observations_many(set([b['_id'] for b in benchmarks]))
+        for benchmark in benchmarks:
+            yield benchmark, observations[benchmark['_id']]
+        return
+
+    # rather than one search per benchmark, observations are fetched for
+    # BATCH_SIZE benchmarks at a time, with FETCH_THREADS batches in flight
+    benchmarks = _select_benchmarks(_get_benchmarks(conn=conn, stats_index_name=stats_index_name), benchmark_ids=benchmark_ids)
+    budget = _Budget(MAX_BUFFERED)
+    fetch_f = lambda batch: _fetch_observations(conn, batch, stats_index_name=stats_index_name, budget=budget)
+    for records in _prefetch(fetch_f, _batches(benchmarks, BATCH_SIZE)):
+        for benchmark, observations in records:
+            if observations is None:
+                # too many to buffer with the batch, read as they are yielded
+                observations = _get_observations(conn=conn, benchmark_ids=[benchmark['_id']], stats_index_name=stats_index_name)
+            yield benchmark, observations
+        budget.release(sum([len(o) for _, o in records if o is not None]))
+
+
+def get_data(conn=None, benchmark_ids=None, sink=None):
     """Get benchmark and observation data.
 
     Args:
         conn: instance of esbench.api.Conn
         benchmark_ids: list of str, ids of benchmarks to be included, default
             None. When None, include all benchmarks.
+        sink: if set, read data from this esbench.sink sink instead of
+            the ES server connected to with 'conn'
 
     Yields:
         For each observation associated with included benchmark a dict where
         top level keys are 'benchmark' and 'observation', containing pertinent
         data. Effectively, data is denormalized, with the 'benchmark' element
-        being the same for all observations for that benchmark.
+        being the same for all observations for that benchmark. Observations
+        are read from the server for batches of benchmarks, and up to
+        MAX_BUFFERED of them are held by all the batches being read
+        together; those of benchmarks which don't fit are read a page at a
+        time, as they are yielded. So memory use is bounded, whatever the
+        number of observations. Sinks other than ES are read in one go.
     """
 
-    for benchmark in _benchmarks(_get_benchmarks(conn=conn), benchmark_ids=benchmark_ids):
-        for observation in _observations(_get_observations(conn=conn, benchmark_id=benchmark['_id'])):
+    for benchmark, observations in _records(conn=conn, benchmark_ids=benchmark_ids, sink=sink):
+        for observation in observations:
             data = {
                 "benchmark": benchmark['_source'],
                 "observation": observation['_source'],
@@ -180,28 +357,230 @@ def flatten_container(container=None):
     return flat
 
 
-def group_observations(data=None, fields=None):
+_SCALARS = (str, unicode, int, long, float, bool, types.NoneType)
 
-    # returns a list of observations, where each observation is a list of
-    # (fieldname, value) tuples
-    data_flattened = [flatten_container(d) for d in data]
+# stands for any character in a FieldTrie
+_ANY = None
+# alternatives expanded when compiling a FieldTrie, past that no pruning
+_MAX_ALTERNATIVES = 256
 
-    # filter out tuples in each observation according to pattern.
-    data_filtered = [filter_tuples(tuples=t, pattern=fields) for t in data_flattened]
 
-    # sort observations based on their benchmark_id and observation_sequence_no
-    def sort_f(d):
-        _d = dict(d)
-        return (_d['observation.meta.benchmark_id'], _d['observation.meta.observation_sequence_no'])
-    data_sorted = sorted(data_filtered, key=sort_f)
+def _prefixes(items):
+    """Return [(chars, complete)] fixed width prefixes of parsed regex items.
+
+    'chars' is a tuple of lower case characters (_ANY for any character),
+    one for each alternative the items can match; 'complete' is True if the
+    alternative is nothing but that fixed width sequence. Returns None when
+    there are more than _MAX_ALTERNATIVES alternatives.
+    """
+
+    states = [((), True)]
+    for op, av in items:
+        if not any([complete for _, complete in states]):
+            break
+        if op == sre_constants.LITERAL:
+            alternatives = [((unichr(av).lower(), ), True)]
+        elif op in (sre_constants.ANY, sre_constants.IN):
+            alternatives = [((_ANY, ), True)]
+        elif op == sre_constants.SUBPATTERN:
+            alternatives = _prefixes(av[1])
+        elif op == sre_constants.BRANCH:
+            alternatives = []
+            for branch in av[1]:
+                expanded = _prefixes(branch)
+                if expanded is None:
+                    return None
+                alternatives.extend(expanded)
+        elif op in (sre_constants.ASSERT, sre_constants.ASSERT_NOT, sre_constants.AT):
+            # zero width; matching more than the pattern does is safe
+            alternatives = [((), True)]
+        else:
+            alternatives = [((), False)]
+        if alternatives is None:
+            return None
+        states = [
+            (chars + more, more_complete) if complete else (chars, complete)
+            for chars, complete in states
+            for more, more_complete in (alternatives if complete else [((), False)])
+        ]
+        if len(states) > _MAX_ALTERNATIVES:
+            return None
+    return states
+
+
+def _fixed(items):
+    """Return True if parsed regex items are only literals and '.'.
+
+    Groups and alternatives of those are fine too. Anything else (sets,
+    anchors, lookarounds, repeats) makes _prefixes() approximate, which is
+    safe for what can match, but not for what is excluded.
+    """
+
+    for op, av in items:
+        if op in (sre_constants.LITERAL, sre_constants.ANY):
+            continue
+        elif op == sre_constants.SUBPATTERN:
+            if not _fixed(av[1]):
+                return False
+        elif op == sre_constants.BRANCH:
+            if not all([_fixed(branch) for branch in av[1]]):
+                return False
+        else:
+            return False
+    return True
+
+
+class FieldTrie(object):
+    """'--fields' regex compiled into a trie of the field paths it can match.
+
+    The trie holds, character by character, the fixed width beginning of
+    each alternative of the pattern (like 'observation.stats.search.groups.'
+    in '(observation.stats.search.groups.*client_latency)|(...)'). Whatever
+    follows can't be told without the regex, so prune() is conservative:
+    it is True only when no path starting with the given prefix can match.
+    A negative lookahead at the start of the pattern, like
+    '(?!observation.segments.segments)', excludes whole subtrees too, if it
+    is made of nothing but literal characters and '.'.
+    """
+
+    def __init__(self, pattern=".*"):
+
+        self.root = {}
+        self.exclusions = []
+        parsed = list(sre_parse.parse(pattern, re.IGNORECASE))
+        if parsed and parsed[0][0] == sre_constants.ASSERT_NOT and parsed[0][1][0] == 1 and _fixed(parsed[0][1][1]):
+            excluded = _prefixes(parsed[0][1][1]) or []
+            if all([complete for _, complete in excluded]):
+                self.exclusions = [chars for chars, _ in excluded if chars]
+        prefixes = _prefixes(parsed)
+        for chars, _ in (prefixes if prefixes is not None else [((), False)]):
+            node = self.root
+            for c in chars:
+                node = node.setdefault(c, {})
+            node['open'] = True
+
+
+    def _excluded(self, path):
+
+        for chars in self.exclusions:
+            if len(path) >= len(chars) and all([c is _ANY or c == p for c, p in zip(chars, path)]):
+                return True
+        return False
+
+
+    def prune(self, path):
+        """Return True if neither 'path' nor any path under it can match."""
+
+        path = path.lower()
+        if self._excluded(path):
+            return True
+        nodes = [self.root]
+        for p in path:
+            if any(['open' in node for node in nodes]):
+                return False
+            nodes = [n for node in nodes for n in (node.get(p), node.get(_ANY)) if n is not None]
+            if not nodes:
+                return True
+        return False
+
+
+class Flattener(object):
+    """Flattens observations, keeping only the fields matching 'pattern'.
+
+    Does what filter_tuples(flatten_container(...)) does, but faster: the
+    pattern is compiled into a FieldTrie, and subtrees which can't hold any
+    of the fields (like per node cluster stats) are not traversed. Match
+    results are cached by path, and the sorted columns by observation
+    'shape' (the fields found, in the order found), so observations shaped
+    like ones seen before are flattened without any regex matching or
+    sorting. Use one Flattener for all the observations to be displayed.
+    """
+
+    MAX_CACHED = 100000 # entries in each of the caches
+
+    def __init__(self, pattern=".*"):
+
+        self.regex = re.compile(pattern, re.IGNORECASE)
+        self.trie = FieldTrie(pattern)
+        self._match = {}
+        self._prune = {}
+        self._schemas = {}
+
+
+    def _cached(self, cache, f, key):
+
+        try:
+            return cache[key]
+        except KeyError:
+            if len(cache) >= self.MAX_CACHED:
+                cache.clear()
+            value = cache[key] = f(key)
+            return value
+
+
+    def _walk(self, container, prefix, paths, values):
+
+        if type(container) in _SCALARS:
+            if self._cached(self._match, lambda p: bool(self.regex.match(p)), prefix):
+                paths.append(prefix)
+                values.append(container)
+
+        elif type(container) is dict:
+            for key in container:
+                path = ("%s.%s" % (prefix, key)) if prefix else key
+                if not self._cached(self._prune, self.trie.prune, path):
+                    self._walk(container[key], path, paths, values)
+
+        elif type(container) in [list, set, tuple]:
+            for n, v in enumerate(container):
+                path = ("%s.%i" % (prefix, n)) if prefix else str(n)
+                if not self._cached(self._prune, self.trie.prune, path):
+                    self._walk(v, path, paths, values)
+
+        else:
+            raise ValueError("cannot process element: %s" % container)
+
+
+    def flatten(self, container):
+        """Return sorted list of (name, value) tuples, see flatten_container()."""
+
+        paths = []
+        values = []
+        self._walk(container, None, paths, values)
+        shape = tuple(paths)
+        schema = self._schemas.get(shape)
+        if schema is None:
+            order = sorted(range(len(paths)), key=lambda i: paths[i])
+            schema = ([paths[i] for i in order], order)
+            if len(self._schemas) >= self.MAX_CACHED:
+                self._schemas.clear()
+            self._schemas[shape] = schema
+        columns, order = schema
+        return zip(columns, [values[i] for i in order])
+
+
+def group_observations(data=None, fields=None):
+
+    flattener = Flattener(fields)
+
+    # each observation is a list of (fieldname, value) tuples, with the
+    # fields matching 'fields'; 'data' can be a generator. Observations are
+    # sorted on their benchmark_id and observation_sequence_no, benchmarks
+    # on the time they started; the sort keys are taken once, from the
+    # observation records
+    rows = []
+    for d in data:
+        meta = d['observation']['meta']
+        rows.append(((meta['benchmark_id'], meta['observation_sequence_no']), d['benchmark']['meta']['benchmark_start'], flattener.flatten(d)))
+    rows.sort(key=lambda row: row[0])
 
     # group observations into a list of benchmarks, where each benchmark is a
     # list of observations, where each observation is [see comments above]
-    groups = [list(benchmark_obs) for benchmark_id, benchmark_obs in itertools.groupby(data_sorted, lambda x: dict(x)['observation.meta.benchmark_id'])]
+    groups = [list(benchmark_rows) for _, benchmark_rows in itertools.groupby(rows, lambda row: row[0][0])]
     # sort benchmark groups on timestamp benchmark started
-    groups_sorted = sorted(groups, key=lambda x: dict(x[0])['benchmark.meta.benchmark_start'])
+    groups.sort(key=lambda benchmark_rows: benchmark_rows[0][1])
 
-    return groups_sorted
+    return [[row[2] for row in benchmark_rows] for benchmark_rows in groups]
 
 
 FIELDS = (
@@ -218,7 +597,9 @@ FIELDS = (
             "(observation.stats.store.size_in_bytes)|"
             "(observation.stats.fielddata.memory_size_in_bytes)|"
 #             "(observation.stats.search.groups.*query_time_in_millis$)"
-            "(observation.stats.search.groups.*query_time_in_millis_per_query$)"
+            "(observation.stats.search.groups.*query_time_in_millis_per_query$)|"
+            "(observation.stats.search.groups.*client_latency.p(50|99|99_9)_in_millis$)|"
+            "(observation.stats.search.groups.*client_traversal.docs_per_second$)"
         ")"
 
 )
@@ -246,25 +627,86 @@ def output_benchmark(fh=None, fmt=None, observations=None):
         raise ValueError("unknown output format: %s" % fmt)
 
 
-def show_benchmarks(conn=None, benchmark_ids=None, fields=None, fmt=None, fh=None):
+def merge_histograms(data=None):
+    """Merge client latency histograms of observations.
+
+    Each observation records, for each query, a serialized histogram of
+    request latencies ('client_latency.histogram' in the query's stats
+    group). Histograms are mergeable, so latency percentiles can be computed
+    over any set of observations, not just over a single one.
+
+    Args:
+        data: iterable of dicts, as yielded by get_data()
+
+    Returns:
+        dict of dicts, {benchmark_id: {query_name: Histogram}}, where each
+        histogram holds the latencies of all executions of the query in all
+        observations of the benchmark. Observations recorded before
+        histograms were introduced are skipped.
+
+    """
+
+    merged = collections.defaultdict(dict)
+    for d in data:
+        benchmark_id = d['observation']['meta']['benchmark_id']
+        for name, group in d['observation']['stats']['search']['groups'].items():
+            try:
+                h = esbench.histogram.Histogram.loads(group['client_latency']['histogram'])
+            except (KeyError, TypeError):
+                continue
+            if name in merged[benchmark_id]:
+                merged[benchmark_id][name].merge(h)
+            else:
+                merged[benchmark_id][name] = h
+    return dict(merged)
+
+
+def output_latency(fh=None, fmt=None, benchmark_id=None, histograms=None):
+
+    keys = ['benchmark_id', 'query', 'count', 'mean_in_millis', 'p50_in_millis', 'p90_in_millis', 'p99_in_millis', 'p99_9_in_millis', 'max_in_millis']
+    values = []
+    for name in sorted(histograms):
+        stats = histograms[name].stats()
+        stats.update({'benchmark_id': benchmark_id, 'query': name})
+        values.append([stats[k] for k in keys])
+    output_benchmark(fh=fh, fmt=fmt, observations=[zip(keys, v) for v in values])
+
+
+def show_benchmarks(conn=None, benchmark_ids=None, fields=None, fmt=None, fh=None, latency=False, sink=None, cache=None):
+
+    if cache is not None and not latency:
+        # observations are stored flattened in the cache, only the columns
+        # matching 'fields' are read
+        for benchmark in _select_benchmarks(cache.benchmarks(), benchmark_ids=benchmark_ids):
+            observations = cache.table(benchmark['_id']).select(fields)
+            if observations:
+                output_benchmark(fh=fh, fmt=fmt, observations=observations)
+        return
+
+    data = get_data(conn=conn, benchmark_ids=benchmark_ids, sink=cache if cache is not None else sink)
+
+    if latency:
+        for benchmark_id, histograms in merge_histograms(data=data).items():
+            if histograms:
+                output_latency(fh=fh, fmt=fmt, benchmark_id=benchmark_id, histograms=histograms)
+        return
 
-    data = list(get_data(conn=conn, benchmark_ids=benchmark_ids))
     benchmarks = group_observations(data=data, fields=fields)
 
     for b in benchmarks:
         output_benchmark(fh=fh, fmt=fmt, observations=b)
 
 
-def dump_benchmarks(conn=None, benchmark_ids=None, stats_index_name=esbench.STATS_INDEX_NAME):
+def dump_benchmarks(conn=None, benchmark_ids=None, stats_index_name=esbench.STATS_INDEX_NAME, sink=None):
     """Dump benchmark data as a sequence of curl calls.
 
     You can save these calls to a file, and then replay them somewhere else.
     """
 
-    for benchmark in _benchmarks(_get_benchmarks(conn=conn, stats_index_name=stats_index_name), benchmark_ids):
+    for benchmark, observations in _records(conn=conn, benchmark_ids=benchmark_ids, sink=sink, stats_index_name=stats_index_name):
         curl = """curl -XPUT 'http://localhost:9200/%s/bench/%s' -d '%s'""" % (stats_index_name, benchmark['_id'], json.dumps(benchmark['_source']))
         print(curl)
-        for o in _observations(_get_observations(conn, benchmark['_id'], stats_index_name=stats_index_name)):
+        for o in observations:
             curl = """curl -XPUT 'http://localhost:9200/%s/obs/%s' -d '%s'""" % (stats_index_name, o['_id'], json.dumps(o['_source']))
             print(curl)
     return
@@ -277,8 +719,8 @@ def delete_benchmarks(conn=None, benchmark_ids=None, stats_index_name=esbench.ST
         logger.info(resp.curl)
 
     else:
-        for benchmark in _benchmarks(_get_benchmarks(conn, stats_index_name=stats_index_name), benchmark_ids=benchmark_ids):
-            for observation in _observations(_get_observations(conn, benchmark_id=benchmark['_id'], stats_index_name=stats_index_name)):
+        for benchmark, observations in _records(conn=conn, benchmark_ids=benchmark_ids, stats_index_name=stats_index_name):
+            for observation in observations:
                 path = "%s/obs/%s" % (stats_index_name, observation['_id'], )
                 resp = conn.delete(path)
                 logger.info(resp.curl)
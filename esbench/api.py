@@ -22,6 +22,10 @@ ApiResponse = collections.namedtuple(
     'ApiResponse', ['status', 'reason', 'data', 'curl']
 )
 
+SearchSummary = collections.namedtuple(
+    'SearchSummary', ['took', 'timed_out', 'shards_failed', 'hits_total']
+)
+
 
 def retry_and_reconnect_on_IOError(method):
     def wrapper(self, *args, **kwargs):
@@ -66,6 +70,14 @@ class Conn(object):
         if self.conn: self.conn.close()
         self.conn = None
 
+    def clone(self):
+        """Return a new (not connected) Conn to the same host.
+
+        Conn objects are not thread safe, so each thread issuing requests
+        needs its own.
+        """
+        return Conn(host=self.host, port=self.port, timeout=self.timeout, conn_cls=self.conn_cls)
+
 
     @retry_and_reconnect_on_IOError
     def get(self, path, data=None):
@@ -162,6 +174,142 @@ def connect(host='localhost', port=9200, timeout=DEFAULT_TIMEOUT, conn_cls=httpl
 #     return resp
 
 
+# ES puts these at the very beginning of the search response, before the
+# hits, facets, and aggregations, so there is no need to look further
+_SEARCH_SUMMARY_PREFIX = 512
+_SEARCH_SUMMARY_RES = [re.compile(r) for r in [
+    r'"took"\s*:\s*(\d+)',
+    r'"timed_out"\s*:\s*(true|false)',
+    r'"_shards"\s*:\s*\{[^}]*"failed"\s*:\s*(\d+)',
+    r'"hits"\s*:\s*\{\s*"total"\s*:\s*(\d+)',
+]]
+
+def search_summary(data):
+    """Extract summary stats from raw search response data.
+
+    Returns SearchSummary with 'took', 'timed_out', 'shards_failed' (the
+    '_shards.failed' value), and 'hits_total', without decoding the whole
+    (possibly large) response. When the values can't be found in the
+    beginning of the response (for example when there are shard failures
+    listed), the response is decoded in full. Returns None when the data is
+    not a search response.
+
+    """
+
+    if not data:
+        return None
+    prefix = data[:_SEARCH_SUMMARY_PREFIX]
+    matches = [r.search(prefix) for r in _SEARCH_SUMMARY_RES]
+    if all(matches):
+        took, timed_out, failed, total = [m.group(1) for m in matches]
+        return SearchSummary(int(took), timed_out == 'true', int(failed), int(total))
+
+    try:
+        d = json.loads(data)
+        return SearchSummary(d['took'], d['timed_out'], d['_shards']['failed'], d['hits']['total'])
+    except (ValueError, KeyError, TypeError):
+        return None
+
+
+def msearch(conn, index, doctype, bodies):
+    """Execute search bodies (json strings) with one _msearch request.
+
+    The bodies must not contain newlines (json.dumps() output doesn't).
+    Responses to individual searches are in the 'responses' list of the
+    response data, in order, see msearch_summaries().
+
+    """
+
+    path = '%s/%s/_msearch' % (index, doctype)
+    data = "".join(["{}\n%s\n" % body for body in bodies])
+    resp = conn.post(path, data)
+    return resp
+
+
+def msearch_summaries(data):
+    """Split raw _msearch response data into per-search summaries.
+
+    Returns list of SearchSummary, one for each search in the request, with
+    None in place of searches which failed (the 'error' items), or None
+    when the data is not an _msearch response.
+
+    """
+
+    try:
+        responses = json.loads(data)['responses']
+    except (ValueError, KeyError, TypeError):
+        return None
+
+    summaries = []
+    for d in responses:
+        try:
+            summaries.append(SearchSummary(d['took'], d['timed_out'], d['_shards']['failed'], d['hits']['total']))
+        except (KeyError, TypeError):
+            summaries.append(None)
+    return summaries
+
+
+def scroll_start(conn, index, doctype, body, scroll='1m', scan=True):
+    """Start a scroll, with 'scan' search type unless scan is False.
+
+    With 'scan', the first response has no hits, only the '_scroll_id', and
+    the 'size' in the body is per shard.
+    """
+
+    search_type = "search_type=scan&" if scan else ""
+    path = '%s/%s/_search?%sscroll=%s' % (index, doctype, search_type, scroll)
+    resp = conn.post(path, body)
+    return resp
+
+
+def scroll_next(conn, scroll_id, scroll='1m'):
+    path = '_search/scroll?scroll=%s' % (scroll, )
+    resp = conn.get(path, scroll_id)
+    return resp
+
+
+def scroll_clear(conn, scroll_id):
+    path = '_search/scroll/%s' % (scroll_id, )
+    resp = conn.delete(path)
+    return resp
+
+
+def search_hits(conn, index, doctype, body, size=500, scroll='1m'):
+    """Yield all hits of a search, fetched page by page with the scroll api.
+
+    Unlike a single search with a large 'size', nothing is cut off, and only
+    one page of 'size' hits is held in memory at a time. 'body' is a dict;
+    the search is not a 'scan', so its 'sort' is kept. If a response isn't
+    a page of hits (for example the index doesn't exist), a warning is
+    logged and no more hits are yielded. The scroll is cleared when done, or
+    when the generator is closed.
+    """
+
+    body = dict(body, size=size)
+    resp = scroll_start(conn, index, doctype, json.dumps(body, sort_keys=True), scroll, scan=False)
+    scroll_id = None
+    seen = 0
+    try:
+        while True:
+            try:
+                data = json.loads(resp.data)
+                hits = data['hits']['hits']
+                total = data['hits']['total']
+            except (TypeError, ValueError, KeyError):
+                logger.warning("no hits in search response: %s", resp.data)
+                return
+            scroll_id = data.get('_scroll_id', scroll_id)
+            for hit in hits:
+                yield hit
+            seen += len(hits)
+            if not hits or seen >= total or not scroll_id:
+                return
+            resp = scroll_next(conn, scroll_id, scroll)
+    finally:
+        if scroll_id:
+            scroll_clear(conn, scroll_id)
+
+
 def document_post(conn, index, doctype, data):
     path = '%s/%s' % (index, doctype)
     resp = conn.post(path, data)
@@ -185,6 +333,12 @@ def index_get_stats(conn, index, groups):
     return resp
 
 
+def index_count(conn, index):
+    path = "%s/_count" % (index, )
+    resp = conn.get(path)
+    return resp
+
+
 def index_set_refresh_interval(conn, index, ri):
     path = "%s/_settings" % (index, )
     data = '{"index": {"refresh_interval": "%s"}}' % ri
@@ -192,11 +346,59 @@ def index_set_refresh_interval(conn, index, ri):
     return resp
 
 
-def index_optimize(conn, index, nseg=0):
+def index_put_settings(conn, index, settings):
+    """Update dynamic index settings, 'settings' is a dict."""
+
+    path = "%s/_settings" % (index, )
+    data = json.dumps({"index": settings}, sort_keys=True)
+    resp = conn.put(path, data)
+    return resp
+
+
+def index_clear_cache(conn, index):
+    """Clear the index's filter, fielddata, and other caches."""
+
+    path = "%s/_cache/clear" % (index, )
+    resp = conn.post(path, None)
+    return resp
+
+
+def index_refresh(conn, index):
+    path = "%s/_refresh" % (index, )
+    resp = conn.post(path, None)
+    return resp
+
+
+def reindex(conn, source, dest):
+    """Copy documents from source to dest index, server side.
+
+    Needs the _reindex api (ES 2.3+); on older clusters the request fails
+    with status >= 400, see esbench.sweep.copy_index().
+    """
+
+    path = "_reindex?refresh=true"
+    data = json.dumps({"source": {"index": source}, "dest": {"index": dest}}, sort_keys=True)
+    resp = conn.post(path, data)
+    return resp
+
+
+def bulk(conn, data):
+    """Execute bulk request, 'data' is newline delimited actions / sources."""
+
+    path = "_bulk"
+    resp = conn.post(path, data)
+    return resp
+
+
+def index_optimize(conn, index, nseg=0, wait_for_merge=True):
+    """Optimize index; with wait_for_merge False, return without waiting
+    for the merges to finish (see esbench.optimize)."""
+
+    wait = "true" if wait_for_merge else "false"
     if nseg:
-        path = "%s/_optimize?max_num_segments=%i&refresh=true&flush=true&wait_for_merge=true" % (index, nseg)
+        path = "%s/_optimize?max_num_segments=%i&refresh=true&flush=true&wait_for_merge=%s" % (index, nseg, wait)
     else:
-        path = "%s/_optimize?refresh=true&flush=true&wait_for_merge=true" % (index, )
+        path = "%s/_optimize?refresh=true&flush=true&wait_for_merge=%s" % (index, wait)
     resp = conn.post(path, None)
     return resp
 
@@ -14,12 +14,17 @@ index ('esbench_stats') as doctypes 'obs' and 'bench'.
 Classes:
 
     - SearchQuery: per-observation query wrapper
+    - ScrollQuery, PaginateQuery: queries traversing the whole result set
+    - MultiSearch: batch of queries executed with one _msearch request
     - Observation: repeated n-times constitutes a benchmark
+    - QueryWorker: runs queries in the background while data is loaded
     - Benchmark: orchestrates data loading and observations
 
 """
 
 
+import os
+import sys
 import logging
 import json
 import time
@@ -27,13 +32,36 @@ import random
 import datetime
 import hashlib
 import string
+import threading
+import Queue
+import itertools
+import subprocess
 
 import esbench.api
 import esbench.data
+import esbench.histogram
+import esbench.template
+import esbench.sampler
+import esbench.monitor
+import esbench.optimize
+import esbench.checkpoint
+import esbench.replay
+import esbench.sink
 
 
 logger = logging.getLogger(__name__)
 
+# written to by drop_os_cache(), linux only
+DROP_CACHES_PATH = '/proc/sys/vm/drop_caches'
+
+# bounds for adaptive repetition, see Observation._adaptive()
+ADAPTIVE_MIN_REPS = 10
+ADAPTIVE_MAX_REPS = 10000
+ADAPTIVE_CHECK_EVERY = 10
+
+# most query executions rendered ahead of a run, see Observation._render_ahead()
+MAX_RENDERED_AHEAD = 10000
+
 
 def uuid():
     return hashlib.md5("%s%f" % (str(time.time()), random.random())).hexdigest()[:8]
@@ -41,11 +69,31 @@ def uuid():
 
 # timeit.timeit('rands(6)', setup='from __main__ import rands', number=1000)
 def rands(length=6):
-    l = len(string.ascii_letters)-1
-    s = "".join((string.ascii_letters[random.randint(0, l)] for _ in range(length)))
+    l = len(string.ascii_letters)
+    s = "".join([string.ascii_letters[int(random.random() * l)] for _ in range(length)])
     return s
 
 
+def _sync():
+    return subprocess.call(['sync'])
+
+
+def drop_os_cache(path=DROP_CACHES_PATH, sync_f=_sync):
+    """Drop the OS page cache (linux, needs root), return True if dropped.
+
+    This only affects ES if it runs on the same host as esbench.
+    """
+
+    try:
+        sync_f()
+        with open(path, 'w') as f:
+            f.write('3\n')
+        return True
+    except (IOError, OSError) as exc:
+        logger.warning("couldn't drop OS page cache: %s", exc)
+        return False
+
+
 def timestamp(microseconds=False):
     DEFAULT_DATETIME_FORMAT = r'%Y-%m-%dT%H:%M:%SZ'
     DEFAULT_DATETIME_FORMAT_WITH_MICROSECONDS = r'%Y-%m-%dT%H:%M:%S.%fZ'
@@ -65,8 +113,16 @@ class SearchQuery(object):
     query execution stats with the 'stats group' unique to this particular
     observation.
 
-    In addition, the execute() method will do basic templating, replacing the
-    'variable' element in query template with a random string.
+    A query may carry esbench-specific per-query settings under the
+    'esbench' key (for example {"esbench": {"warmup": 10}, "query": ...});
+    these are available as 'options', and are not sent to ES.
+
+    In addition, the execute() method renders the query from its template
+    (see esbench.template), filling in named slots, such as the 'variable'
+    element, with values from parameter sources defined in the query's
+    'params' option. It also records the latency of each request. A SearchQuery can be executed
+    concurrently from multiple threads, as long as each thread uses its own
+    connection.
 
     """
 
@@ -75,24 +131,414 @@ class SearchQuery(object):
         self.observation_id = observation_id
         self.name = name
         self.query = dict(query)
+        self.options = self.query.pop('esbench', None) or {}
         self.execution_count = 0 # how many times it has been executed
         self.stats_group_name = "%s_%s" % (self.observation_id, self.name)
         self.query['stats'] = [self.stats_group_name]
 
+        self.index = index
+        self.doctype = doctype
         self.query_path = '%s/%s/_search' % (index, doctype)
         self.query_string = json.dumps(self.query, sort_keys=True)
+        self.template = esbench.template.Template(self.query_string, params=self.options.get('params'))
 
         self.t_client = None
+        self.latency = esbench.histogram.Histogram() # latency of each request
+        self.send_lag = esbench.histogram.Histogram() # open loop only, see execute()
+        self.missed = 0 # open loop only, scheduled executions never sent
+        # extracted from responses, see esbench.api.search_summary()
+        self.took = esbench.histogram.Histogram() # server side 'took'
+        self.overhead = esbench.histogram.Histogram() # latency - 'took'
+        self.responses = {
+            'parsed': 0,
+            'errors': 0, # http status >= 400, or failed _msearch item
+            'timed_out': 0,
+            'partial': 0, # responses with failed shards
+            'shards_failed': 0,
+            'hits_total': 0,
+            'zero_hits': 0,
+        }
+        self._lock = threading.Lock()
+
+
+    def execute(self, conn, t_intended=None):
+        """Execute the query, record the request latency.
+
+        When executing on a schedule (open loop), pass the time at which the
+        request was supposed to be sent as 't_intended'. The latency is then
+        measured from that time, not from the time the request was actually
+        sent, and the difference between the two is recorded as 'send lag'.
+        This way, when the server stalls, the time requests spend waiting to
+        be sent is not hidden from the latency stats.
+
+        """
+
+        return self.send(conn, self.template.render(), t_intended)
+
+
+    def send(self, conn, qs, t_intended=None, path=None):
+        """Send search request body 'qs' (to 'path', default: the query's
+        path), record the request latency.
+
+        This is called by execute(), and by esbench.replay for logged
+        requests, which are sent as they are, in this query's stats group.
+        """
+
+        t1 = time.time()
+        resp = conn.post(path or self.query_path, qs)
+        t2 = time.time()
+        summary = esbench.api.search_summary(resp.data)
+        self.record(t1, t2, resp.status >= 400, summary, t_intended)
+        return resp
+
+
+    def record(self, t1, t2, error, summary, t_intended=None):
+        """Record an execution sent at t1, with response received at t2.
+
+        This is called by execute(), and by MultiSearch for queries executed
+        as part of a batch.
+        """
+
+        with self._lock:
+            self.execution_count += 1
+            if t_intended is None:
+                self.latency.record(t2 - t1)
+            else:
+                self.latency.record(t2 - t_intended)
+                self.send_lag.record(t1 - t_intended)
+            self._record_response(error, summary, t2 - t1)
+
+
+    def _record_response(self, error, summary, t):
+
+        if error:
+            self.responses['errors'] += 1
+        if not summary:
+            return
+        self.took.record(summary.took / 1000.0)
+        self.overhead.record(t - (summary.took / 1000.0))
+        self.responses['parsed'] += 1
+        self.responses['timed_out'] += int(summary.timed_out)
+        self.responses['partial'] += int(summary.shards_failed > 0)
+        self.responses['shards_failed'] += summary.shards_failed
+        self.responses['hits_total'] += summary.hits_total
+        self.responses['zero_hits'] += int(summary.hits_total == 0)
+
+
+    def skip(self):
+        """Record a scheduled execution which was never sent."""
+
+        with self._lock:
+            self.missed += 1
+
+
+    def fail(self):
+        """Record an execution which failed without a response (IOError)."""
+
+        with self._lock:
+            self.responses['errors'] += 1
+
+
+    _HISTOGRAMS = ('latency', 'send_lag', 'took', 'overhead')
+
+    def state(self):
+        """Return counters and (serialized) histograms, json serializable.
+
+        This is what workers send back to the coordinator when load is
+        distributed (see esbench.distributed), to be merged with
+        merge_state().
+        """
+
+        with self._lock:
+            state = {
+                'execution_count': self.execution_count,
+                'missed': self.missed,
+                't_client': self.t_client,
+                'responses': dict(self.responses),
+            }
+            for attr in self._HISTOGRAMS:
+                state[attr] = getattr(self, attr).dumps()
+        return state
+
+
+    def merge_state(self, state):
+        """Add counters and histograms from another copy of the query.
+
+        The copies are run concurrently, so the longest 't_client' is kept.
+        """
+
+        with self._lock:
+            self.execution_count += state['execution_count']
+            self.missed += state['missed']
+            if state['t_client'] is not None:
+                self.t_client = max(self.t_client or 0, state['t_client'])
+            for key, value in state['responses'].items():
+                self.responses[key] = self.responses.get(key, 0) + value
+            for attr in self._HISTOGRAMS:
+                getattr(self, attr).merge(esbench.histogram.Histogram.loads(state[attr]))
+
+
+
+class TraversalQuery(SearchQuery):
+    """Base for queries which traverse the whole result set, page by page.
+
+    Each execution is a full traversal: its latency is the time it took to
+    fetch all the pages, and its 'took' the sum of the pages' 'took'. In
+    addition, the latency of each page request, and the number of pages and
+    documents fetched, are recorded. Per-query options:
+
+        - size: documents per page (default 100; per shard for 'scan')
+        - max_pages: stop each traversal after this many pages
+
+    This class is abstract, it isn't in QUERY_TYPES; subclasses define
+    'traversal_type', and _traverse(conn, qs), which returns (last
+    response, list of (resp, data, time) for each page).
+
+    """
+
+    traversal_type = None
+
+    def __init__(self, name, query, observation_id, index, doctype):
+
+        SearchQuery.__init__(self, name, query, observation_id, index, doctype)
+        self.page_size = int(self.options.get('size', 100))
+        self.max_pages = self.options.get('max_pages')
+        self.page_latency = esbench.histogram.Histogram()
+        self.pages = 0
+        self.docs = 0
+        self.t_traversal = 0.0 # time spent traversing, all clients
+        # set by Observation, sum of heap used on all nodes before and
+        # after the query was run
+        self.heap_before = None
+        self.heap_after = None
+
+
+    def execute(self, conn, t_intended=None):
+
+        qs = self.template.render()
+        t1 = time.time()
+        resp, pages = self._traverse(conn, qs)
+        t2 = time.time()
+
+        error = False
+        took = 0
+        timed_out = False
+        shards_failed = 0
+        for page_resp, page_data, _ in pages:
+            if page_resp.status >= 400 or page_data is None:
+                error = True
+                continue
+            took += page_data.get('took', 0)
+            timed_out = timed_out or page_data.get('timed_out', False)
+            shards_failed = max(shards_failed, page_data.get('_shards', {}).get('failed', 0))
+        try:
+            summary = esbench.api.SearchSummary(took, timed_out, shards_failed, pages[0][1]['hits']['total'])
+        except (IndexError, KeyError, TypeError):
+            summary = None
+
+        with self._lock:
+            self.pages += len(pages)
+            self.docs += sum([len(_hits(d)) for _, d, _ in pages])
+            self.t_traversal += t2 - t1
+            for _, _, t in pages:
+                self.page_latency.record(t)
+        self.record(t1, t2, error, summary, t_intended)
+        return resp
+
+
+    def _page(self, request_f, *args):
+        """Execute page request, return (resp, decoded data, time)."""
 
+        t1 = time.time()
+        resp = request_f(*args)
+        t = time.time() - t1
+        try:
+            data = json.loads(resp.data)
+        except (TypeError, ValueError):
+            data = None
+        return resp, data, t
+
+
+    def _more(self, pages):
+
+        if self.max_pages and len(pages) >= self.max_pages:
+            return False
+        resp, data, _ = pages[-1]
+        return resp.status < 400 and data is not None
+
+
+    def state(self):
+
+        state = SearchQuery.state(self)
+        with self._lock:
+            state.update({
+                'pages': self.pages,
+                'docs': self.docs,
+                't_traversal': self.t_traversal,
+                'page_latency': self.page_latency.dumps(),
+            })
+        return state
+
+
+    def merge_state(self, state):
+
+        SearchQuery.merge_state(self, state)
+        with self._lock:
+            self.pages += state['pages']
+            self.docs += state['docs']
+            self.t_traversal += state['t_traversal']
+            self.page_latency.merge(esbench.histogram.Histogram.loads(state['page_latency']))
+
+
+    def traversal_stats(self):
+
+        stats = {
+            'type': self.traversal_type,
+            'page_size': self.page_size,
+            'traversals': self.execution_count,
+            'pages': self.pages,
+            'docs': self.docs,
+            'pages_per_traversal': float(self.pages) / self.execution_count if self.execution_count else None,
+            'docs_per_traversal': float(self.docs) / self.execution_count if self.execution_count else None,
+            'docs_per_second': self.docs / self.t_traversal if self.t_traversal else None,
+            'page_latency': self.page_latency.stats(),
+            'heap_used_before_in_bytes': self.heap_before,
+            'heap_used_after_in_bytes': self.heap_after,
+            'heap_used_delta_in_bytes': (self.heap_after - self.heap_before) if None not in (self.heap_before, self.heap_after) else None,
+        }
+        return stats
+
+
+def _hits(data):
+
+    try:
+        return data['hits']['hits']
+    except (KeyError, TypeError):
+        return []
+
+
+class ScrollQuery(TraversalQuery):
+    """Traverses the result set with the scroll api.
+
+    Per-query options, in addition to those of TraversalQuery:
+
+        - scroll: how long ES keeps the scroll context (default '1m')
+        - scan: use 'scan' search type, no scoring or sorting (default true)
+
+    """
+
+    traversal_type = 'scroll'
+
+    def _traverse(self, conn, qs):
+
+        scroll = self.options.get('scroll', '1m')
+        scan = self.options.get('scan', True)
+        body = json.loads(qs)
+        body['size'] = self.page_size
+        pages = [self._page(esbench.api.scroll_start, conn, self.index, self.doctype, json.dumps(body, sort_keys=True), scroll, scan)]
+        scroll_id = (pages[-1][1] or {}).get('_scroll_id')
+        # with 'scan', the first response has no hits
+        while scroll_id and self._more(pages) and (_hits(pages[-1][1]) or (scan and len(pages) == 1)):
+            pages.append(self._page(esbench.api.scroll_next, conn, scroll_id, scroll))
+            scroll_id = (pages[-1][1] or {}).get('_scroll_id', scroll_id)
+        if scroll_id:
+            esbench.api.scroll_clear(conn, scroll_id)
+        return pages[-1][0], pages
+
+
+class PaginateQuery(TraversalQuery):
+    """Traverses the result set with 'from' / 'size' pagination.
+
+    Each page is a separate search, with 'from' advanced by the page size,
+    until all hits have been fetched. The deeper the page, the more work ES
+    has to do to get it, which is what this is meant to show.
+
+    """
+
+    traversal_type = 'paginate'
+
+    def _traverse(self, conn, qs):
+
+        body = json.loads(qs)
+        body['size'] = self.page_size
+        body['from'] = 0
+        pages = []
+        while True:
+            pages.append(self._page(conn.post, self.query_path, json.dumps(body, sort_keys=True)))
+            body['from'] += self.page_size
+            data = pages[-1][1]
+            if not (self._more(pages) and _hits(data) and body['from'] < data['hits']['total']):
+                break
+        return pages[-1][0], pages
+
+
+QUERY_TYPES = {
+    'search': SearchQuery,
+    'scroll': ScrollQuery,
+    'paginate': PaginateQuery,
+}
+
+
+def search_query(name, query, observation_id, index, doctype):
+    """Return SearchQuery, or its subclass for the query's 'type' option.
+
+    Raises:
+        ValueError: unknown query type
+    """
+
+    query_type = (query.get('esbench') or {}).get('type', 'search')
+    try:
+        query_cls = QUERY_TYPES[query_type]
+    except KeyError:
+        raise ValueError("invalid query type '%s' for query '%s'" % (query_type, name))
+    return query_cls(name, query, observation_id, index, doctype)
+
+
+class MultiSearch(object):
+    """Batch of queries executed with a single _msearch request.
+
+    Has the same execute() / skip() interface as SearchQuery, so batches
+    can be executed by Observation just like individual queries. The
+    response is split back into per-query results: each query in the batch
+    gets its own 'took' and response stats, and the latency of the whole
+    request (which is what the caller waits for) as its latency.
 
-    def execute(self, conn):
+    """
+
+    def __init__(self, queries):
+
+        self.queries = queries
+        self.name = "msearch(%s)" % ",".join([q.name for q in queries])
+
+
+    def execute(self, conn, t_intended=None):
 
-        qs = self.query_string % {'variable': rands(6)}
-        resp = conn.post(self.query_path, qs)
-        self.execution_count += 1
+        bodies = [q.template.render() for q in self.queries]
+        t1 = time.time()
+        resp = esbench.api.msearch(conn, self.queries[0].index, self.queries[0].doctype, bodies)
+        t2 = time.time()
+        summaries = esbench.api.msearch_summaries(resp.data)
+        if summaries is None or len(summaries) != len(self.queries):
+            errors = [resp.status >= 400] * len(self.queries)
+            summaries = [None] * len(self.queries)
+        else:
+            errors = [(resp.status >= 400) or (summary is None) for summary in summaries]
+        for query, error, summary in zip(self.queries, errors, summaries):
+            query.record(t1, t2, error, summary, t_intended)
         return resp
 
 
+    def skip(self):
+
+        for query in self.queries:
+            query.skip()
+
+
+    def fail(self):
+
+        for query in self.queries:
+            query.fail()
+
 
 class Observation(object):
     """Runs specified queries and records the results.
@@ -120,26 +566,183 @@ class Observation(object):
             conn=None,
             benchmark_id=None,
             queries=None,
-            reps=None, ):
+            reps=None,
+            mixed=None,
+            clients=None,
+            rate=None,
+            arrivals=None,
+            warmup=None,
+            warmup_time=None,
+            mix=None,
+            seed=None,
+            duration=None,
+            min_reps=None,
+            max_reps=None,
+            msearch=None,
+            precision=None,
+            precision_stat=None,
+            confidence=None,
+            sink=None,
+            observation_id=None,
+            coordinator=None,
+            client_load=None,
+            profile_dir=None,
+            cold=None,
+            drop_os_cache=None,
+            replay=None, ):
 
         self.conn = conn
         self.benchmark_id = benchmark_id
-        self.reps = reps # how many times each query will be executed
+        # where the observation is recorded, see esbench.sink
+        self.sink = sink or esbench.sink.EsSink(conn)
+        self.reps = reps # how many times each query will be executed (per query option: "reps")
+        # number of concurrent clients (threads, each with its own
+        # connection) executing the queries
+        self.clients = clients or 1
+        # when 'rate' is set, queries are executed 'open loop': requests
+        # are sent on a schedule, 'rate' per second, with either 'constant'
+        # or 'poisson' inter-arrival times, regardless of how fast the
+        # server responds. When not set, each client sends the next request
+        # as soon as it receives the response to the previous one.
+        self.rate = rate
+        self.arrivals = arrivals or 'constant'
+        # per-window query latencies recorded while data was being loaded
+        # into the index (list of dicts, see QueryWorker), None if the
+        # benchmark isn't running in 'mixed' mode
+        self.mixed = mixed
+        # each query can be executed 'warmup' times, or for 'warmup_time'
+        # seconds, before it is executed for real; this can be overridden
+        # per query in the query's 'esbench' options
+        self.warmup = warmup
+        self.warmup_time = warmup_time
+        # when 'cold' is set, before the warmup and the regular ('warm')
+        # executions, each query is executed 'cold' times, each time after
+        # the index caches have been cleared, and, with 'drop_os_cache',
+        # the OS page cache dropped; can be overridden per query
+        self.cold = cold
+        self.drop_os_cache = drop_os_cache
+        # when 'mix' is set, queries are not run one after another, but
+        # interleaved, in proportion to their weights (see _mix())
+        self.mix = mix
+        self.seed = seed
+        # when 'duration' is set, each query (or the whole mix) is executed
+        # for 'duration' seconds instead of 'reps' times, but no less than
+        # 'min_reps' and no more than 'max_reps' times, if these are set
+        # (for the mix, and for replays, these count all the requests
+        # together); can be overridden per query in the query's 'esbench'
+        # options
+        self.duration = duration
+        self.min_reps = min_reps
+        self.max_reps = max_reps
+        # when 'msearch' is set, queries are sent in batches of 'msearch'
+        # with the _msearch api (see MultiSearch); 'rate' is then the rate
+        # of _msearch requests, not of individual queries
+        self.msearch = msearch
+        # when 'precision' is set, each query (or the whole mix) is executed
+        # until the 'confidence' interval of its 'precision_stat' latency
+        # (mean, or percentile like 'p90') is within 'precision' (relative
+        # half width, 0.05 is +/-5%) of the estimate, bounded by 'min_reps',
+        # 'max_reps', and 'duration'; see _adaptive()
+        self.precision = precision
+        self.precision_stat = precision_stat or 'mean'
+        self.confidence = confidence or 0.95
+        # when 'coordinator' is set, the queries are run by remote workers,
+        # and their results merged into this observation's queries (see
+        # esbench.distributed); workers pass in the coordinator's
+        # 'observation_id', so that ES stats groups are shared
+        self.coordinator = coordinator
+        self.workers = None # addresses of the workers, set by the coordinator
+        self.query_bodies = queries
+        # stats of the client process itself (see esbench.monitor): 'observe'
+        # while this observation ran, 'load' while the data before it was
+        # loaded, and 'workers', per worker, when distributed; with
+        # 'profile_dir' set, the run is profiled into that directory
+        self.client = {}
+        if client_load:
+            self.client['load'] = client_load
+        self.profile_dir = profile_dir
+        # when 'replay' (esbench.replay.Replay) is set, the observation
+        # replays a request log instead of running the queries; the
+        # requests are recorded in the queries' stats groups, and in an
+        # extra group for requests no query claims
+        self.replay = replay
+        self.replay_stats = None
 
         Observation._count += 1
         self.observation_sequence_no = Observation._count
-        self.observation_id = uuid()
+        self.observation_id = observation_id or uuid()
 
         self.queries = []
         for name, body in queries.items():
             self.queries.append(
-                SearchQuery(name, body, self.observation_id, esbench.TEST_INDEX_NAME, esbench.TEST_DOCTYPE_NAME)
+                search_query(name, body, self.observation_id, esbench.TEST_INDEX_NAME, esbench.TEST_DOCTYPE_NAME)
+            )
+
+        # warmup executions have their own stats groups ('[name]_warmup'),
+        # so that both ES and client side stats for the 'real' executions
+        # exclude them
+        self.warmup_queries = {}
+        for query in self.queries:
+            if self._warmup_settings(query) != (0, 0):
+                self.warmup_queries[query.name] = search_query(
+                    "%s_warmup" % query.name, queries[query.name], self.observation_id, esbench.TEST_INDEX_NAME, esbench.TEST_DOCTYPE_NAME
+                )
+
+        # cold executions have their own stats groups ('[name]_cold') too
+        self.cold_queries = {}
+        for query in self.queries:
+            if query.options.get('cold', self.cold):
+                self.cold_queries[query.name] = search_query(
+                    "%s_cold" % query.name, queries[query.name], self.observation_id, esbench.TEST_INDEX_NAME, esbench.TEST_DOCTYPE_NAME
+                )
+
+        # replayed requests are logged requests, neither cold nor warmup
+        # executions apply
+        if self.replay:
+            self.warmup_queries = {}
+            self.cold_queries = {}
+            self.queries.append(
+                search_query(esbench.replay.DEFAULT_GROUP, {}, self.observation_id, esbench.TEST_INDEX_NAME, esbench.TEST_DOCTYPE_NAME)
             )
 
         self.ts_start = None
         self.ts_stop = None
         self.t1 = time.time()
         self.t_optimize = 0
+        # merge progress of an asynchronous optimize (see esbench.optimize),
+        # None if optimize was not run, or was run blocking
+        self.optimize = None
+        self.t_client = None # total time spent executing queries
+        # time series of cluster stats sampled while data was being loaded
+        # and this observation was running (see esbench.sampler), None if
+        # sampling is off
+        self.cluster_samples = None
+        # sweep id and cell, when run as part of a sweep (see esbench.sweep)
+        self.sweep = None
+
+
+    def settings(self):
+        """Return the observation's run settings, as keyword arguments."""
+
+        return {
+            'reps': self.reps,
+            'clients': self.clients,
+            'rate': self.rate,
+            'arrivals': self.arrivals,
+            'warmup': self.warmup,
+            'warmup_time': self.warmup_time,
+            'cold': self.cold,
+            'drop_os_cache': self.drop_os_cache,
+            'mix': self.mix,
+            'seed': self.seed,
+            'duration': self.duration,
+            'min_reps': self.min_reps,
+            'max_reps': self.max_reps,
+            'msearch': self.msearch,
+            'precision': self.precision,
+            'precision_stat': self.precision_stat,
+            'confidence': self.confidence,
+        }
 
 
     def run(self):
@@ -148,18 +751,464 @@ class Observation(object):
         logger.info("beginning observation no: %i, %s", self.observation_sequence_no, self.ts_start)
         t1 = time.time()
 
-        for query in self.queries:
-            tA = time.time()
-            for _ in range(self.reps):
-                query.execute(self.conn)
-            query.t_client = time.time() - tA
-            logger.info("ran query '%s' %i times in %.2fs", query.name, self.reps, query.t_client)
+        monitor = esbench.monitor.ClientMonitor(profile_path=esbench.monitor.profile_path(self.profile_dir, "obs_%s" % self.observation_id))
+        monitor.start()
+        try:
+            if self.replay:
+                # the log is read locally, so replay is never distributed
+                self._run_replay()
+            elif self.coordinator:
+                self.coordinator.observe(self)
+            else:
+                self._run_local()
+        finally:
+            self.client['observe'] = monitor.finish()
 
         self.ts_stop = timestamp()
         logger.info("finished observation no: %i, id: %s, time: %.3f",
             self.observation_sequence_no, self.observation_id, time.time()-t1)
 
 
+    def _client_conns(self):
+        """Return a connection for each client; a single client uses 'conn'."""
+
+        return [self.conn] if self.clients == 1 else [self.conn.clone() for _ in range(self.clients)]
+
+
+    def _close_client_conns(self, conns):
+
+        if self.clients > 1:
+            for conn in conns:
+                conn.close()
+
+
+    def _run_local(self):
+
+        conns = self._client_conns()
+        try:
+            self.t_client = 0
+            if self.mix:
+                for query in self.queries:
+                    self._cold(query, conns[0])
+                for query in self.queries:
+                    self._warmup(query, conns[0])
+                for query in self.queries:
+                    self._render_ahead(query)
+                tA = time.time()
+                if self.precision:
+                    jobs = self._adaptive(itertools.cycle(self._mix()), self.queries, self.min_reps, self.max_reps, self.duration)
+                elif self.duration:
+                    jobs = self._bounded(itertools.cycle(self._mix()), self.duration, self.min_reps, self.max_reps)
+                else:
+                    jobs = iter(self._mix())
+                traversals = [q for q in self.queries if isinstance(q, TraversalQuery)]
+                self._record_heap(traversals, 'heap_before')
+                self._execute(jobs, conns)
+                self.t_client = time.time() - tA
+                self._record_heap(traversals, 'heap_after')
+                for query in self.queries:
+                    # queries are interleaved, so each query's throughput is
+                    # measured against the run time of the whole mix
+                    query.t_client = self.t_client
+                logger.info("ran query mix of %i queries in %.2fs (%i clients)", sum([q.execution_count for q in self.queries]), self.t_client, self.clients)
+            else:
+                for query in self.queries:
+                    self._cold(query, conns[0])
+                    self._warmup(query, conns[0])
+                    self._render_ahead(query)
+                    traversals = [query] if isinstance(query, TraversalQuery) else []
+                    self._record_heap(traversals, 'heap_before')
+                    tA = time.time()
+                    self._execute(self._jobs(query), conns)
+                    query.t_client = time.time() - tA
+                    self._record_heap(traversals, 'heap_after')
+                    self.t_client += query.t_client
+                    logger.info("ran query '%s' %i times in %.2fs (%i clients)", query.name, query.execution_count, query.t_client, self.clients)
+        finally:
+            self._close_client_conns(conns)
+
+
+    def _run_replay(self):
+
+        conns = self._client_conns()
+        try:
+            classifier = esbench.replay.Classifier(self.queries[:-1], default=self.queries[-1])
+            requests = self.replay.requests(classifier)
+            if self.duration:
+                requests = self._bounded(requests, self.duration, self.min_reps, self.max_reps)
+            elif self.max_reps:
+                requests = itertools.islice(requests, self.max_reps)
+            tA = time.time()
+            if self.replay.speed:
+                self._dispatch(((tA + offset, request) for offset, request in requests), conns)
+            else:
+                self._execute_closed_loop((request for _, request in requests), conns)
+            self.t_client = time.time() - tA
+            for query in self.queries:
+                # as in a query mix, throughput is measured against the run
+                # time of the whole replay
+                query.t_client = self.t_client
+            self.replay_stats = self.replay.stats(self.queries, self.t_client)
+            logger.info("replayed %i requests from '%s' in %.2fs (%i clients), %i invalid lines skipped", self.replay.log.entries, self.replay.path, self.t_client, self.clients, self.replay.log.invalid)
+        finally:
+            self._close_client_conns(conns)
+
+
+    def _heap_used(self, cluster_f=esbench.api.cluster_get_stats):
+        """Return heap used on all nodes, in bytes, None if not available."""
+
+        try:
+            resp = cluster_f(self.conn)
+            nodes = json.loads(resp.data)['nodes']
+            return sum([n['jvm']['mem']['heap_used_in_bytes'] for n in nodes.values()])
+        except (TypeError, ValueError, KeyError, IOError) as exc:
+            logger.debug("couldn't get heap used: %s", exc)
+            return None
+
+
+    def _record_heap(self, queries, attr):
+
+        if not queries:
+            return
+        heap = self._heap_used()
+        for query in queries:
+            setattr(query, attr, heap)
+
+
+    def _warmup_settings(self, query):
+        """Return (reps, seconds) of warmup for the query."""
+
+        reps = query.options.get('warmup', self.warmup) or 0
+        seconds = query.options.get('warmup_time', self.warmup_time) or 0
+        return (reps, seconds)
+
+
+    def _warmup(self, query, conn):
+        """Execute the query's warmup, if any, sequentially."""
+
+        if query.name not in self.warmup_queries:
+            return
+        warmup_query = self.warmup_queries[query.name]
+        reps, seconds = self._warmup_settings(query)
+        tA = time.time()
+        while (warmup_query.execution_count < reps) or (seconds and (time.time() - tA < seconds)):
+            warmup_query.execute(conn)
+        warmup_query.t_client = time.time() - tA
+        logger.info("warmed up query '%s' %i times in %.2fs", query.name, warmup_query.execution_count, warmup_query.t_client)
+
+
+    def _cold(self, query, conn):
+        """Execute the query's cold executions, if any, sequentially."""
+
+        if query.name not in self.cold_queries:
+            return
+        cold_query = self.cold_queries[query.name]
+        reps = query.options.get('cold', self.cold)
+        t_client = 0
+        for _ in range(reps):
+            esbench.api.index_clear_cache(conn, esbench.TEST_INDEX_NAME)
+            if self.drop_os_cache:
+                drop_os_cache()
+            tA = time.time()
+            cold_query.execute(conn)
+            t_client += time.time() - tA
+        # time spent clearing caches is not included
+        cold_query.t_client = t_client
+        logger.info("ran query '%s' cold %i times in %.2fs", query.name, cold_query.execution_count, cold_query.t_client)
+
+
+    def _bounded(self, jobs, duration, min_reps=None, max_reps=None):
+        """Yield from jobs for 'duration' seconds.
+
+        Stops when the duration has elapsed, but not before at least
+        'min_reps' items have been yielded, and always after 'max_reps'
+        items, if these are set.
+
+        """
+
+        t_stop = time.time() + duration
+        n = 0
+        for job in jobs:
+            if max_reps and n >= max_reps:
+                return
+            if n >= (min_reps or 0) and time.time() >= t_stop:
+                return
+            n += 1
+            yield job
+
+
+    def _render_ahead(self, query):
+        """Render the query's executions before they are timed.
+
+        Renders as many as the query is expected to be executed ('reps', or
+        'max_reps' for runs bounded by time or precision), up to
+        MAX_RENDERED_AHEAD; runs which go on longer render any more as they
+        run, a block at a time.
+        """
+
+        if query.options.get('duration', self.duration) or self._precision_settings(query)[0]:
+            n = query.options.get('max_reps', self.max_reps) or MAX_RENDERED_AHEAD
+        else:
+            n = query.options.get('reps', self.reps)
+        query.template.prepare(min(n or 0, MAX_RENDERED_AHEAD))
+
+
+    def _precision_settings(self, query):
+        """Return (precision, stat) target for the query."""
+
+        return (
+            query.options.get('precision', self.precision),
+            query.options.get('precision_stat', self.precision_stat),
+        )
+
+
+    def _precision(self, query):
+        """Return dict with the achieved precision of the query's latency.
+
+        'precision' is the half width of the confidence interval relative
+        to the estimate, None if it can't be calculated (yet).
+        """
+
+        target, stat = self._precision_settings(query)
+        ci = query.latency.confidence_interval(stat, self.confidence)
+        if ci and ci[0]:
+            estimate, low, high = ci
+            precision = (high - low) / 2.0 / estimate
+        else:
+            estimate, low, high = None, None, None
+            precision = None
+        return {
+            'stat': stat,
+            'confidence': self.confidence,
+            'target': target,
+            'precision': precision,
+            'converged': (precision is not None) and (target is not None) and (precision <= target),
+            'estimate_in_millis': estimate * 1000.0 if estimate is not None else None,
+            'low_in_millis': low * 1000.0 if low is not None else None,
+            'high_in_millis': high * 1000.0 if high is not None else None,
+        }
+
+
+    def _adaptive(self, jobs, queries, min_reps=None, max_reps=None, duration=None):
+        """Yield from jobs until the latency of each of 'queries' is precise.
+
+        Stops when the confidence intervals of all the queries' latency
+        stats are within their 'precision' targets, but not before at least
+        'min_reps' (default ADAPTIVE_MIN_REPS) items have been yielded, and
+        always after 'max_reps' (default ADAPTIVE_MAX_REPS) items, or after
+        'duration' seconds, if set. Precision is checked every
+        ADAPTIVE_CHECK_EVERY items.
+
+        """
+
+        min_reps = min_reps or ADAPTIVE_MIN_REPS
+        max_reps = max_reps or ADAPTIVE_MAX_REPS
+        t_stop = (time.time() + duration) if duration else None
+        n = 0
+        for job in jobs:
+            if n >= max_reps:
+                return
+            if n >= min_reps:
+                if t_stop and time.time() >= t_stop:
+                    return
+                if (n % ADAPTIVE_CHECK_EVERY == 0) and all([self._precision(q)['converged'] for q in queries]):
+                    return
+            n += 1
+            yield job
+
+
+    def _jobs(self, query):
+        """Return iterator of executions of a query run on its own."""
+
+        duration = query.options.get('duration', self.duration)
+        if self._precision_settings(query)[0]:
+            return self._adaptive(
+                itertools.repeat(query),
+                [query],
+                query.options.get('min_reps', self.min_reps),
+                query.options.get('max_reps', self.max_reps),
+                duration,
+            )
+        if duration:
+            return self._bounded(
+                itertools.repeat(query),
+                duration,
+                query.options.get('min_reps', self.min_reps),
+                query.options.get('max_reps', self.max_reps),
+            )
+        return itertools.repeat(query, query.options.get('reps', self.reps))
+
+
+    def _mix(self):
+        """Return list of queries to execute in a query mix.
+
+        The list has the same total length as it would if each query was run
+        'reps' times, but each query's share of the total is proportional to
+        its 'weight' option (default 1), and queries are interleaved. The
+        order is shuffled with a random generator seeded with 'seed', so
+        it is the same for every observation, and for every run of the
+        benchmark with the same seed.
+
+        """
+
+        queries = sorted(self.queries, key=lambda q: q.name)
+        weights = [float(q.options.get('weight', 1)) for q in queries]
+        if any([w < 0 for w in weights]) or not sum(weights) > 0:
+            raise ValueError("invalid query mix weights: %s, weights must be >= 0, and not all 0" % (", ".join(["%s: %g" % (q.name, w) for q, w in zip(queries, weights)]), ))
+        total = self.reps * len(queries)
+        jobs = []
+        for query, weight in zip(queries, weights):
+            jobs.extend([query] * int(round(total * weight / sum(weights))))
+        random.Random(self.seed).shuffle(jobs)
+        return jobs
+
+
+    def _execute(self, jobs, conns):
+        """Execute queries, spread over the connections.
+
+        Args:
+            jobs: iterator of SearchQuery objects, each item is an execution
+            conns: list of esbench.api.Conn, one for each client
+
+        With 'msearch' set, the jobs are grouped into MultiSearch batches
+        first, and each batch is executed as one request.
+
+        With a single connection the queries are executed sequentially,
+        else there is a thread per connection, each thread taking the next
+        query off 'jobs' until there are none left.
+
+        """
+
+        if self.msearch:
+            jobs = self._batches(jobs, self.msearch)
+
+        if self.rate:
+            self._dispatch(itertools.izip(self._schedule(time.time()), jobs), conns)
+            return
+
+        self._execute_closed_loop(jobs, conns)
+
+
+    def _execute_closed_loop(self, jobs, conns):
+        """Execute jobs, each client sending the next request as soon as
+        it has the response to the previous one."""
+
+        lock = threading.Lock()
+
+        def _client(conn):
+            while True:
+                with lock:
+                    query = next(jobs, None)
+                if query is None:
+                    return
+                try:
+                    query.execute(conn)
+                except IOError as exc:
+                    logger.warning("query '%s' failed: %s", query.name, exc)
+                    query.fail()
+
+        if len(conns) == 1:
+            _client(conns[0])
+            return
+
+        threads = [threading.Thread(target=_client, args=(conn, )) for conn in conns]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+
+    def _batches(self, jobs, size):
+        """Yield MultiSearch batches of up to 'size' jobs.
+
+        Traversal queries (scroll, paginate) can't be batched, they are
+        yielded on their own.
+        """
+
+        batch = []
+        for job in jobs:
+            if isinstance(job, TraversalQuery):
+                yield job
+                continue
+            batch.append(job)
+            if len(batch) == size:
+                yield MultiSearch(batch)
+                batch = []
+        if batch:
+            yield MultiSearch(batch)
+
+
+    def _schedule(self, t_start):
+        """Yield times at which requests are to be sent, forever."""
+
+        t = t_start
+        while True:
+            yield t
+            if self.arrivals == 'poisson':
+                t += random.expovariate(self.rate)
+            else:
+                t += 1.0 / self.rate
+
+
+    def _dispatch(self, timed_jobs, conns):
+        """Execute queries open loop, on schedule.
+
+        'timed_jobs' is an iterator of (time to send, job): jobs on the
+        target rate schedule (see _schedule()), or replayed requests at
+        their logged times. The main thread dispatches requests according
+        to the schedule, the client threads (one per connection) send them.
+        If all clients are busy, dispatched requests wait, and the wait is
+        included in their latency. Requests which could not be sent within
+        the connection timeout of their scheduled time are dropped, and
+        counted as 'missed'.
+
+        """
+
+        dispatched = Queue.Queue()
+        timeout = conns[0].timeout
+
+        def _client(conn):
+            while True:
+                t_intended, query = dispatched.get()
+                if query is None:
+                    return
+                if time.time() - t_intended > timeout:
+                    query.skip()
+                    continue
+                try:
+                    query.execute(conn, t_intended=t_intended)
+                except IOError as exc:
+                    logger.warning("query '%s' failed: %s", query.name, exc)
+                    query.fail()
+
+        threads = [threading.Thread(target=_client, args=(conn, )) for conn in conns]
+        for thread in threads:
+            thread.start()
+        for t_intended, query in timed_jobs:
+            delay = t_intended - time.time()
+            if delay > 0:
+                time.sleep(delay)
+            dispatched.put((t_intended, query))
+        for _ in threads:
+            dispatched.put((None, None))
+        for thread in threads:
+            thread.join()
+
+
+    def _open_loop_stats(self, query):
+
+        return {
+            'rate': self.rate,
+            'arrivals': self.arrivals,
+            'scheduled': query.execution_count + query.missed,
+            'sent': query.execution_count,
+            'missed': query.missed,
+            # sent more than one (mean) inter-arrival interval late
+            'late': query.send_lag.count_above(1.0 / self.rate),
+            'send_lag': query.send_lag.stats(),
+        }
+
+
     def _segments(self, segments_f=esbench.api.index_get_segments):
         """Get and massage segment stats data.
 
@@ -201,7 +1250,8 @@ class Observation(object):
         """
 
         # we need to specifically ask for the stats groups we want, by name.
-        stats_group_names = [q.stats_group_name for q in self.queries]
+        queries = self.queries + self.warmup_queries.values() + self.cold_queries.values()
+        stats_group_names = [q.stats_group_name for q in queries]
         resp = stats_f(self.conn, esbench.TEST_INDEX_NAME, ",".join(stats_group_names))
         logger.debug("stats call: %s", resp.curl)
         try:
@@ -214,10 +1264,13 @@ class Observation(object):
 
         stats['search']['groups'] = {
             _remove_obs_id(k): v for
-            k, v in stats['search']['groups'].items()
+            k, v in stats['search'].get('groups', {}).items()
         }
 
-        for query in self.queries:
+        for query in queries:
+            # ES has no stats for a group with no requests, which happens
+            # when replayed requests don't cover all the queries
+            stats['search']['groups'].setdefault(query.name, {})
             logger.debug("query %s execution count: %i", query.name, query.execution_count)
             stats['search']['groups'][query.name]['client_total'] = query.execution_count
             stats['search']['groups'][query.name]['client_time'] = "%.2fs" % (query.t_client, ) if query.t_client else None
@@ -225,6 +1278,24 @@ class Observation(object):
             stats['search']['groups'][query.name]['client_time_in_millis_per_query'] = float(stats['search']['groups'][query.name]['client_time_in_millis']) / query.execution_count if query.execution_count else None
             stats['search']['groups'][query.name]['fetch_time_in_millis_per_query'] = float(stats['search']['groups'][query.name]['fetch_time_in_millis']) / query.execution_count if query.execution_count else None
             stats['search']['groups'][query.name]['query_time_in_millis_per_query'] = float(stats['search']['groups'][query.name]['query_time_in_millis']) / query.execution_count if query.execution_count else None
+            stats['search']['groups'][query.name]['client_qps'] = query.execution_count / query.t_client if query.t_client else None
+            stats['search']['groups'][query.name]['client_latency'] = query.latency.stats()
+            stats['search']['groups'][query.name]['client_took'] = query.took.stats()
+            stats['search']['groups'][query.name]['client_overhead'] = query.overhead.stats()
+            stats['search']['groups'][query.name]['client_responses'] = dict(query.responses)
+            if query in self.queries and self._precision_settings(query)[0]:
+                # only queries run to a precision target, see _adaptive()
+                stats['search']['groups'][query.name]['client_precision'] = self._precision(query)
+            if isinstance(query, TraversalQuery):
+                stats['search']['groups'][query.name]['client_traversal'] = query.traversal_stats()
+            if self.rate and query in self.queries:
+                stats['search']['groups'][query.name]['client_open_loop'] = self._open_loop_stats(query)
+            if self.replay and self.replay.speed:
+                stats['search']['groups'][query.name]['client_replay'] = {
+                    'sent': query.execution_count,
+                    'missed': query.missed,
+                    'send_lag': query.send_lag.stats(),
+                }
 
         return stats
 
@@ -261,6 +1332,13 @@ class Observation(object):
         return cluster_stats
 
 
+    def client_saturated(self):
+        """Return True if the client (or any worker) was saturated."""
+
+        runs = [self.client.get('load'), self.client.get('observe')] + (self.client.get('workers') or {}).values()
+        return any([run['saturated'] for run in runs if run])
+
+
     def record(self):
 
         t_total = time.time() - self.t1
@@ -273,31 +1351,171 @@ class Observation(object):
                 'observation_stop': self.ts_stop,
                 't_total': "%.2fm" % (t_total / 60.0),
                 't_total_in_millis': int(t_total * 1000),
+                'clients': self.clients,
+                'client_saturated': self.client_saturated(),
+                # aggregate throughput, all queries
+                'client_qps': sum([q.execution_count for q in self.queries]) / self.t_client if self.t_client else None,
             },
             'segments': self._segments(),
             'stats': self._stats(),
             'cluster': self._cluster_stats(),
+            'client': self.client,
         }
 
-        data = json.dumps(obs, sort_keys=True)
-        path = '%s/obs/%s' % (esbench.STATS_INDEX_NAME, self.observation_id, )
-        resp = self.conn.put(path, data)
-        if resp.status not in [200, 201]:
-            logger.error(resp)
-        logger.info("recorded observation into: http://%s:%i/%s", self.conn.host, self.conn.port, path)
+        if self.mixed is not None:
+            obs['mixed'] = self.mixed
+        if self.optimize is not None:
+            obs['optimize'] = self.optimize
+        if self.replay_stats is not None:
+            obs['replay'] = self.replay_stats
+        if self.cluster_samples is not None:
+            obs['cluster_samples'] = self.cluster_samples
+        if self.sweep is not None:
+            obs['meta']['sweep'] = self.sweep
+        if self.workers is not None:
+            obs['meta']['workers'] = self.workers
+
+        resp = self.sink.write('obs', self.observation_id, obs)
+        logger.info("recorded observation %s into: %s", self.observation_id, self.sink)
         return resp
 
 
 
+class QueryWorker(threading.Thread):
+    """Runs queries in the background, while data is being loaded.
+
+    In 'mixed' mode the benchmark keeps a QueryWorker running queries for as
+    long as a batch of data is being loaded, so that search latency can be
+    seen when competing with indexing and merging. The worker executes the
+    queries round-robin, and divides its run time into windows of set
+    length. For each window it records per-query latency stats, and the rate
+    at which documents were indexed during that window - the loader reports
+    its progress by incrementing the 'docs' counter.
+
+    The worker has its own connection and its own stats groups (its own
+    'observation_id'), so it doesn't interfere with regular observations.
+    Queries which fail with IOError are counted in the window's 'errors';
+    any other exception stops the worker, and is raised again by finish().
+
+    """
+
+    def __init__(self, conn=None, queries=None, window=10.0):
+
+        threading.Thread.__init__(self)
+        self.daemon = True
+
+        self.conn = conn
+        self.window = window
+        self.worker_id = uuid()
+        self.queries = [
+            search_query(name, body, self.worker_id, esbench.TEST_INDEX_NAME, esbench.TEST_DOCTYPE_NAME)
+            for name, body in queries.items()
+        ]
+
+        self.docs = 0 # incremented by the loader
+        self.windows = []
+        self.error = None # sys.exc_info() of the exception which stopped the worker
+        self._stop_event = threading.Event()
+
+
+    def _record_window(self, t_start, docs_start, latencies, errors):
+
+        t_window = time.time() - t_start
+        docs_stop = self.docs
+        docs = docs_stop - docs_start
+        self.windows.append({
+            'window_no': len(self.windows) + 1,
+            't_window_in_millis': int(t_window * 1000),
+            'docs': docs,
+            'docs_per_second': docs / t_window if t_window else None,
+            'errors': errors,
+            'groups': {name: h.stats() for name, h in latencies.items()},
+        })
+        return docs_stop
+
+
+    def run(self):
+
+        try:
+            self._run()
+        except Exception:
+            logger.error("query worker %s failed", self.worker_id, exc_info=True)
+            self.error = sys.exc_info()
+        finally:
+            self.conn.close()
+
+
+    def _run(self):
+
+        t_start = time.time()
+        docs_start = 0 # the loader may have started before the thread did
+        latencies = {q.name: esbench.histogram.Histogram() for q in self.queries}
+        errors = 0
+
+        while not self._stop_event.is_set():
+            for query in self.queries:
+                t1 = time.time()
+                try:
+                    query.execute(self.conn)
+                except IOError as exc:
+                    logger.warning("query '%s' failed: %s", query.name, exc)
+                    query.fail()
+                    errors += 1
+                    continue
+                latencies[query.name].record(time.time() - t1)
+
+            if time.time() - t_start >= self.window:
+                docs_start = self._record_window(t_start, docs_start, latencies, errors)
+                t_start = time.time()
+                latencies = {q.name: esbench.histogram.Histogram() for q in self.queries}
+                errors = 0
+
+        if any([h.count for h in latencies.values()]) or errors or (self.docs != docs_start):
+            self._record_window(t_start, docs_start, latencies, errors)
+
+
+    def finish(self):
+        """Stop the worker, wait for it to exit, return recorded windows.
+
+        Raises:
+            the exception, other than IOError, which stopped the worker
+        """
+
+        self._stop_event.set()
+        self.join()
+        if self.error:
+            raise self.error[0], self.error[1], self.error[2]
+        logger.info("query worker %s recorded %i windows", self.worker_id, len(self.windows))
+        return self.windows
+
+
+
 class Benchmark(object):
     """Orchestrates the loading of data and running of observations. """
 
-    def __init__(self, config=None, conn=None):
+    def __init__(self, config=None, conn=None, sink=None, coordinator=None, checkpoint_dir=None):
 
         self.benchmark_id = uuid()
 
         self.config = config
         self.conn = conn
+        self.sink = sink or esbench.sink.EsSink(conn)
+        self.sweep = None # set by esbench.sweep.Sweep
+        # esbench.distributed.Coordinator, when data is loaded and queries
+        # are run by workers
+        self.coordinator = coordinator
+        self.client_load = None # client process stats of the last load()
+        self._load_count = 0
+        # when 'checkpoint_dir' is set (checkpointing is opt in), a
+        # checkpoint is saved there after each observation, see
+        # esbench.checkpoint and resume()
+        self.checkpoint_dir = checkpoint_dir
+        self.observation_count = 0
+        self.lines_loaded = 0 # lines taken off the feed
+        self.size_loaded = 0
+        self.doc_count_start = 0 # documents in the index before loading
+        self.resumed = False
+        self._resume_partial = None
 
         self.ts_start = None
         self.ts_stop = None
@@ -309,35 +1527,120 @@ class Benchmark(object):
         return str(self.benchmark_id)
 
 
-    def observe(self, obs_cls=Observation):
+    def _sampler(self, phase):
+        """Return started ClusterSampler, None if sampling isn't enabled."""
+
+        if not self.config['config'].get('sample_interval'):
+            return None
+        sampler = esbench.sampler.ClusterSampler(
+            conn=self.conn.clone(),
+            interval=self.config['config']['sample_interval'],
+        )
+        sampler.phase = phase
+        sampler.start()
+        return sampler
+
+
+    def observe(self, obs_cls=Observation, mixed=None, sampler=None):
+        """Run and record an observation.
+
+        'sampler' is the ClusterSampler started for the load preceding the
+        observation; without one (no data loaded, as with '--no-load'),
+        a sampler is started here, if sampling is enabled.
+        """
 
+        if sampler is None:
+            sampler = self._sampler('observe')
         observation = obs_cls(
                         conn=self.conn,
                         benchmark_id=self.benchmark_id,
                         queries=self.config['queries'],
                         reps=self.config['config']['reps'],
+                        mixed=mixed,
+                        clients=self.config['config'].get('clients'),
+                        rate=self.config['config'].get('rate'),
+                        arrivals=self.config['config'].get('arrivals'),
+                        warmup=self.config['config'].get('warmup'),
+                        warmup_time=self.config['config'].get('warmup_time'),
+                        cold=self.config['config'].get('cold'),
+                        drop_os_cache=self.config['config'].get('drop_os_cache'),
+                        mix=self.config['config'].get('mix'),
+                        seed=self.config['config'].get('seed'),
+                        duration=self.config['config'].get('duration'),
+                        min_reps=self.config['config'].get('min_reps'),
+                        max_reps=self.config['config'].get('max_reps'),
+                        msearch=self.config['config'].get('msearch'),
+                        precision=self.config['config'].get('precision'),
+                        precision_stat=self.config['config'].get('precision_stat'),
+                        confidence=self.config['config'].get('confidence'),
+                        sink=self.sink,
+                        coordinator=self.coordinator,
+                        client_load=self.client_load,
+                        profile_dir=self.config['config'].get('client_profile'),
+                        replay=self._replay(),
         )
+        self.client_load = None
 
         if self.config['config']['segments']:
             t1 = time.time()
             logger.info("starting optimize call...")
-            resp = esbench.api.index_optimize(self.conn, esbench.TEST_INDEX_NAME, self.config['config']['segments'])
+            if self.config['config'].get('optimize_async'):
+                observation.optimize = esbench.optimize.optimize(
+                    self.conn,
+                    esbench.TEST_INDEX_NAME,
+                    self.config['config']['segments'],
+                    timeout=self.config['config'].get('optimize_timeout'),
+                )
+            else:
+                resp = esbench.api.index_optimize(self.conn, esbench.TEST_INDEX_NAME, self.config['config']['segments'])
             observation.t_optimize = time.time() - t1
             logger.info("optimize call: %.2fs", observation.t_optimize)
 
+        observation.sweep = self.sweep
+
+        if sampler:
+            sampler.phase = 'observe'
         observation.run()
+        if sampler:
+            observation.cluster_samples = sampler.finish()
         observation.record()
+        self.observation_count += 1
+        self.save_checkpoint()
 
         return observation
 
 
+    def _replay(self):
+
+        if not self.config['config'].get('replay'):
+            return None
+        return esbench.replay.Replay(
+            self.config['config']['replay'],
+            speed=esbench.replay.parse_speed(self.config['config'].get('replay_speed')),
+        )
+
+
     def prepare(self):
 
         self.ts_start = timestamp()
         self.t1 = time.time()
 
 
-    def load(self, lines):
+    def load(self, lines, worker=None):
+
+        self._load_count += 1
+        monitor = esbench.monitor.ClientMonitor(profile_path=esbench.monitor.profile_path(self.config['config'].get('client_profile'), "load_%s_%i" % (self.benchmark_id, self._load_count)))
+        monitor.start()
+        try:
+            return self._load(lines, worker)
+        finally:
+            self.client_load = monitor.finish()
+
+
+    def _load(self, lines, worker=None):
+
+        if self.coordinator:
+            return self.coordinator.load(lines, worker=worker)
 
         count = 0
         size_b = 0
@@ -346,28 +1649,129 @@ class Benchmark(object):
             size_b += len(line)
             resp = esbench.api.document_post(self.conn, esbench.TEST_INDEX_NAME, esbench.TEST_DOCTYPE_NAME, line)
             count += 1
+            if worker:
+                worker.docs += 1
         logger.info("loaded %i lines into index '%s', size: %i (%.2fMB)", count, esbench.TEST_INDEX_NAME, size_b, size_b/(1<<20))
         return (count, size_b)
 
 
+    def checkpoint(self):
+
+        return {
+            'benchmark_id': self.benchmark_id,
+            'benchmark_start': self.ts_start,
+            't_elapsed': time.time() - self.t1,
+            'observations': self.observation_count,
+            'feed': {
+                'path': self.config['config'].get('data'),
+                'lines': self.lines_loaded,
+                'size_b': self.size_loaded,
+            },
+            'doc_count': self.doc_count_start + self.lines_loaded,
+            'config_hash': esbench.checkpoint.config_hash(self.config),
+        }
+
+
+    def save_checkpoint(self):
+        """Save checkpoint, once the recorded observations are written.
+
+        With an esbench.sink.AsyncSink the checkpoint is saved by the
+        sink's writer thread, after the observations, so that it never
+        counts observations which weren't written, and the benchmark
+        doesn't wait for them to be.
+        """
+
+        if not self.checkpoint_dir:
+            return
+        checkpoint = self.checkpoint()
+
+        def _save():
+            try:
+                esbench.checkpoint.save(self.checkpoint_dir, checkpoint)
+            except (IOError, OSError) as exc:
+                logger.warning("couldn't save checkpoint: %s", exc)
+
+        self.sink.when_written(_save)
+
+
+    def remove_checkpoint(self):
+        """Remove checkpoint, once it has been saved, see save_checkpoint()."""
+
+        if not self.checkpoint_dir:
+            return
+        self.sink.when_written(lambda: esbench.checkpoint.remove(self.checkpoint_dir, self.benchmark_id))
+
+
+    def resume(self, checkpoint, partial=(0, 0)):
+        """Carry on from checkpoint, call after prepare().
+
+        'partial' is (count, size_b) of lines loaded after the checkpoint
+        was saved, see esbench.checkpoint.resume_feed(); these count
+        towards the first batch loaded by run().
+        """
+
+        self.benchmark_id = checkpoint['benchmark_id']
+        self.ts_start = checkpoint['benchmark_start']
+        self.t1 = time.time() - checkpoint['t_elapsed']
+        self.observation_count = checkpoint['observations']
+        # observation sequence numbers carry on from the last recorded
+        Observation._count = checkpoint['observations']
+        self.lines_loaded = checkpoint['feed']['lines']
+        self.size_loaded = checkpoint['feed']['size_b']
+        self.doc_count_start = checkpoint['doc_count'] - checkpoint['feed']['lines']
+        self.resumed = True
+        self._resume_partial = partial
+        logger.info("resuming benchmark %s after observation %i, %i lines loaded", self.benchmark_id, self.observation_count, self.lines_loaded)
+
+
+    def _doc_count(self):
+
+        try:
+            return json.loads(esbench.api.index_count(self.conn, esbench.TEST_INDEX_NAME).data)['count']
+        except (TypeError, ValueError, KeyError, IOError) as exc:
+            logger.warning("couldn't get document count: %s", exc)
+            return 0
+
+
     def run(self, batches):
 
-        index_settings = {"settings" : {"index" : {"number_of_shards" : 1, "number_of_replicas" : 0}}}
-        esbench.api.index_create(self.conn, esbench.STATS_INDEX_NAME, index_settings)
+        self.sink.prepare()
 
-        if not self.config['config']['append']:
+        if self.resumed:
+            pass
+        elif not self.config['config']['append']:
             esbench.api.index_delete(self.conn, esbench.TEST_INDEX_NAME)
             esbench.api.index_create(self.conn, esbench.TEST_INDEX_NAME, self.config['index'])
+        elif self.checkpoint_dir:
+            self.doc_count_start = self._doc_count()
 
         total_count = 0
         total_size_b = 0
         for batch in batches:
-            count, size_b = self.load(batch)
+            worker = None
+            if self.config['config'].get('mixed'):
+                worker = QueryWorker(
+                    conn=self.conn.clone(),
+                    queries=self.config['queries'],
+                    window=self.config['config'].get('mixed_window') or 10.0,
+                )
+                worker.start()
+            sampler = self._sampler('load')
+            count, size_b = self.load(batch, worker=worker)
+            if self._resume_partial:
+                count += self._resume_partial[0]
+                size_b += self._resume_partial[1]
+                self._resume_partial = None
+            self.lines_loaded += count
+            self.size_loaded += size_b
+            mixed = worker.finish() if worker else None
             if not count:
+                if sampler:
+                    sampler.finish()
                 break
             total_count += count
             total_size_b += size_b
-            self.observe()
+            self.observe(mixed=mixed, sampler=sampler)
 
         logger.info("load complete; loaded total %i lines into index '%s', total size: %i (%.2fmb)", total_count, esbench.TEST_INDEX_NAME, total_size_b, total_size_b/(1<<20))
 
@@ -405,11 +1809,13 @@ class Benchmark(object):
             'cluster': self._get_cluster_info(),
         }
 
-        data = json.dumps(stat, sort_keys=True)
-        path = '%s/bench/%s' % (esbench.STATS_INDEX_NAME, self,)
-        resp = self.conn.put(path, data)
-        if resp.status not in [200, 201]:
+        if self.sweep is not None:
+            stat['meta']['sweep'] = self.sweep
+
+        # asynchronous sinks return None, and log their own errors
+        resp = self.sink.write('bench', self.benchmark_id, stat)
+        if resp is not None and resp.status not in [200, 201]:
             raise IOError("failed to record benchmark")
-        logger.info("recorded benchmark into: http://%s:%i/%s", self.conn.host, self.conn.port, path)
+        logger.info("recorded benchmark %s into: %s", self.benchmark_id, self.sink)
         return resp
 
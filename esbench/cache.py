@@ -0,0 +1,273 @@
+# -*- coding: UTF-8 -*-
+# (c)2013 Mik Kocikowski, MIT License (http://opensource.org/licenses/MIT)
+# https://github.com/mkocikowski/esbench
+
+"""Local columnar cache of recorded benchmarks.
+
+Without a cache, each 'show' and 'dump' reads all the records from the
+stats index (or '--stats' sink), and 'show' flattens every observation
+again. With '--cache', the records are first synced into a local cache,
+and then read from it; with '--offline' they are read from the cache
+without syncing, so recorded benchmarks can be analyzed after the cluster
+they were recorded on is gone.
+
+The cache directory (DEFAULT_DIR unless set with '--cache-dir') has a
+subdirectory for each source of records (see source_name()), with:
+
+    - benchmarks.json: {benchmark_id: {"_id", "_source", "watermark"}},
+      the benchmark records, and the 'observation_start' of the newest
+      observation synced for each benchmark
+    - ID.columns.json.gz: the benchmark's flattened observations, column
+      by column (see Table)
+    - ID.records.json.gz: the benchmark's observation records as they were
+      read, for 'dump' and '--latency'
+
+Syncing is incremental. Benchmark records are written when the benchmark
+finishes (and again when a resumed benchmark finishes), so benchmarks whose
+record hasn't changed since the last sync are skipped; for the others only
+observations started at or after the benchmark's watermark are read. The
+cache only grows: benchmarks deleted from the source stay in the cache,
+remove the directory to start over.
+
+"""
+
+import os
+import os.path
+import re
+import gzip
+import json
+import logging
+
+import esbench.sink
+import esbench.analyze
+
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_DIR = os.path.expanduser('~/.esbench/cache')
+
+
+def source_name(source):
+    """Return name of the cache subdirectory for a source of records.
+
+    The name is derived from str() of the esbench.sink sink, which doesn't
+    need a connection, so the cache of a cluster which is gone can be found.
+    """
+
+    return re.sub(r'[^A-Za-z0-9._-]+', '_', str(source)).strip('_')
+
+
+def _write_json(path, data):
+
+    fn = path + '.tmp'
+    if path.endswith('.gz'):
+        with gzip.open(fn, 'wb') as f:
+            f.write(json.dumps(data, sort_keys=True))
+    else:
+        with open(fn, 'w') as f:
+            f.write(json.dumps(data, sort_keys=True, indent=4))
+    os.rename(fn, path)
+
+
+def _read_json(path):
+
+    if path.endswith('.gz'):
+        with gzip.open(path, 'rb') as f:
+            return json.loads(f.read())
+    with open(path, 'rU') as f:
+        return json.loads(f.read())
+
+
+class Table(object):
+    """A benchmark's observations, flattened, stored column by column.
+
+    'columns' is {field name: [value, ...]}, one value for each observation
+    in order of 'observation.meta.observation_sequence_no'. Fields missing
+    from some of the observations are listed in 'missing', {field name:
+    set of observation indexes}, so that null values and missing ones can
+    be told apart. The benchmark's own fields ('benchmark.*') are the same for
+    all its observations, and are stored once, in 'benchmark'.
+    """
+
+    def __init__(self, benchmark=None, columns=None, missing=None, count=0):
+
+        self.benchmark = benchmark or []
+        self.columns = columns or {}
+        self.missing = missing or {}
+        self.count = count
+
+
+    @classmethod
+    def loads(cls, data):
+        missing = {name: set(absent) for name, absent in data['missing'].items()}
+        return cls(benchmark=[tuple(t) for t in data['benchmark']], columns=data['columns'], missing=missing, count=data['count'])
+
+
+    def dumps(self):
+        missing = {name: sorted(absent) for name, absent in self.missing.items()}
+        return {'benchmark': self.benchmark, 'columns': self.columns, 'missing': missing, 'count': self.count}
+
+
+    def append(self, observations):
+        """Add observation records (dicts) to the table, keeping it sorted.
+
+        The observations are added to the end of the columns, which are then
+        reordered only if the sequence numbers are out of order (as they are
+        when observations come in out of order).
+        """
+
+        for observation in observations:
+            row = dict(esbench.analyze.flatten_container({'observation': observation}))
+            for name in row:
+                if name not in self.columns:
+                    self.columns[name] = [None] * self.count
+                    if self.count:
+                        self.missing[name] = set(range(self.count))
+            for name, values in self.columns.items():
+                values.append(row.get(name))
+                if name not in row:
+                    self.missing.setdefault(name, set()).add(self.count)
+            self.count += 1
+
+        seq = self.columns.get('observation.meta.observation_sequence_no', [None] * self.count)
+        order = sorted(range(self.count), key=lambda i: seq[i])
+        if order != range(self.count):
+            position = {i: n for n, i in enumerate(order)}
+            self.columns = {name: [values[i] for i in order] for name, values in self.columns.items()}
+            self.missing = {name: set([position[i] for i in absent]) for name, absent in self.missing.items()}
+
+
+    def row(self, i):
+        """Return {field name: value} of the i-th observation."""
+
+        return {name: values[i] for name, values in self.columns.items() if i not in self.missing.get(name, ())}
+
+
+    def select(self, pattern=".*"):
+        """Return observations as lists of (field name, value) tuples.
+
+        Same as a benchmark group returned by esbench.analyze.group_observations(),
+        but only the field names are matched against 'pattern', the values
+        are taken from the matching columns.
+        """
+
+        regex = re.compile(pattern, re.IGNORECASE)
+        fields = [t for t in self.benchmark if regex.match(t[0])]
+        names = sorted([name for name in self.columns if regex.match(name)])
+        missing = {name: self.missing.get(name, set()) for name in names}
+        observations = []
+        for i in range(self.count):
+            observation = fields + [(name, self.columns[name][i]) for name in names if i not in missing[name]]
+            observations.append(sorted(observation))
+        return observations
+
+
+class Cache(esbench.sink.Sink):
+    """Local cache of the records of one source, see module docstring.
+
+    Has the read interface of the esbench.sink sinks, so it can be read in
+    place of the source, and table() for the flattened observations.
+    """
+
+    def __init__(self, directory):
+
+        self.directory = directory
+        self._index = None
+
+
+    def __str__(self):
+        return "cache:%s" % (self.directory, )
+
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+
+    def index(self):
+
+        if self._index is None:
+            try:
+                self._index = _read_json(self._path('benchmarks.json'))
+            except IOError:
+                self._index = {}
+        return self._index
+
+
+    def prepare(self):
+
+        if not os.path.isdir(self.directory):
+            os.makedirs(self.directory)
+
+
+    def sync(self, source):
+        """Read new records from 'source' (an esbench.sink sink) into the cache.
+
+        Returns the number of observations read.
+
+        Raises:
+            IOError: the source couldn't be read
+        """
+
+        self.prepare()
+        index = self.index()
+        count = 0
+        for benchmark in source.benchmarks():
+            cached = index.get(benchmark['_id'])
+            if cached and cached['_source'] == benchmark['_source']:
+                continue
+            watermark = cached['watermark'] if cached else None
+            observations = list(source.observations(benchmark['_id'], since=watermark))
+            records = self.observations(benchmark['_id']) if cached else []
+            synced = set([r['_id'] for r in records])
+            new = [o for o in observations if o['_id'] not in synced]
+
+            table = self.table(benchmark['_id']) if cached else Table()
+            table.benchmark = sorted(esbench.analyze.flatten_container({'benchmark': benchmark['_source']}))
+            table.append([o['_source'] for o in new])
+            records.extend(new)
+            _write_json(self._path("%s.columns.json.gz" % benchmark['_id']), table.dumps())
+            _write_json(self._path("%s.records.json.gz" % benchmark['_id']), records)
+
+            starts = [o['_source']['meta']['observation_start'] for o in records]
+            index[benchmark['_id']] = {'_id': benchmark['_id'], '_source': benchmark['_source'], 'watermark': max(starts) if starts else None}
+            # written after each benchmark, so that an interrupted sync
+            # carries on where it stopped
+            _write_json(self._path('benchmarks.json'), index)
+            count += len(new)
+            logger.debug("synced %i observations of benchmark %s", len(new), benchmark['_id'])
+
+        logger.info("synced %i observations from %s into %s", count, source, self)
+        return count
+
+
+    def benchmarks(self):
+
+        records = [{'_id': b['_id'], '_source': b['_source']} for b in self.index().values()]
+        return sorted(records, key=lambda r: r['_source']['meta']['benchmark_start'])
+
+
+    def observations(self, benchmark_id, since=None):
+
+        try:
+            records = _read_json(self._path("%s.records.json.gz" % benchmark_id))
+        except IOError:
+            return []
+        records = [r for r in records if since is None or r['_source']['meta']['observation_start'] >= since]
+        return sorted(records, key=lambda r: r['_source']['meta']['observation_start'])
+
+
+    def table(self, benchmark_id):
+        """Return Table of the benchmark's observations, empty if none."""
+
+        try:
+            return Table.loads(_read_json(self._path("%s.columns.json.gz" % benchmark_id)))
+        except IOError:
+            return Table()
+
+
+def open_cache(source, directory=DEFAULT_DIR):
+    """Return Cache of the records of 'source' (an esbench.sink sink)."""
+
+    return Cache(os.path.join(directory, source_name(source)))
+
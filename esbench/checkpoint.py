@@ -0,0 +1,141 @@
+# -*- coding: UTF-8 -*-
+# (c)2013 Mik Kocikowski, MIT License (http://opensource.org/licenses/MIT)
+# https://github.com/mkocikowski/esbench
+
+"""Checkpoints, for resuming benchmarks which didn't finish.
+
+With '--checkpoint' (or '--checkpoint-dir'), after each observation the
+benchmark saves a checkpoint, a json file named after the benchmark id, in
+the checkpoint directory (DEFAULT_DIR unless set with '--checkpoint-dir'):
+
+    {
+        "benchmark_id": "2a4fb87d",
+        "benchmark_start": "2014-01-07T00:01:02Z",
+        "t_elapsed": 1234.5,        # seconds run so far
+        "observations": 3,          # observations recorded
+        "feed": {"path": null, "lines": 3000, "size_b": 123456},
+        "doc_count": 3000,          # documents in the index
+        "config_hash": "...",       # see config_hash()
+    }
+
+To resume, run the same command again, with '--resume ID' added. The
+config must be the same as that of the interrupted run (except for the
+settings in IGNORED_KEYS), the feed is skipped to where loading stopped,
+and observation sequence numbers carry on from the last one recorded. The
+checkpoint is removed when the benchmark finishes.
+
+If the benchmark was interrupted while loading data, the index has more
+documents than the checkpoint accounts for. These are the lines which
+follow in the feed (the data is loaded in order), so they are skipped too,
+and counted towards the next batch, see resume_feed().
+
+Benchmarks run with '--workers' can't be resumed: the workers load their
+chunks of the feed concurrently, so the documents in the index aren't a
+prefix of the feed.
+
+"""
+
+import os
+import os.path
+import json
+import hashlib
+import logging
+import itertools
+
+import esbench
+
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_DIR = os.path.expanduser('~/.esbench/checkpoints')
+
+# settings which may differ between a run and its resumption
+IGNORED_KEYS = ('resume', 'name', 'verbose', 'checkpoint', 'checkpoint_dir')
+
+
+def config_hash(config):
+    """Return hash of the config, ignoring IGNORED_KEYS."""
+
+    c = dict(config)
+    c['config'] = {k: v for k, v in config['config'].items() if k not in IGNORED_KEYS}
+    return hashlib.md5(json.dumps(c, sort_keys=True)).hexdigest()
+
+
+def path(directory, benchmark_id):
+    return os.path.join(directory, "%s.json" % (benchmark_id, ))
+
+
+def save(directory, checkpoint):
+    """Write checkpoint, replacing the previous one atomically."""
+
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+    fn = path(directory, checkpoint['benchmark_id'])
+    with open(fn + '.tmp', 'w') as f:
+        f.write(json.dumps(checkpoint, sort_keys=True, indent=4))
+    os.rename(fn + '.tmp', fn)
+    logger.debug("saved checkpoint: %s", fn)
+    return fn
+
+
+def load(directory, benchmark_id):
+    """Return checkpoint.
+
+    Raises:
+        IOError: no checkpoint for the benchmark
+    """
+
+    with open(path(directory, benchmark_id), 'rU') as f:
+        return json.loads(f.read())
+
+
+def remove(directory, benchmark_id):
+
+    try:
+        os.remove(path(directory, benchmark_id))
+    except OSError:
+        pass
+
+
+def verify(checkpoint, config, doc_count):
+    """Check that the benchmark can be resumed.
+
+    Args:
+        checkpoint: dict
+        config: config of the resuming run
+        doc_count: number of documents in the test index
+
+    Raises:
+        ValueError: the benchmark was run with workers, the config differs
+            from the checkpoint's, or the index has fewer documents than
+            the checkpoint accounts for
+    """
+
+    if config['config'].get('workers'):
+        raise ValueError("can't resume benchmark %s: benchmarks run with workers can't be resumed" % (checkpoint['benchmark_id'], ))
+    if config_hash(config) != checkpoint['config_hash']:
+        raise ValueError("can't resume benchmark %s: config differs from that of the interrupted run" % (checkpoint['benchmark_id'], ))
+    if doc_count < checkpoint['doc_count']:
+        raise ValueError("can't resume benchmark %s: index '%s' has %i documents, expected at least %i" % (checkpoint['benchmark_id'], esbench.TEST_INDEX_NAME, doc_count, checkpoint['doc_count']))
+
+
+def resume_feed(lines, checkpoint, doc_count):
+    """Skip lines already loaded into the index.
+
+    Skips the lines loaded up to the checkpoint, and then those which were
+    loaded after it, up to 'doc_count' in total. Returns (count, size_b) of
+    the latter, which are part of the next batch.
+    """
+
+    skipped = sum(1 for _ in itertools.islice(lines, checkpoint['feed']['lines']))
+    if skipped < checkpoint['feed']['lines']:
+        raise ValueError("can't resume benchmark %s: feed has only %i lines, expected at least %i" % (checkpoint['benchmark_id'], skipped, checkpoint['feed']['lines']))
+    count = 0
+    size_b = 0
+    for line in itertools.islice(lines, doc_count - checkpoint['doc_count']):
+        count += 1
+        size_b += len(line)
+    logger.info("skipped %i lines loaded before the checkpoint, and %i loaded after it", skipped, count)
+    return (count, size_b)
+
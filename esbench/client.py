@@ -7,6 +7,7 @@ import argparse
 import itertools
 import logging
 import contextlib
+import errno
 import sys
 import os.path
 import socket
@@ -15,10 +16,69 @@ import json
 import esbench.api
 import esbench.analyze
 import esbench.bench
+import esbench.cache
+import esbench.checkpoint
+import esbench.data
+import esbench.distributed
+import esbench.histogram
+import esbench.sink
+import esbench.sweep
 
 
 logger = logging.getLogger(__name__)
 
+def _add_run_arguments(parser):
+    """Add arguments shared by the 'run' and 'sweep' commands."""
+
+    parser.add_argument('-v', '--verbose', action='store_true')
+    parser.add_argument('--host', type=str, default='localhost', help='elasticsearch host; (%(default)s)')
+    parser.add_argument('--port', type=int, default=9200, help='elasticsearch port; (%(default)s)')
+
+    parser.add_argument('--segments', type=int, metavar='N', default=None, help='if set, run optimize before each observation')
+    parser.add_argument('--optimize-async', action='store_true', help="if set, with --segments, don't wait on the optimize call, but poll segment and merge stats until the target number of segments is reached, recording the progress with each observation; (%(default)s)")
+    parser.add_argument('--optimize-timeout', metavar='SECONDS', type=float, default=None, help='with --optimize-async, stop waiting for the merges after SECONDS, and run the observation anyway')
+    parser.add_argument('--shards', metavar='N', action='store', type=int, help="create test index with N primaries")
+    parser.add_argument('--observations', metavar='N', type=int, default=None, help='run n observations')
+    parser.add_argument('--reps', metavar='N', type=int, default=None, help='run each query n times per observation')
+
+    parser.add_argument('--duration', metavar='SECONDS', type=float, default=None, help="if set, run each query (or the query mix) for SECONDS per observation, instead of '--reps' times")
+    parser.add_argument('--min-reps', metavar='N', type=int, default=None, help="with '--duration' or '--precision', run each query at least n times; with '--mix' (or '--replay') n is the total number of requests, all queries together")
+    parser.add_argument('--max-reps', metavar='N', type=int, default=None, help="with '--duration' or '--precision', run each query at most n times; with '--mix' (or '--replay') n is the total number of requests, all queries together")
+    parser.add_argument('--precision', metavar='REL', type=float, default=None, help="if set, run each query until the confidence interval of its latency is within +/- REL (for example 0.05) of the estimate, bounded by '--min-reps', '--max-reps', and '--duration'")
+    parser.add_argument('--precision-stat', metavar='STAT', type=parse_stat, default=None, help="latency stat for '--precision': 'mean', or a percentile, like 'p90' or 'p99_9'; (mean)")
+    parser.add_argument('--confidence', type=float, choices=sorted(esbench.histogram.Z_SCORES), default=None, help="confidence level for '--precision'; (0.95)")
+    parser.add_argument('--warmup', metavar='N', type=int, default=None, help='before each query is run in an observation, run it n times as warmup, in a separate stats group')
+    parser.add_argument('--warmup-time', metavar='SECONDS', type=float, default=None, help='warm up each query for at least SECONDS')
+    parser.add_argument('--cold', metavar='N', type=int, default=None, help="before each query is warmed up and run, run it N times 'cold', each time after clearing the index caches, in a separate stats group ('[query]_cold')")
+    parser.add_argument('--drop-os-cache', action='store_true', help="with --cold, also drop the OS page cache before each cold execution; only useful when ES runs on the same host, linux only, needs root; (%(default)s)")
+    parser.add_argument('--clients', metavar='N', type=int, default=None, help='number of concurrent query clients, each with its own connection')
+    parser.add_argument('--mix', action='store_true', help="if set, run queries interleaved, each query's share proportional to its 'weight' setting; (%(default)s)")
+    parser.add_argument('--seed', metavar='N', type=int, default=None, help='seed for shuffling the query mix')
+    parser.add_argument('--rate', metavar='QPS', type=float, default=None, help='if set, send queries open loop, at QPS requests per second, regardless of response times; latency is measured from the scheduled send time')
+    parser.add_argument('--msearch', metavar='K', type=int, default=None, help='if set, send queries in batches of K with the _msearch api; with --rate, QPS is _msearch requests per second')
+    parser.add_argument('--arrivals', choices=['constant', 'poisson'], default=None, help="inter-arrival times of open loop requests; (constant)")
+    parser.add_argument('--replay', metavar='PATH', type=str, default=None, help="if set, instead of running the queries, replay the requests in the request log at PATH (json lines with 'timestamp', 'path', 'body') in each observation, recording them in the stats groups of the queries which claim them with their 'replay_match' setting; see esbench/replay.py")
+    parser.add_argument('--replay-speed', metavar='X', type=str, default=None, help="with --replay, replay X times faster than the logged timing, or 'max' to replay as fast as the clients can; (1.0)")
+    parser.add_argument('--mixed', action='store_true', help="if set, run queries in the background while data is being loaded, recording latencies in windows tagged with the indexing rate; not supported by 'sweep'; (%(default)s)")
+    parser.add_argument('--mixed-window', metavar='SECONDS', type=float, default=None, help="length of the latency window in 'mixed' mode")
+
+    parser.add_argument('--sample-interval', metavar='SECONDS', type=float, default=None, help='if set, sample cluster stats (heap, gc, thread pools, merges, cpu) every SECONDS while loading data and running observations, and record the time series with each observation')
+
+    parser.add_argument('--stats', metavar='SINK', type=str, default=None, help="where to record / read benchmark stats: 'es:HOST[:PORT]' (stats index on a separate ES host), 'jsonl:PATH' (local file), or 'sqlite:PATH' (local database); default: the benchmarked cluster")
+
+    parser.add_argument('--client-profile', metavar='DIR', type=str, default=None, help="if set, profile the client with cProfile while loading data and running observations, writing the stats to files in DIR (for diagnosis only, profiling slows the client down)")
+
+    parser.add_argument('--workers', metavar='HOST:PORT,...', type=lambda s: [a for a in s.split(',') if a.strip()], default=None, help="if set, load data and run queries with the workers (started with 'esbench worker') at these addresses, merging their results into single observations; 'rate' is then split between the workers, other settings are per worker")
+
+    parser.add_argument('--no-load', action='store_true', help="if set, do not load data, just run observations")
+    parser.add_argument('--append', action='store_true', help="if set, append data to the index; (%(default)s)")
+    parser.add_argument('--data', metavar='PATH', type=str, action='store', default=None, help="read data from PATH; set to /dev/stdin to read from stdin. Set this only if you want to provide your own data, by default US Patent Application data will be used; (%(default)s)")
+
+    parser.add_argument('--config-file-path', metavar='', type=str, default='%s/config.json' % (os.path.dirname(os.path.abspath(__file__)), ), help="path to json config file; (%(default)s)")
+    parser.add_argument('--name', type=str, action='store', default="%s::%s" % (socket.gethostname(), esbench.bench.timestamp()), help="human readable name of the benchmark; (%(default)s)")
+    parser.add_argument('maxsize', nargs="?", type=str, default='1mb', help="max size of the index, as either the number of documents or byte size. To index 100 documents, set it to 100; to index 1gb of documents, set it to 1gb. When setting the byte size of data, best effort will be made to run observations at even intervals, and the index bytesize will be ballpark, not the exact figure you specified. The default USPTO Patent Application data set has 123GB of data / 2.5m documents, so if you want more, you'll need to look elsewhere (or feed the same data in more than once); (%(default)s)")
+
+
 def args_parser():
 
     epilog = """
@@ -37,22 +97,32 @@ curl -XDELETE localhost:9200/esbench_* # delete existing benchmarks
 """
 
     parser_run = subparsers.add_parser('run', help='run a benchmark', epilog=epilog_run, formatter_class=argparse.RawDescriptionHelpFormatter)
-    parser_run.add_argument('-v', '--verbose', action='store_true')
-    parser_run.add_argument('--host', type=str, default='localhost', help='elasticsearch host; (%(default)s)')
-    parser_run.add_argument('--port', type=int, default=9200, help='elasticsearch port; (%(default)s)')
+    _add_run_arguments(parser_run)
+    parser_run.add_argument('--resume', metavar='ID', type=str, default=None, help="resume interrupted benchmark ID from its checkpoint; run with the same options as the interrupted run")
+    parser_run.add_argument('--checkpoint', action='store_true', help="if set, save a checkpoint after each observation, so that an interrupted run can be resumed with '--resume'; (%(default)s)")
+    parser_run.add_argument('--checkpoint-dir', metavar='DIR', type=str, default=None, help="save checkpoints to, and resume from, DIR, implies '--checkpoint' (%s)" % (esbench.checkpoint.DEFAULT_DIR, ))
+
+    epilog_sweep = """
+Sample matrix file:
 
-    parser_run.add_argument('--segments', type=int, metavar='N', default=None, help='if set, run optimize before each observation')
-    parser_run.add_argument('--shards', metavar='N', action='store', type=int, help="create test index with N primaries")
-    parser_run.add_argument('--observations', metavar='N', type=int, default=None, help='run n observations')
-    parser_run.add_argument('--reps', metavar='N', type=int, default=None, help='run each query n times per observation')
+{
+    "index.settings.index.number_of_shards": [1, 2, 4],
+    "index.settings.index.refresh_interval": ["1s", "30s"],
+    "config.segments": [null, 5, 1]
+}
+
+Data is loaded once; see esbench/sweep.py for how it is reused.
+"""
 
-    parser_run.add_argument('--no-load', action='store_true', help="if set, do not load data, just run observations")
-    parser_run.add_argument('--append', action='store_true', help="if set, append data to the index; (%(default)s)")
-    parser_run.add_argument('--data', metavar='PATH', type=str, action='store', default=None, help="read data from PATH; set to /dev/stdin to read from stdin. Set this only if you want to provide your own data, by default US Patent Application data will be used; (%(default)s)")
+    parser_sweep = subparsers.add_parser('sweep', help='run a benchmark for each combination of parameters, reusing loaded data', epilog=epilog_sweep, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser_sweep.add_argument('--matrix', metavar='PATH', type=str, required=True, help="path to json file mapping parameters (dotted paths into the config, like 'config.segments') to lists of values")
+    _add_run_arguments(parser_sweep)
 
-    parser_run.add_argument('--config-file-path', metavar='', type=str, default='%s/config.json' % (os.path.dirname(os.path.abspath(__file__)), ), help="path to json config file; (%(default)s)")
-    parser_run.add_argument('--name', type=str, action='store', default="%s::%s" % (socket.gethostname(), esbench.bench.timestamp()), help="human readable name of the benchmark; (%(default)s)")
-    parser_run.add_argument('maxsize', nargs="?", type=str, default='1mb', help="max size of the index, as either the number of documents or byte size. To index 100 documents, set it to 100; to index 1gb of documents, set it to 1gb. When setting the byte size of data, best effort will be made to run observations at even intervals, and the index bytesize will be ballpark, not the exact figure you specified. The default USPTO Patent Application data set has 123GB of data / 2.5m documents, so if you want more, you'll need to look elsewhere (or feed the same data in more than once); (%(default)s)")
+    parser_worker = subparsers.add_parser('worker', help="load data and run queries for a benchmark run with '--workers'")
+    parser_worker.add_argument('-v', '--verbose', action='store_true')
+    parser_worker.add_argument('--host', type=str, default='localhost', help='elasticsearch host; (%(default)s)')
+    parser_worker.add_argument('--port', type=int, default=9200, help='elasticsearch port; (%(default)s)')
+    parser_worker.add_argument('--listen', metavar='HOST:PORT', type=str, default='0.0.0.0:%i' % esbench.distributed.DEFAULT_WORKER_PORT, help="address to listen on for the coordinator; (%(default)s)")
 
     epilog_show = """
 Sample use:
@@ -87,17 +157,33 @@ the fields into a csv and graph /analyze it with whatever you have.
     parser_show.add_argument('--port', type=int, default=9200, help='elasticsearch port; (%(default)s)')
     parser_show.add_argument('--format', choices=['csv', 'tab'], default='csv', help="output format; (%(default)s)")
     parser_show.add_argument('--fields', metavar='REGEX', type=str, action='store', default=esbench.analyze.FIELDS, help='default: %(default)s')
+    parser_show.add_argument('--latency', action='store_true', help="if set, show client latency percentiles for each query, computed over all observations of each benchmark; (%(default)s)")
+    parser_show.add_argument('--stats', metavar='SINK', type=str, default=None, help="where to record / read benchmark stats: 'es:HOST[:PORT]' (stats index on a separate ES host), 'jsonl:PATH' (local file), or 'sqlite:PATH' (local database); default: the benchmarked cluster")
+    parser_show.add_argument('--cache', action='store_true', help="sync the records into a local cache first, and read them from there; (%(default)s)")
+    parser_show.add_argument('--cache-dir', metavar='DIR', type=str, default=esbench.cache.DEFAULT_DIR, help="local cache directory; (%(default)s)")
+    parser_show.add_argument('--offline', action='store_true', help="read the records from the local cache without syncing it, for when the cluster is gone; (%(default)s)")
     parser_show.add_argument('ids', nargs='*', default=['all'], help='benchmark ids; (default: show all benchmarks)')
 
     parser_dump = subparsers.add_parser('dump', help='curl dump recorded benchmarks')
     parser_dump.add_argument('-v', '--verbose', action='store_true')
     parser_dump.add_argument('--host', type=str, default='localhost', help='elasticsearch host; (%(default)s)')
     parser_dump.add_argument('--port', type=int, default=9200, help='elasticsearch port; (%(default)s)')
+    parser_dump.add_argument('--stats', metavar='SINK', type=str, default=None, help="where to record / read benchmark stats: 'es:HOST[:PORT]' (stats index on a separate ES host), 'jsonl:PATH' (local file), or 'sqlite:PATH' (local database); default: the benchmarked cluster")
+    parser_dump.add_argument('--cache', action='store_true', help="sync the records into a local cache first, and read them from there; (%(default)s)")
+    parser_dump.add_argument('--cache-dir', metavar='DIR', type=str, default=esbench.cache.DEFAULT_DIR, help="local cache directory; (%(default)s)")
+    parser_dump.add_argument('--offline', action='store_true', help="read the records from the local cache without syncing it, for when the cluster is gone; (%(default)s)")
     parser_dump.add_argument('ids', nargs='*', default=['all'], help='benchmark ids; (default: show all benchmarks)')
 
     return parser
 
 
+def parse_stat(value):
+    """Return latency stat name, see esbench.histogram.stat_quantile()."""
+
+    esbench.histogram.stat_quantile(value)
+    return value
+
+
 def parse_maxsize(value):
 
     max_n = 0
@@ -147,9 +233,97 @@ def merge_config(argv, config):
     return config
 
 
+def checkpoint_dir(config):
+    """Return directory checkpoints are saved in, None if not checkpointing.
+
+    Checkpointing is opt in, with '--checkpoint' or '--checkpoint-dir';
+    a resumed run carries on checkpointing.
+    """
+
+    c = config['config']
+    if c.get('checkpoint_dir'):
+        return c['checkpoint_dir']
+    if c.get('checkpoint') or c.get('resume'):
+        return esbench.checkpoint.DEFAULT_DIR
+    return None
+
+
+def load_checkpoint(conn, config, checkpoint_dir):
+    """Return (checkpoint, index doc count) for the benchmark to resume.
+
+    Raises:
+        IOError: no checkpoint for the benchmark
+        ValueError: the benchmark can't be resumed, see esbench.checkpoint.verify()
+    """
+
+    checkpoint = esbench.checkpoint.load(checkpoint_dir, config['config']['resume'])
+    esbench.api.index_refresh(conn, esbench.TEST_INDEX_NAME)
+    resp = esbench.api.index_count(conn, esbench.TEST_INDEX_NAME)
+    if resp.status != 200:
+        raise ValueError("can't resume benchmark %s: couldn't count documents in index '%s': %s" % (checkpoint['benchmark_id'], esbench.TEST_INDEX_NAME, resp.data))
+    doc_count = json.loads(resp.data)['count']
+    esbench.checkpoint.verify(checkpoint, config, doc_count)
+    return (checkpoint, doc_count)
+
+
+def sync_cache(args, conn):
+    """Return esbench.cache.Cache to read records from, None if not used.
+
+    The cache is synced first, unless '--offline'; if that fails, the
+    records already in the cache are used.
+    """
+
+    if not (args.cache or args.offline):
+        return None
+    source = esbench.sink.from_spec(args.stats, conn=conn)
+    cache = esbench.cache.open_cache(source, args.cache_dir)
+    if not args.offline:
+        try:
+            cache.sync(source)
+        except IOError as exc:
+            logger.warning("couldn't sync %s from %s, reading cached records: %s", cache, source, exc)
+    return cache
+
+
+def batches(lines, config, observations, partial=(0, 0)):
+    """Return iterator of the batches to load, one per observation.
+
+    When resuming, 'observations' is the number of observations left, and
+    batches are the size they would have been in the interrupted run; the
+    first is short by the 'partial' (count, size_b) lines loaded after the
+    checkpoint was saved, see esbench.checkpoint.resume_feed().
+    """
+
+    total = config['config']['observations']
+    max_n = config['config']['max_n'] // total
+    max_byte_size = config['config']['max_byte_size'] // total
+    if not (max_n or max_byte_size):
+        raise ValueError("must specify either max_n or max_byte_size")
+    first = esbench.data.batch_iterator(
+        lines=lines,
+        max_batch_n=max(max_n - partial[0], 0),
+        max_batch_byte_size=max(max_byte_size - partial[1], 0),
+    )
+    if observations == 1:
+        return iter([first])
+    rest = esbench.data.batches_iterator(lines=lines, batch_count=observations-1, max_n=max_n*(observations-1), max_byte_size=max_byte_size*(observations-1))
+    return itertools.chain([first], rest)
+
+
+def parse_args(argv=None):
+    """Return parsed command line arguments, exit on invalid ones."""
+
+    parser = args_parser()
+    args = parser.parse_args(argv)
+    if args.command == 'sweep' and args.mixed:
+        # a sweep loads the data once, before any of its benchmarks run
+        parser.error("argument --mixed: not supported by 'sweep'")
+    return args
+
+
 def main():
 
-    args = args_parser().parse_args()
+    args = parse_args()
 
     if args.verbose: logging.basicConfig(
         level=logging.DEBUG,
@@ -163,26 +337,78 @@ def main():
             if args.command == 'run':
 
                 config = merge_config(args, load_config(args.config_file_path))
-                benchmark = esbench.bench.Benchmark(config=config, conn=conn)
-                benchmark.prepare()
-                if config['config']['no_load']:
-                    for _ in range(config['config']['observations']):
-                        benchmark.observe()
-                else:
+                # records are written in the background, on their own
+                # connection, so that they don't hold up the benchmark
+                sink = esbench.sink.AsyncSink(esbench.sink.from_spec(config['config']['stats'], conn=conn.clone()))
+                coordinator = None
+                # whatever happens, the records queued so far are written
+                try:
+                    coordinator = esbench.distributed.Coordinator(config['config']['workers']) if config['config']['workers'] else None
+                    checkpoints = checkpoint_dir(config)
+                    benchmark = esbench.bench.Benchmark(config=config, conn=conn, sink=sink, coordinator=coordinator, checkpoint_dir=checkpoints)
+                    benchmark.prepare()
+                    checkpoint, doc_count = None, 0
+                    if config['config']['resume']:
+                        checkpoint, doc_count = load_checkpoint(conn, config, checkpoints)
+                    # observations still to run
+                    observations = config['config']['observations'] - (checkpoint['observations'] if checkpoint else 0)
+                    if config['config']['no_load']:
+                        if checkpoint:
+                            benchmark.resume(checkpoint)
+                        for _ in range(observations):
+                            benchmark.observe()
+                    else:
+                        with esbench.data.feed(path=config['config']['data']) as feed:
+                            partial = (0, 0)
+                            if checkpoint:
+                                partial = esbench.checkpoint.resume_feed(feed, checkpoint, doc_count)
+                                benchmark.resume(checkpoint, partial)
+                            if observations > 0:
+                                benchmark.run(batches(feed, config, observations, partial))
+
+                    benchmark.record()
+                    benchmark.remove_checkpoint()
+                finally:
+                    sink.close()
+                    if coordinator:
+                        coordinator.close()
+
+            elif args.command == 'sweep':
+
+                config = merge_config(args, load_config(args.config_file_path))
+                sink = esbench.sink.AsyncSink(esbench.sink.from_spec(config['config']['stats'], conn=conn.clone()))
+                coordinator = None
+                try:
+                    coordinator = esbench.distributed.Coordinator(config['config']['workers']) if config['config']['workers'] else None
+                    sweep = esbench.sweep.Sweep(config=config, conn=conn, sink=sink, matrix=load_config(args.matrix), coordinator=coordinator)
                     with esbench.data.feed(path=config['config']['data']) as feed:
-                        batches = esbench.data.batches_iterator(lines=feed, batch_count=config['config']['observations'], max_n=config['config']['max_n'], max_byte_size=config['config']['max_byte_size'])
-                        benchmark.run(batches)
+                        # all the data is loaded at once, in one 'batch'
+                        batches = esbench.data.batches_iterator(lines=feed, batch_count=1, max_n=config['config']['max_n'], max_byte_size=config['config']['max_byte_size'])
+                        sweep.run(itertools.chain.from_iterable(batches))
+                finally:
+                    sink.close()
+                    if coordinator:
+                        coordinator.close()
 
-                benchmark.record()
+            elif args.command == 'worker':
+                esbench.distributed.serve(esbench.distributed.parse_address(args.listen), conn)
 
             elif args.command == 'show':
-                esbench.analyze.show_benchmarks(conn=conn, benchmark_ids=args.ids, fields=args.fields, fmt=args.format, fh=sys.stdout)
+                sink = esbench.sink.from_spec(args.stats) if args.stats else None
+                cache = sync_cache(args, conn)
+                esbench.analyze.show_benchmarks(conn=conn, benchmark_ids=args.ids, fields=args.fields, fmt=args.format, fh=sys.stdout, latency=args.latency, sink=sink, cache=cache)
 
             elif args.command == 'dump':
-                esbench.analyze.dump_benchmarks(conn=conn, benchmark_ids=args.ids)
+                sink = esbench.sink.from_spec(args.stats) if args.stats else None
+                cache = sync_cache(args, conn)
+                esbench.analyze.dump_benchmarks(conn=conn, benchmark_ids=args.ids, sink=cache if cache is not None else sink)
 
         except IOError as exc:
-            logger.debug(exc, exc_info=False)
+            # broken pipe is what 'esbench show | head' ends with
+            if exc.errno == errno.EPIPE:
+                logger.debug(exc, exc_info=False)
+            else:
+                logger.error(exc, exc_info=False)
         except Exception as exc:
             logger.error(exc, exc_info=True)
 
@@ -0,0 +1,372 @@
+# -*- coding: UTF-8 -*-
+# (c)2013 Mik Kocikowski, MIT License (http://opensource.org/licenses/MIT)
+# https://github.com/mkocikowski/esbench
+
+"""Load generation spread over multiple worker processes.
+
+A single esbench process can't saturate a multi-node cluster. Start a worker
+('esbench worker') on each of a number of hosts (or several on one host),
+and run the benchmark with '--workers host:port,host:port,...'. The process
+running the benchmark is then the coordinator: it still creates the index,
+optimizes, and records the stats, but the data is loaded, and the queries
+are run, by the workers:
+
+    - load: the batch of data is split into chunks of LOAD_CHUNK_SIZE lines,
+      and the chunks are handed out to the workers as they finish the
+      previous ones
+    - observe: each worker runs the observation's queries, with the
+      observation's settings, starting at the same time; the 'rate' of an
+      open loop run is the total rate, split evenly between the workers,
+      all other settings ('reps', 'clients', 'duration', ...) are per worker.
+      Cold executions ('cold') are the exception: they are run by the
+      coordinator, before the workers start, as clearing the caches while
+      other workers are running queries would skew both the cold and the
+      warm numbers ('drop_os_cache' drops the coordinator's page cache)
+
+Workers run the queries with the coordinator's observation id, so the ES
+stats groups cover the queries run by all the workers. Each worker sends
+back its query counters and latency histograms (see SearchQuery.state()),
+which the coordinator merges, and then records a single observation. The
+clocks of the workers and the coordinator needn't be in sync: the offset of
+each worker's clock is measured when connecting, and start times are sent
+in the worker's time.
+
+The protocol is plain TCP, one json object per line. The coordinator sends
+a request, {"cmd": ...}, and waits for the reply; a reply with an 'error'
+key means the request failed. A worker which doesn't reply in time (within
+DEFAULT_TIMEOUT, or for 'observe' OBSERVE_TIMEOUT on top of the time the
+observation is set to run for) fails the request too. Commands:
+
+    - clock: reply {"time": worker's time.time()}
+    - load: {"lines": [...]}, reply {"count": n, "size_b": bytes}
+    - observe: {"benchmark_id", "observation_id", "queries", "settings",
+      "t_start"}, reply {"t_client", "client", "queries": {name: state},
+      "warmup_queries": {name: state}}
+
+"""
+
+import json
+import time
+import socket
+import logging
+import threading
+import itertools
+import SocketServer
+
+import esbench
+import esbench.api
+import esbench.bench
+
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_WORKER_PORT = 9400
+LOAD_CHUNK_SIZE = 500
+# how far in the future observations are started, so that all the workers
+# get the request in time
+START_DELAY = 0.5
+# seconds to wait for a worker to connect, or to reply to a request
+DEFAULT_TIMEOUT = 60.0
+# seconds to wait for the reply to 'observe', on top of the observation's
+# 'duration' and 'warmup_time', see _observe_timeout()
+OBSERVE_TIMEOUT = 600.0
+
+
+def parse_address(address):
+    """Return (host, port) for 'host[:port]'."""
+
+    host, _, port = address.strip().partition(':')
+    return (host or 'localhost', int(port or DEFAULT_WORKER_PORT))
+
+
+class WorkerHandler(SocketServer.StreamRequestHandler):
+    """Handles one coordinator connection, until it is closed."""
+
+    def handle(self):
+
+        logger.info("coordinator connected from %s:%i", *self.client_address)
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                break
+            try:
+                request = json.loads(line)
+                reply = self.server.dispatch(request)
+            except Exception as exc:
+                logger.error("request failed: %s", exc, exc_info=True)
+                reply = {'error': "%s: %s" % (type(exc).__name__, exc)}
+            self.wfile.write(json.dumps(reply))
+            self.wfile.write("\n")
+            self.wfile.flush()
+        logger.info("coordinator disconnected")
+
+
+class Worker(SocketServer.TCPServer):
+    """Loads data and runs queries, as requested by the coordinator.
+
+    Serves one coordinator at a time, each request in turn.
+    """
+
+    allow_reuse_address = True
+
+    def __init__(self, address, conn):
+
+        SocketServer.TCPServer.__init__(self, address, WorkerHandler)
+        self.conn = conn
+
+
+    def dispatch(self, request):
+
+        cmd = request['cmd']
+        if cmd == 'clock':
+            return {'time': time.time()}
+        if cmd == 'load':
+            return self.load(request['lines'])
+        if cmd == 'observe':
+            return self.observe(request)
+        raise ValueError("invalid command: '%s'" % cmd)
+
+
+    def load(self, lines):
+
+        count = 0
+        size_b = 0
+        for line in lines:
+            line = line.encode('utf-8')
+            size_b += len(line)
+            esbench.api.document_post(self.conn, esbench.TEST_INDEX_NAME, esbench.TEST_DOCTYPE_NAME, line)
+            count += 1
+        return {'count': count, 'size_b': size_b}
+
+
+    def observe(self, request):
+
+        settings = {str(k): v for k, v in request['settings'].items()}
+        observation = esbench.bench.Observation(
+            conn=self.conn,
+            benchmark_id=request['benchmark_id'],
+            observation_id=request['observation_id'],
+            queries=request['queries'],
+            **settings
+        )
+        # run by the coordinator
+        observation.cold_queries = {}
+        delay = request['t_start'] - time.time()
+        if delay > 0:
+            time.sleep(delay)
+        else:
+            logger.warning("observation %s started %.3fs late", observation.observation_id, -delay)
+        observation.run()
+        return {
+            't_client': observation.t_client,
+            'client': observation.client['observe'],
+            'queries': {q.name: q.state() for q in observation.queries},
+            'warmup_queries': {name: q.state() for name, q in observation.warmup_queries.items()},
+        }
+
+
+def serve(address, conn):
+    """Run a worker listening on address (host, port), until interrupted."""
+
+    worker = Worker(address, conn)
+    logger.info("worker listening on %s:%i", *worker.server_address)
+    try:
+        worker.serve_forever()
+    finally:
+        worker.server_close()
+
+
+class WorkerClient(object):
+    """Coordinator's connection to a worker."""
+
+    def __init__(self, host, port, timeout=DEFAULT_TIMEOUT):
+
+        self.address = "%s:%i" % (host, port)
+        self.timeout = timeout
+        try:
+            self.sock = socket.create_connection((host, port), timeout)
+        except socket.error as exc:
+            raise IOError("couldn't connect to worker %s: %s" % (self.address, exc))
+        self._rfile = self.sock.makefile('rb')
+        self._wfile = self.sock.makefile('wb')
+        self.offset = 0.0 # worker's clock minus coordinator's clock
+
+
+    def __str__(self):
+        return self.address
+
+
+    def call(self, request, timeout=None):
+        """Send request, return reply.
+
+        'timeout' is in seconds, the client's 'timeout' if not set.
+
+        Raises:
+            IOError: connection closed, the worker didn't reply in time, or
+                the request failed on the worker
+        """
+
+        timeout = timeout or self.timeout
+        self.sock.settimeout(timeout)
+        try:
+            self._wfile.write(json.dumps(request))
+            self._wfile.write("\n")
+            self._wfile.flush()
+            line = self._rfile.readline()
+        except socket.timeout:
+            raise IOError("worker %s didn't reply to '%s' in %.0fs" % (self.address, request['cmd'], timeout))
+        except socket.error as exc:
+            raise IOError("worker %s: %s" % (self.address, exc))
+        if not line:
+            raise IOError("worker %s closed the connection" % self.address)
+        reply = json.loads(line)
+        if 'error' in reply:
+            raise IOError("worker %s: %s" % (self.address, reply['error']))
+        return reply
+
+
+    def sync_clock(self):
+        """Estimate the worker's clock offset, assuming symmetric delay."""
+
+        t1 = time.time()
+        reply = self.call({'cmd': 'clock'})
+        t2 = time.time()
+        self.offset = reply['time'] - ((t1 + t2) / 2.0)
+        return self.offset
+
+
+    def close(self):
+
+        self._rfile.close()
+        self._wfile.close()
+        self.sock.close()
+
+
+def _observe_timeout(observation):
+    """Return seconds to wait for the workers to run the observation."""
+
+    if observation.mix:
+        duration = observation.duration or 0
+    else:
+        # the queries are run one after another
+        duration = sum([q.options.get('duration', observation.duration) or 0 for q in observation.queries])
+    warmup_time = sum([q.options.get('warmup_time', observation.warmup_time) or 0 for q in observation.queries])
+    return START_DELAY + duration + warmup_time + OBSERVE_TIMEOUT
+
+
+def _parallel(f, items):
+    """Call f(item) for each item, each in its own thread.
+
+    Returns list of results, in order; if any of the calls raised, the
+    first exception is re-raised, once all calls have finished.
+    """
+
+    results = [None] * len(items)
+    errors = []
+
+    def _call(i, item):
+        try:
+            results[i] = f(item)
+        except Exception as exc:
+            errors.append(exc)
+
+    threads = [threading.Thread(target=_call, args=(i, item)) for i, item in enumerate(items)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    if errors:
+        raise errors[0]
+    return results
+
+
+class Coordinator(object):
+    """Distributes loading and observations over the workers.
+
+    Set as 'coordinator' on esbench.bench.Benchmark, which then hands
+    Benchmark.load() and Observation.run() over to it.
+    """
+
+    def __init__(self, addresses, client_cls=WorkerClient):
+
+        self.workers = [client_cls(*parse_address(a)) for a in addresses]
+        for worker in self.workers:
+            offset = worker.sync_clock()
+            logger.info("connected to worker %s, clock offset: %.3fs", worker, offset)
+
+
+    def load(self, lines, worker=None):
+        """Load lines through the workers, return (count, size_b).
+
+        'worker' is the esbench.bench.QueryWorker, in 'mixed' mode.
+        """
+
+        lines = iter(lines)
+        lock = threading.Lock()
+        totals = {'count': 0, 'size_b': 0}
+
+        def _load(client):
+            while True:
+                with lock:
+                    chunk = list(itertools.islice(lines, LOAD_CHUNK_SIZE))
+                if not chunk:
+                    return
+                reply = client.call({'cmd': 'load', 'lines': chunk})
+                with lock:
+                    totals['count'] += reply['count']
+                    totals['size_b'] += reply['size_b']
+                    if worker:
+                        worker.docs += reply['count']
+
+        _parallel(_load, self.workers)
+        logger.info("loaded %i lines into index '%s' with %i workers, size: %i (%.2fMB)", totals['count'], esbench.TEST_INDEX_NAME, len(self.workers), totals['size_b'], totals['size_b']/(1<<20))
+        return (totals['count'], totals['size_b'])
+
+
+    def observe(self, observation):
+        """Run the observation on all workers, merge results into it."""
+
+        # cold executions, one query after another, before any worker runs
+        # queries, see module docstring
+        for query in observation.queries:
+            observation._cold(query, observation.conn)
+
+        settings = observation.settings()
+        if settings['rate']:
+            settings['rate'] = float(settings['rate']) / len(self.workers)
+        t_start = time.time() + START_DELAY
+        timeout = _observe_timeout(observation)
+
+        def _observe(client):
+            return client.call({
+                'cmd': 'observe',
+                'benchmark_id': observation.benchmark_id,
+                'observation_id': observation.observation_id,
+                'queries': observation.query_bodies,
+                'settings': settings,
+                't_start': t_start + client.offset,
+            }, timeout=timeout)
+
+        traversals = [q for q in observation.queries if isinstance(q, esbench.bench.TraversalQuery)]
+        observation._record_heap(traversals, 'heap_before')
+        replies = _parallel(_observe, self.workers)
+        observation._record_heap(traversals, 'heap_after')
+
+        for reply in replies:
+            for query in observation.queries:
+                query.merge_state(reply['queries'][query.name])
+            for name, query in observation.warmup_queries.items():
+                query.merge_state(reply['warmup_queries'][name])
+        # the workers run concurrently
+        observation.t_client = max([reply['t_client'] or 0 for reply in replies])
+        observation.workers = [str(w) for w in self.workers]
+        observation.client['workers'] = {str(w): reply['client'] for w, reply in zip(self.workers, replies)}
+        logger.info("ran observation %s on %i workers, %i queries in %.2fs", observation.observation_id, len(self.workers), sum([q.execution_count for q in observation.queries]), observation.t_client)
+
+
+    def close(self):
+
+        for worker in self.workers:
+            worker.close()
+
@@ -0,0 +1,232 @@
+# -*- coding: UTF-8 -*-
+# (c)2013 Mik Kocikowski, MIT License (http://opensource.org/licenses/MIT)
+# https://github.com/mkocikowski/esbench
+
+"""Compact, mergeable latency histograms.
+
+Latencies are recorded with microsecond resolution into log-linear buckets,
+in the manner of HdrHistogram: each power of 2 range of values is divided
+into 2**sub_bucket_bits linear sub buckets, so the recorded value is within
+1/2**sub_bucket_bits (with the default 7 bits, under 0.8%) of the actual
+value, no matter how large. Only non-empty buckets are stored, and
+histograms with the same precision can be merged by adding up their
+buckets - this is what allows latencies recorded by multiple clients, or in
+multiple observations, to be combined into one distribution.
+
+Serialized with dumps() the histogram is a short base64 string, which is
+what gets stored in the observation records.
+
+"""
+
+import json
+import zlib
+import math
+import base64
+
+
+# two-sided, normal approximation
+Z_SCORES = {
+    0.8: 1.282,
+    0.9: 1.645,
+    0.95: 1.960,
+    0.98: 2.326,
+    0.99: 2.576,
+    0.999: 3.291,
+}
+
+
+def stat_quantile(stat):
+    """Return the quantile (0..1) of a percentile stat, like 'p99_9'.
+
+    Returns None for 'mean'.
+
+    Raises:
+        ValueError: 'stat' is neither 'mean' nor a percentile
+    """
+
+    if stat == 'mean':
+        return None
+    try:
+        q = float(stat[1:].replace('_', '.')) / 100
+    except (ValueError, TypeError):
+        raise ValueError("invalid stat: %s" % stat)
+    if not (stat.startswith('p') and 0 < q < 1):
+        raise ValueError("invalid stat: %s" % stat)
+    return q
+
+
+class Histogram(object):
+
+    def __init__(self, sub_bucket_bits=7):
+
+        self.sub_bucket_bits = sub_bucket_bits
+        self.sub_bucket_count = 1 << sub_bucket_bits
+        self.buckets = {}
+        self.count = 0
+        self.total = 0 # sum of recorded values, microseconds
+        self.min = None
+        self.max = None
+
+
+    def _index(self, value):
+
+        if value < (self.sub_bucket_count << 1):
+            return value
+        shift = value.bit_length() - self.sub_bucket_bits - 1
+        return (shift * self.sub_bucket_count) + (value >> shift)
+
+
+    def _value(self, index):
+        """Return the value in the middle of the bucket's range."""
+
+        if index < (self.sub_bucket_count << 1):
+            return index
+        shift = (index // self.sub_bucket_count) - 1
+        top = index - (shift * self.sub_bucket_count)
+        return (top << shift) + ((1 << shift) >> 1)
+
+
+    def record(self, seconds):
+        """Record a latency, given in seconds."""
+
+        value = max(0, int(round(seconds * 1000000)))
+        index = self._index(value)
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+        self.count += 1
+        self.total += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+
+    def merge(self, other):
+        """Add other histogram's values to this one, return self."""
+
+        if other.sub_bucket_bits != self.sub_bucket_bits:
+            raise ValueError("can't merge histograms with different precision")
+        for index, count in other.buckets.items():
+            self.buckets[index] = self.buckets.get(index, 0) + count
+        self.count += other.count
+        self.total += other.total
+        if other.count:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+            self.max = other.max if self.max is None else max(self.max, other.max)
+        return self
+
+
+    def percentile(self, p):
+        """Return the p-th percentile value, in seconds, None if empty."""
+
+        if not self.count:
+            return None
+        rank = max(1, int(-(-p * self.count // 100))) # ceil
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen >= rank:
+                value = min(max(self._value(index), self.min), self.max)
+                return value / 1000000.0
+        return self.max / 1000000.0
+
+
+    def stddev(self):
+        """Return sample standard deviation, in seconds, None if count < 2."""
+
+        if self.count < 2:
+            return None
+        mean = float(self.total) / self.count
+        ss = sum([c * ((min(max(self._value(i), self.min), self.max) - mean) ** 2) for i, c in self.buckets.items()])
+        return math.sqrt(ss / (self.count - 1)) / 1000000.0
+
+
+    def confidence_interval(self, stat='mean', confidence=0.95):
+        """Return (estimate, low, high) for 'stat', in seconds.
+
+        'stat' is 'mean', or a percentile, like 'p50' or 'p99_9'. The
+        interval for the mean uses the normal approximation; the one for
+        percentiles is distribution free, bounded by the values at the
+        ranks n*q -/+ z*sqrt(n*q*(1-q)). Returns None if count < 2.
+
+        Raises:
+            ValueError: 'confidence' not one of Z_SCORES, or bad 'stat'
+        """
+
+        try:
+            z = Z_SCORES[confidence]
+        except KeyError:
+            raise ValueError("confidence must be one of: %s" % sorted(Z_SCORES))
+        if self.count < 2:
+            return None
+        if stat == 'mean':
+            estimate = float(self.total) / self.count / 1000000.0
+            half = z * self.stddev() / math.sqrt(self.count)
+            return (estimate, estimate - half, estimate + half)
+        q = stat_quantile(stat)
+        delta = z * math.sqrt(q * (1 - q) / self.count)
+        return (
+            self.percentile(q * 100),
+            self.percentile(max(0.0, q - delta) * 100),
+            self.percentile(min(1.0, q + delta) * 100),
+        )
+
+
+    def count_above(self, seconds):
+        """Return the number of values recorded in buckets above 'seconds'.
+
+        This is accurate to bucket precision: values in the same bucket as
+        'seconds' are not counted, even if they are slightly larger.
+        """
+
+        index = self._index(max(0, int(round(seconds * 1000000))))
+        return sum([c for i, c in self.buckets.items() if i > index])
+
+
+    def stats(self):
+        """Return dict with count, mean, min, max, and 50th, 90th, 99th, and
+        99.9th percentile latencies in milliseconds, and the serialized
+        histogram. Latencies are None if the histogram is empty."""
+
+        def _ms(seconds):
+            return seconds * 1000.0 if seconds is not None else None
+
+        stats = {
+            'count': self.count,
+            'mean_in_millis': (self.total / 1000.0 / self.count) if self.count else None,
+            'min_in_millis': (self.min / 1000.0) if self.count else None,
+            'max_in_millis': (self.max / 1000.0) if self.count else None,
+            'p50_in_millis': _ms(self.percentile(50)),
+            'p90_in_millis': _ms(self.percentile(90)),
+            'p99_in_millis': _ms(self.percentile(99)),
+            'p99_9_in_millis': _ms(self.percentile(99.9)),
+            'histogram': self.dumps(),
+        }
+        return stats
+
+
+    def dumps(self):
+
+        # bucket indexes are delta encoded, as consecutive non-empty buckets
+        # are common, and small deltas compress well
+        buckets = []
+        previous = 0
+        for index, count in sorted(self.buckets.items()):
+            buckets.extend([index - previous, count])
+            previous = index
+        data = [self.sub_bucket_bits, self.count, self.total, self.min, self.max, buckets]
+        return base64.b64encode(zlib.compress(json.dumps(data, separators=(',', ':')), 9))
+
+
+    @classmethod
+    def loads(cls, s):
+
+        sub_bucket_bits, count, total, _min, _max, buckets = json.loads(zlib.decompress(base64.b64decode(s)))
+        h = cls(sub_bucket_bits=sub_bucket_bits)
+        h.count = count
+        h.total = total
+        h.min = _min
+        h.max = _max
+        index = 0
+        for delta, c in zip(buckets[0::2], buckets[1::2]):
+            index += delta
+            h.buckets[index] = c
+        return h
+
@@ -0,0 +1,155 @@
+# -*- coding: UTF-8 -*-
+# (c)2013 Mik Kocikowski, MIT License (http://opensource.org/licenses/MIT)
+# https://github.com/mkocikowski/esbench
+
+"""Monitoring of the esbench client process itself.
+
+Slow results can come from ES, or from the client not keeping up: a single
+python process can run python code on no more than one core at a time (the
+GIL), and with many client threads, open loop dispatch, and response
+parsing, it is easy to run out. A ClientMonitor runs for as long as an
+observation (or a data load) does, and records:
+
+    - the process' cpu time (user, system), and cpu time as a percentage of
+      wall time; close to 100% means the client was cpu bound
+    - timer lag: a monitor thread sleeps for 'interval', and records how
+      late it wakes up; when the interpreter is busy (other threads holding
+      the GIL, garbage collection pauses, the host being overloaded) the
+      lag grows, and the same delays are added to measured latencies
+    - the largest number of threads running at a time
+
+The run is flagged 'saturated' when cpu use is at or above SATURATION_CPU,
+or the 99th percentile of timer lag at or above SATURATION_LAG; the reasons
+are listed in 'saturation'. Results from a saturated client say more about
+the client than about ES, and should be discarded or re-run with fewer
+clients per process (or with more processes, see esbench.distributed).
+
+With 'profile_path' set, the run is also profiled with cProfile, and the
+stats are written to that file (load them with the pstats module). Only the
+thread which started the monitor is profiled, and profiling slows python
+code down considerably, so profiled runs are for diagnosis only.
+
+"""
+
+import os
+import os.path
+import time
+import logging
+import threading
+import cProfile
+
+import esbench.histogram
+
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_INTERVAL = 0.01 # seconds
+SATURATION_CPU = 90.0 # percent of one core
+SATURATION_LAG = 0.01 # seconds, p99 of timer lag
+
+
+def _cpu():
+    """Return (user, system) cpu time of the process, in seconds."""
+
+    t = os.times()
+    return (t[0], t[1])
+
+
+class ClientMonitor(threading.Thread):
+    """Monitors the client process from start() until finish()."""
+
+    def __init__(self, interval=DEFAULT_INTERVAL, profile_path=None):
+
+        threading.Thread.__init__(self)
+        self.daemon = True
+
+        self.interval = interval
+        self.profile_path = profile_path
+        self.lag = esbench.histogram.Histogram()
+        self.max_threads = 0
+        self._profiler = None
+        self._t_start = None
+        self._cpu_start = None
+        self._stopped = False
+
+
+    def start(self):
+
+        self._t_start = time.time()
+        self._cpu_start = _cpu()
+        if self.profile_path:
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        threading.Thread.start(self)
+
+
+    def run(self):
+
+        # plain sleep, not Event.wait(), which in python 2 itself polls
+        # with sleeps of up to 50ms
+        while not self._stopped:
+            t_intended = time.time() + self.interval
+            time.sleep(self.interval)
+            self.lag.record(max(0, time.time() - t_intended))
+            self.max_threads = max(self.max_threads, threading.active_count() - 1)
+
+
+    def finish(self):
+        """Stop monitoring, return stats (see module docstring)."""
+
+        t_wall = time.time() - self._t_start
+        user, system = [b - a for a, b in zip(self._cpu_start, _cpu())]
+        self._stopped = True
+        self.join()
+        profile = None
+        if self._profiler:
+            self._profiler.disable()
+            profile = self._dump_profile()
+
+        cpu_percent = 100.0 * (user + system) / t_wall if t_wall else None
+        lag = self.lag.stats()
+        saturation = []
+        if cpu_percent is not None and cpu_percent >= SATURATION_CPU:
+            saturation.append('cpu')
+        if lag['p99_in_millis'] is not None and lag['p99_in_millis'] >= SATURATION_LAG * 1000.0:
+            saturation.append('timer_lag')
+        if saturation:
+            logger.warning("client saturated (%s): cpu %.0f%%, timer lag p99 %.1fms", ", ".join(saturation), cpu_percent, lag['p99_in_millis'])
+
+        return {
+            't_wall_in_millis': int(t_wall * 1000),
+            'cpu_user_in_millis': int(user * 1000),
+            'cpu_system_in_millis': int(system * 1000),
+            'cpu_percent': cpu_percent,
+            'threads': self.max_threads,
+            'timer_lag': lag,
+            'saturated': bool(saturation),
+            'saturation': saturation,
+            'profile': profile,
+        }
+
+
+    def _dump_profile(self):
+        """Write the profile, return its path, None if it couldn't be written."""
+
+        directory = os.path.dirname(self.profile_path)
+        try:
+            if directory and not os.path.isdir(directory):
+                os.makedirs(directory)
+            self._profiler.dump_stats(self.profile_path)
+        except (IOError, OSError) as exc:
+            # a lost profile is no reason to lose the observation
+            logger.warning("couldn't write client profile to %s: %s", self.profile_path, exc)
+            return None
+        logger.info("client profile written to: %s", self.profile_path)
+        return self.profile_path
+
+
+def profile_path(directory, name):
+    """Return path of profile 'name' in directory, None if no directory."""
+
+    if not directory:
+        return None
+    return os.path.join(directory, "%s.prof" % name)
+
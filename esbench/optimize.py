@@ -0,0 +1,163 @@
+# -*- coding: UTF-8 -*-
+# (c)2013 Mik Kocikowski, MIT License (http://opensource.org/licenses/MIT)
+# https://github.com/mkocikowski/esbench
+
+"""Optimize, with the progress of the merges tracked.
+
+By default the optimize call waits for the merges to finish, and all that
+is known is how long it took. On large shards that can be a very long time,
+during which nothing is known about what is happening, and with no way to
+give up. optimize() starts the optimize without waiting, and then polls
+the index's segments and merge stats every 'interval' seconds, until every
+shard is down to the target number of segments, or until 'timeout'
+seconds have passed. It returns:
+
+    {
+        "target_segments": 1,
+        "reached": true,          # target reached before timeout
+        "timed_out": false,
+        "t_target_in_millis": ..., # time to reach target, None if not reached
+        "merged_in_bytes": ...,    # merged while polling, all shard copies
+        "merge_mb_per_second": ...,
+        "timeline": {
+            "t": [0.0, 1.0, ...],  # seconds since the optimize call
+            "num_search_segments": [...],  # all shard copies
+            "max_shard_segments": [...],   # most in any one shard copy
+            "merges_current": [...],
+            "merged_in_bytes": [...],      # since the optimize call
+            "merge_mb_per_second": [...],  # since the previous sample
+        }
+    }
+
+On timeout, the merges carry on in the cluster, and the observation runs
+against an index which is still being merged; 'timed_out' flags that. With
+no timeout given, DEFAULT_TIMEOUT applies, as merges may never finish (with
+data still being loaded, in 'mixed' mode, for example). Polling also stops
+after MAX_FAILED_POLLS polls in a row fail to get the stats.
+
+"""
+
+import json
+import time
+import logging
+
+import esbench.api
+
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_INTERVAL = 1.0 # seconds
+DEFAULT_TIMEOUT = 3600.0 # seconds
+MAX_FAILED_POLLS = 10
+
+
+def _segment_counts(data, index):
+    """Return (total search segments, most segments in a shard copy)."""
+
+    counts = [c['num_search_segments'] for shard in data['indices'][index]['shards'].values() for c in shard]
+    return (sum(counts), max(counts) if counts else 0)
+
+
+def _merges(data, index):
+    """Return 'merges' index stats, all shard copies."""
+
+    try:
+        return data['indices'][index]['total']['merges']
+    except KeyError: # compatibility with 19.9
+        return data['_all']['indices'][index]['total']['merges']
+
+
+def optimize(
+        conn,
+        index,
+        nseg,
+        interval=DEFAULT_INTERVAL,
+        timeout=None,
+        optimize_f=esbench.api.index_optimize,
+        segments_f=esbench.api.index_get_segments,
+        stats_f=esbench.api.index_get_stats,
+        sleep_f=time.sleep, ):
+    """Optimize index down to 'nseg' segments, return progress (see above).
+
+    Raises:
+        IOError: the optimize call failed
+    """
+
+    timeline = {
+        't': [],
+        'num_search_segments': [],
+        'max_shard_segments': [],
+        'merges_current': [],
+        'merged_in_bytes': [],
+        'merge_mb_per_second': [],
+    }
+    result = {
+        'target_segments': nseg,
+        'reached': False,
+        'timed_out': False,
+        't_target_in_millis': None,
+        'merged_in_bytes': None,
+        'merge_mb_per_second': None,
+        'timeline': timeline,
+    }
+
+    timeout = timeout or DEFAULT_TIMEOUT
+
+    # bytes merged are counted from the optimize call
+    try:
+        merged_start = _merges(json.loads(stats_f(conn, index, '').data), index)['total_size_in_bytes']
+    except (TypeError, ValueError, KeyError, IOError) as exc:
+        logger.warning("couldn't get merge stats before optimize, counting merged bytes from the first poll: %s", exc)
+        merged_start = None
+
+    t_start = time.time()
+    resp = optimize_f(conn, index, nseg, wait_for_merge=False)
+    if resp.status >= 400:
+        raise IOError("optimize call failed: %s" % (resp.data, ))
+
+    failed_polls = 0
+    while True:
+        t = time.time() - t_start
+        try:
+            total, largest = _segment_counts(json.loads(segments_f(conn, index).data), index)
+            merges = _merges(json.loads(stats_f(conn, index, '').data), index)
+        except (TypeError, ValueError, KeyError, IOError) as exc:
+            failed_polls += 1
+            logger.warning("couldn't get segment / merge stats (%i of %i): %s", failed_polls, MAX_FAILED_POLLS, exc)
+            if failed_polls >= MAX_FAILED_POLLS:
+                logger.warning("optimize to %i segments: giving up polling after %.1fs", nseg, t)
+                break
+        else:
+            failed_polls = 0
+            if merged_start is None:
+                merged_start = merges['total_size_in_bytes']
+            merged = merges['total_size_in_bytes'] - merged_start
+            if timeline['t']:
+                dt = t - timeline['t'][-1]
+                rate = (merged - timeline['merged_in_bytes'][-1]) / dt / (1<<20) if dt else None
+            else:
+                rate = None
+            timeline['t'].append(round(t, 3))
+            timeline['num_search_segments'].append(total)
+            timeline['max_shard_segments'].append(largest)
+            timeline['merges_current'].append(merges.get('current'))
+            timeline['merged_in_bytes'].append(merged)
+            timeline['merge_mb_per_second'].append(rate)
+            logger.info("optimize: %.1fs, %i segments (at most %i per shard), %i merges, %.2fMB merged", t, total, largest, merges.get('current') or 0, merged / float(1<<20))
+            result['merged_in_bytes'] = merged
+            result['merge_mb_per_second'] = merged / t / (1<<20) if t else None
+
+            if largest <= nseg and not merges.get('current'):
+                result['reached'] = True
+                result['t_target_in_millis'] = int(t * 1000)
+                break
+
+        if t >= timeout:
+            result['timed_out'] = True
+            logger.warning("optimize to %i segments timed out after %.1fs", nseg, t)
+            break
+        sleep_f(max(0, min(interval, timeout - t)))
+
+    return result
+
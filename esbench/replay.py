@@ -0,0 +1,245 @@
+# -*- coding: UTF-8 -*-
+# (c)2013 Mik Kocikowski, MIT License (http://opensource.org/licenses/MIT)
+# https://github.com/mkocikowski/esbench
+
+"""Replay of captured request logs.
+
+Query templates in the config file are a guess at what real traffic looks
+like; a log of real requests is better. With '--replay PATH', instead of
+running the configured queries, each observation replays the requests in
+the log against the test index. The log is json, one request per line:
+
+    {"timestamp": 1389052862.123, "path": "/myindex/_search", "body": {...}}
+
+'timestamp' is seconds since the epoch (or milliseconds, or an ISO 8601 /
+slow log style date string, like "2014-01-07 00:01:02,123"), 'path' is the
+request path, and 'body' the search request, as json or as a json string
+('source' is accepted for 'body', for logs derived from the slow log). The
+index in 'path' is ignored, requests are sent to the test index, with the
+path's query string. Lines which can't be parsed are skipped, and counted.
+Logs ending in '.gz' are read with gzip. The log is streamed, never loaded
+into memory as a whole, so it can be any size.
+
+The 'speed' sets the timing: 1.0 (default) replays the requests at their
+original inter-arrival times (open loop, see Observation._dispatch()), 2.0
+twice as fast, and so on; 'max' (0) replays them as fast as the clients can
+send them. 'duration' and 'max_reps' limit the length of each replay.
+
+Requests are recorded in the stats groups of the configured queries, as
+decided by the Classifier: each query can claim requests with regular
+expressions in its 'replay_match' option, matched against the request's
+path and body; requests not claimed by any query are recorded in the
+DEFAULT_GROUP group.
+
+"""
+
+import re
+import gzip
+import json
+import time
+import calendar
+import datetime
+import logging
+import urlparse
+
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_GROUP = 'replay_other'
+
+_DATE_FORMATS = (
+    r'%Y-%m-%dT%H:%M:%S.%fZ',
+    r'%Y-%m-%dT%H:%M:%SZ',
+    r'%Y-%m-%dT%H:%M:%S.%f',
+    r'%Y-%m-%dT%H:%M:%S',
+    r'%Y-%m-%d %H:%M:%S,%f',
+    r'%Y-%m-%d %H:%M:%S.%f',
+    r'%Y-%m-%d %H:%M:%S',
+)
+
+
+def parse_timestamp(value):
+    """Return seconds since the epoch for a log timestamp.
+
+    Numbers are seconds, or milliseconds when too large to be seconds;
+    strings are UTC dates. Raises ValueError if the value can't be parsed.
+    """
+
+    if isinstance(value, (int, long, float)):
+        return value / 1000.0 if value > 1e11 else float(value)
+    for fmt in _DATE_FORMATS:
+        try:
+            dt = datetime.datetime.strptime(value, fmt)
+        except (ValueError, TypeError):
+            continue
+        return calendar.timegm(dt.timetuple()) + dt.microsecond / 1e6
+    raise ValueError("invalid timestamp: %r" % (value, ))
+
+
+def parse_speed(value):
+    """Return replay speed factor, 0.0 for 'max', 1.0 if None."""
+
+    if value is None:
+        return 1.0
+    if value == 'max':
+        return 0.0
+    speed = float(value)
+    if speed < 0:
+        raise ValueError("invalid replay speed: %r" % (value, ))
+    return speed
+
+
+def _open(path):
+
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rb')
+    return open(path, 'rU')
+
+
+class Log(object):
+    """Request log, iterating yields requests, read from the file each time.
+
+    Each request is a dict with 't' (seconds since the epoch), 'path'
+    (query string included), and 'body' (dict). Invalid lines are skipped,
+    and counted in 'invalid'.
+    """
+
+    def __init__(self, path, open_f=_open):
+
+        self.path = path
+        self.open_f = open_f
+        self.entries = 0
+        self.invalid = 0
+
+
+    def _parse(self, line):
+
+        entry = json.loads(line)
+        body = entry.get('body', entry.get('source'))
+        if isinstance(body, basestring):
+            body = json.loads(body)
+        if not isinstance(body, dict):
+            raise ValueError("request body is not an object")
+        return {
+            't': parse_timestamp(entry['timestamp']),
+            'path': entry.get('path') or '',
+            'body': body,
+        }
+
+
+    def __iter__(self):
+
+        self.entries = 0
+        self.invalid = 0
+        with self.open_f(self.path) as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    entry = self._parse(line)
+                except (ValueError, KeyError, TypeError, AttributeError) as exc:
+                    self.invalid += 1
+                    logger.debug("skipped invalid request log line: %s", exc)
+                    continue
+                self.entries += 1
+                yield entry
+
+
+class Classifier(object):
+    """Assigns logged requests to queries, see module docstring.
+
+    Queries are tried in order of their names, each query's patterns in the
+    order given; the first match wins.
+    """
+
+    def __init__(self, queries, default=None):
+
+        self.rules = []
+        for query in sorted(queries, key=lambda q: q.name):
+            patterns = query.options.get('replay_match') or []
+            if isinstance(patterns, basestring):
+                patterns = [patterns]
+            self.rules.extend([(re.compile(p), query) for p in patterns])
+        self.default = default
+
+
+    def classify(self, entry):
+
+        text = "%s %s" % (entry['path'], json.dumps(entry['body'], sort_keys=True))
+        for regex, query in self.rules:
+            if regex.search(text):
+                return query
+        return self.default
+
+
+class ReplayRequest(object):
+    """A logged request, executed in its query's stats group.
+
+    Has the execute() / skip() interface of esbench.bench.SearchQuery, so
+    it can be executed by Observation like a query.
+    """
+
+    def __init__(self, query, entry):
+
+        self.query = query
+        self.name = query.name
+        body = dict(entry['body'])
+        body['stats'] = [query.stats_group_name]
+        self.body = json.dumps(body, sort_keys=True)
+        self.params = urlparse.urlsplit(entry['path']).query
+
+
+    def execute(self, conn, t_intended=None):
+
+        path = "%s?%s" % (self.query.query_path, self.params) if self.params else self.query.query_path
+        return self.query.send(conn, self.body, t_intended, path=path)
+
+
+    def skip(self):
+
+        self.query.skip()
+
+
+    def fail(self):
+
+        self.query.fail()
+
+
+class Replay(object):
+    """Replays a request log, see module docstring."""
+
+    def __init__(self, path, speed=1.0, log_cls=Log):
+
+        self.path = path
+        self.speed = speed
+        self.log = log_cls(path)
+
+
+    def requests(self, classifier):
+        """Yield (offset, ReplayRequest) for each logged request.
+
+        'offset' is the request's time since the first request, in seconds,
+        at the replay speed; out of order timestamps make for negative
+        offsets, such requests are sent as soon as possible.
+        """
+
+        t_first = None
+        for entry in self.log:
+            if t_first is None:
+                t_first = entry['t']
+            offset = (entry['t'] - t_first) / self.speed if self.speed else 0.0
+            yield offset, ReplayRequest(classifier.classify(entry), entry)
+
+
+    def stats(self, queries, t_replay):
+        """Return summary of the last replay, recorded with the observation."""
+
+        return {
+            'path': self.path,
+            'speed': self.speed or 'max',
+            'requests': self.log.entries,
+            'invalid': self.log.invalid,
+            't_replay_in_millis': int(t_replay * 1000),
+            'groups': {q.name: q.execution_count + q.missed for q in queries},
+        }
@@ -0,0 +1,163 @@
+# -*- coding: UTF-8 -*-
+# (c)2013 Mik Kocikowski, MIT License (http://opensource.org/licenses/MIT)
+# https://github.com/mkocikowski/esbench
+
+"""Background sampling of cluster stats.
+
+The cluster stats recorded with each observation are a single snapshot taken
+after the queries have run, and whatever happened during the run (a GC
+pause, a merge storm, queued or rejected requests) is gone by then. A
+ClusterSampler polls node stats every 'interval' seconds while data is
+loaded and queries are run, and keeps a compact time series of the numbers
+which matter most, summed (or, for percentages, maxed) over all nodes:
+
+    {
+        "interval": 1.0,
+        "t": [0.0, 1.0, ...],               # seconds since sampler start
+        "phase": ["load", "load", "observe", ...],
+        "heap_used_in_bytes": [...],
+        "gc_collection_count": [...],
+        ...
+    }
+
+Each metric is a list with one value per sample (None where the value was
+not available). Counters (gc collections, rejected requests, merge time)
+are cumulative, as reported by ES; take differences between samples to get
+rates. Fielddata memory comes from the 'indices' section of node stats.
+
+"""
+
+import time
+import json
+import logging
+import threading
+
+import esbench.api
+
+
+logger = logging.getLogger(__name__)
+
+
+# (name, aggregate over nodes, paths); the first path found in a node's
+# stats is used, so that different ES versions are covered; '*' matches
+# all keys at that level
+METRICS = [
+    ('heap_used_in_bytes', sum, ['jvm.mem.heap_used_in_bytes']),
+    ('heap_used_percent', max, ['jvm.mem.heap_used_percent']),
+    ('gc_collection_count', sum, ['jvm.gc.collectors.*.collection_count']),
+    ('gc_collection_time_in_millis', sum, ['jvm.gc.collectors.*.collection_time_in_millis']),
+    ('search_queue', sum, ['thread_pool.search.queue']),
+    ('search_rejected', sum, ['thread_pool.search.rejected']),
+    ('index_queue', sum, ['thread_pool.index.queue']),
+    ('index_rejected', sum, ['thread_pool.index.rejected']),
+    ('bulk_queue', sum, ['thread_pool.bulk.queue']),
+    ('bulk_rejected', sum, ['thread_pool.bulk.rejected']),
+    ('merges_current', sum, ['indices.merges.current']),
+    ('merges_total_time_in_millis', sum, ['indices.merges.total_time_in_millis']),
+    ('fielddata_memory_size_in_bytes', sum, ['indices.fielddata.memory_size_in_bytes']),
+    ('fielddata_evictions', sum, ['indices.fielddata.evictions']),
+    ('os_cpu_percent', max, ['os.cpu.usage', 'os.cpu_percent', 'os.cpu.percent']),
+    ('os_load_average', max, ['os.load_average', 'os.cpu.load_average.1m']),
+    ('process_cpu_percent', max, ['process.cpu.percent']),
+]
+
+
+def _values(d, path):
+    """Return list of values found at dotted path in nested dict d."""
+
+    nodes = [d]
+    for key in path.split('.'):
+        found = []
+        for n in nodes:
+            if not isinstance(n, dict):
+                continue
+            if key == '*':
+                found.extend(n.values())
+            elif key in n:
+                found.append(n[key])
+        nodes = found
+    values = []
+    for v in nodes:
+        if isinstance(v, list): # load average, in some versions
+            v = v[0] if v else None
+        if isinstance(v, (int, long, float)) and not isinstance(v, bool):
+            values.append(v)
+    return values
+
+
+def extract(stats):
+    """Return dict of METRICS values from node stats data (decoded)."""
+
+    nodes = stats['nodes'].values()
+    sample = {}
+    for name, aggregate, paths in METRICS:
+        values = []
+        for node in nodes:
+            for path in paths:
+                v = _values(node, path)
+                if v:
+                    values.extend(v)
+                    break
+        sample[name] = aggregate(values) if values else None
+    return sample
+
+
+class ClusterSampler(threading.Thread):
+    """Polls cluster stats every 'interval' seconds, until finish().
+
+    Set 'phase' to tag the samples with what the benchmark is doing at the
+    time ('load', 'observe'). The sampler should have its own connection.
+    """
+
+    def __init__(self, conn=None, interval=1.0, cluster_f=esbench.api.cluster_get_stats):
+
+        threading.Thread.__init__(self)
+        self.daemon = True
+
+        self.conn = conn
+        self.interval = interval
+        self.cluster_f = cluster_f
+        self.phase = None
+
+        self.series = {'interval': interval, 't': [], 'phase': []}
+        for name, _, _ in METRICS:
+            self.series[name] = []
+        self._t_start = None
+        self._stop_event = threading.Event()
+
+
+    def sample(self):
+
+        t = time.time() - self._t_start
+        try:
+            resp = self.cluster_f(self.conn)
+            sample = extract(json.loads(resp.data))
+        except (TypeError, ValueError, KeyError, AttributeError, IOError) as exc:
+            logger.debug("couldn't sample cluster stats: %s", exc)
+            return
+        self.series['t'].append(round(t, 3))
+        self.series['phase'].append(self.phase)
+        for name, _, _ in METRICS:
+            self.series[name].append(sample[name])
+
+
+    def run(self):
+
+        self._t_start = time.time()
+        while True:
+            t1 = time.time()
+            self.sample()
+            # wait() returns early when finish() is called
+            if self._stop_event.wait(max(0, self.interval - (time.time() - t1))):
+                break
+        self.conn.close()
+
+
+    def finish(self):
+        """Stop the sampler, wait for it to exit, return the time series."""
+
+        self._stop_event.set()
+        self.join()
+        logger.info("cluster sampler recorded %i samples", len(self.series['t']))
+        return self.series
+
@@ -0,0 +1,427 @@
+# -*- coding: UTF-8 -*-
+# (c)2013 Mik Kocikowski, MIT License (http://opensource.org/licenses/MIT)
+# https://github.com/mkocikowski/esbench
+
+"""Where benchmark and observation records are written to, and read from.
+
+By default records go to the 'esbench_stats' index on the cluster being
+benchmarked. That adds load to the system under test, and the results are
+only available for as long as the cluster is. A sink can instead be:
+
+    - EsSink on a different ES host ('es:HOST[:PORT]')
+    - JsonlSink, a local append-only file of json lines ('jsonl:PATH')
+    - SqliteSink, a local SQLite database ('sqlite:PATH')
+
+Use from_spec() to get a sink from one of the above strings. Wrap a sink in
+AsyncSink to have records written by a background thread, in batches, so
+that writing them doesn't hold up the loading of the next batch of data.
+
+All sinks have the same interface:
+
+    - prepare(): create the index / file / table, if needed
+    - write(doctype, doc_id, doc): write a 'bench' or 'obs' record (dict)
+    - benchmarks(): benchmark records, oldest first
+    - observations(benchmark_id, since=None): the benchmark's observation
+      records, oldest first; only those started at or after 'since' (a
+      timestamp, like 'observation_start') if set
+    - observations_many(benchmark_ids): {benchmark_id: observations}, the
+      observation records of a number of benchmarks, read in one go where
+      the sink can do that
+
+These return lists, except for EsSink, which returns generators reading
+the records from ES a page at a time.
+
+Records are returned in the same form ES returns search hits in, dicts with
+'_id' and '_source' keys, which is what esbench.analyze works with.
+
+"""
+
+import os.path
+import json
+import logging
+import sqlite3
+import threading
+import Queue
+
+import esbench
+import esbench.api
+
+
+logger = logging.getLogger(__name__)
+
+
+PAGE_SIZE = 100 # EsSink records fetched per request
+
+
+def _start(doctype, doc):
+    """Return timestamp records are sorted on."""
+
+    if doctype == 'bench':
+        return doc['meta']['benchmark_start']
+    return doc['meta']['observation_start']
+
+
+def _benchmark_id(doc):
+    return doc['meta']['benchmark_id']
+
+
+class Sink(object):
+    """Behaviour shared by the sinks.
+
+    Subclasses provide write(), benchmarks() and observations() (see the
+    module docstring); read only sinks, like esbench.cache.Cache, leave
+    out write(). The rest defaults to what suits sinks which write each
+    record as it comes, with nothing to set up or release.
+    """
+
+    def prepare(self):
+        pass
+
+    def write_many(self, records):
+        """Write list of (doctype, doc_id, doc) tuples."""
+
+        for doctype, doc_id, doc in records:
+            self.write(doctype, doc_id, doc)
+
+    def observations_many(self, benchmark_ids):
+        """Return {benchmark_id: observation records, oldest first}."""
+
+        return {benchmark_id: self.observations(benchmark_id) for benchmark_id in benchmark_ids}
+
+    def when_written(self, f):
+        """Call f() once the records written so far are stored.
+
+        Records are stored by the time write() returns, so f() is called
+        right away.
+        """
+
+        f()
+
+    def close(self):
+        pass
+
+
+class EsSink(Sink):
+    """Records in an ES index, by default on the benchmarked cluster."""
+
+    def __init__(self, conn=None, stats_index_name=esbench.STATS_INDEX_NAME):
+
+        self.conn = conn
+        self.stats_index_name = stats_index_name
+
+
+    def __str__(self):
+        return "http://%s:%i/%s" % (self.conn.host, self.conn.port, self.stats_index_name)
+
+
+    def prepare(self):
+
+        index_settings = {"settings" : {"index" : {"number_of_shards" : 1, "number_of_replicas" : 0}}}
+        esbench.api.index_create(self.conn, self.stats_index_name, index_settings)
+
+
+    def write(self, doctype, doc_id, doc):
+
+        path = '%s/%s/%s' % (self.stats_index_name, doctype, doc_id)
+        resp = self.conn.put(path, json.dumps(doc, sort_keys=True))
+        if resp.status not in [200, 201]:
+            logger.error(resp)
+        return resp
+
+
+    def benchmarks(self):
+
+        # records are streamed, a page at a time
+        body = {'sort': [{'benchmark_start': 'asc'}]}
+        return esbench.api.search_hits(self.conn, self.stats_index_name, 'bench', body, size=PAGE_SIZE)
+
+
+    def observations(self, benchmark_id, since=None):
+
+        body = {
+            'query': {'match': {'meta.benchmark_id': benchmark_id}},
+            'sort': [{'meta.observation_start': 'asc'}],
+        }
+        if since is not None:
+            body['query'] = {'filtered': {
+                'query': body['query'],
+                'filter': {'range': {'meta.observation_start': {'gte': since}}},
+            }}
+        return esbench.api.search_hits(self.conn, self.stats_index_name, 'obs', body, size=PAGE_SIZE)
+
+
+    def close(self):
+        self.conn.close()
+
+
+class JsonlSink(Sink):
+    """Records appended to a file, one json object per line.
+
+    Each line is {"_type": doctype, "_id": doc_id, "_source": doc}. The file
+    is never rewritten; if a record is written more than once, the last
+    line wins.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+
+    def __str__(self):
+        return "jsonl:%s" % (self.path, )
+
+
+    def write(self, doctype, doc_id, doc):
+        self.write_many([(doctype, doc_id, doc)])
+
+
+    def write_many(self, records):
+
+        with open(self.path, 'a') as f:
+            for doctype, doc_id, doc in records:
+                f.write(json.dumps({'_type': doctype, '_id': doc_id, '_source': doc}, sort_keys=True))
+                f.write("\n")
+
+
+    def _read(self, doctype, select_f=lambda doc: True):
+
+        if not os.path.exists(self.path):
+            return []
+        records = {}
+        with open(self.path, 'rU') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                r = json.loads(line)
+                if r['_type'] == doctype and select_f(r['_source']):
+                    records[r['_id']] = {'_id': r['_id'], '_source': r['_source']}
+        return sorted(records.values(), key=lambda r: _start(doctype, r['_source']))
+
+
+    def benchmarks(self):
+        return self._read('bench')
+
+
+    def observations(self, benchmark_id, since=None):
+        return self._read('obs', lambda doc: _benchmark_id(doc) == benchmark_id and (since is None or _start('obs', doc) >= since))
+
+
+    def observations_many(self, benchmark_ids):
+
+        # one pass over the file, rather than one per benchmark
+        grouped = {benchmark_id: [] for benchmark_id in benchmark_ids}
+        for record in self._read('obs', lambda doc: _benchmark_id(doc) in grouped):
+            grouped[_benchmark_id(record['_source'])].append(record)
+        return grouped
+
+
+class SqliteSink(Sink):
+    """Records in a SQLite database, table 'records'.
+
+    A new database connection is made for each batch of writes and each
+    read, as sqlite connections can't be shared between threads.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+
+    def __str__(self):
+        return "sqlite:%s" % (self.path, )
+
+
+    def _connect(self):
+        return sqlite3.connect(self.path)
+
+
+    def prepare(self):
+
+        db = self._connect()
+        with db:
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS records ("
+                "doctype TEXT, id TEXT, benchmark_id TEXT, start TEXT, source TEXT, "
+                "PRIMARY KEY (doctype, id))"
+            )
+            db.execute("CREATE INDEX IF NOT EXISTS records_benchmark_id ON records (doctype, benchmark_id)")
+        db.close()
+
+
+    def write(self, doctype, doc_id, doc):
+        self.write_many([(doctype, doc_id, doc)])
+
+
+    def write_many(self, records):
+
+        # observations can be recorded without the benchmark being run (and
+        # prepared) first
+        self.prepare()
+        db = self._connect()
+        with db: # one transaction
+            db.executemany(
+                "INSERT OR REPLACE INTO records (doctype, id, benchmark_id, start, source) VALUES (?, ?, ?, ?, ?)",
+                [(doctype, doc_id, _benchmark_id(doc), _start(doctype, doc), json.dumps(doc, sort_keys=True)) for doctype, doc_id, doc in records]
+            )
+        db.close()
+
+
+    def _read(self, sql, args):
+
+        db = self._connect()
+        try:
+            rows = db.execute(sql, args).fetchall()
+        except sqlite3.OperationalError as exc: # no table
+            logger.warning("couldn't read records from %s: %s", self, exc)
+            rows = []
+        finally:
+            db.close()
+        return [{'_id': doc_id, '_source': json.loads(source)} for doc_id, source in rows]
+
+
+    def benchmarks(self):
+        return self._read("SELECT id, source FROM records WHERE doctype = ? ORDER BY start", ('bench', ))
+
+
+    def observations(self, benchmark_id, since=None):
+        return self._read("SELECT id, source FROM records WHERE doctype = ? AND benchmark_id = ? AND start >= ? ORDER BY start", ('obs', benchmark_id, since or ''))
+
+
+class AsyncSink(Sink):
+    """Writes records to another sink in a background thread.
+
+    write() only puts the record on a queue. The writer thread takes all
+    the records waiting on the queue, and writes them in one go (one file
+    append, one sqlite transaction). Reads, and close(), wait for the
+    queued records to be written first. Write errors are logged, not
+    raised. Functions passed to when_written() are called by the writer
+    thread, in turn with the records, so that whatever depends on records
+    being stored (like a checkpoint) doesn't hold up the benchmark; after
+    a write error they aren't called at all.
+    """
+
+    def __init__(self, sink):
+
+        self.sink = sink
+        self._failed = False # a write failed, see when_written()
+        self._queue = Queue.Queue()
+        self._thread = threading.Thread(target=self._writer)
+        self._thread.daemon = True
+        self._thread.start()
+
+
+    def __str__(self):
+        return str(self.sink)
+
+
+    def _write_many(self, records):
+
+        if not records:
+            return
+        try:
+            self.sink.write_many(records)
+        except Exception as exc:
+            logger.error("failed to write %i records to %s: %s", len(records), self.sink, exc, exc_info=True)
+            self._failed = True
+
+
+    def _writer(self):
+
+        while True:
+            items = [self._queue.get()]
+            while True:
+                try:
+                    items.append(self._queue.get_nowait())
+                except Queue.Empty:
+                    break
+            # records are written in one go, up to the next function
+            records = []
+            for item in items:
+                if item is None:
+                    continue
+                if callable(item):
+                    self._write_many(records)
+                    records = []
+                    if self._failed:
+                        logger.warning("not calling %s, records failed to be written", item)
+                        continue
+                    try:
+                        item()
+                    except Exception as exc:
+                        logger.error("failed to call %s: %s", item, exc, exc_info=True)
+                else:
+                    records.append(item)
+            self._write_many(records)
+            for _ in items:
+                self._queue.task_done()
+            if None in items:
+                return
+
+
+    def prepare(self):
+        self.sink.prepare()
+
+
+    def write(self, doctype, doc_id, doc):
+        self._queue.put((doctype, doc_id, doc))
+
+
+    def when_written(self, f):
+        """Have the writer thread call f() once the records written so far
+        are stored, see class docstring."""
+
+        self._queue.put(f)
+
+
+    def flush(self):
+        """Wait until all queued records have been written."""
+        self._queue.join()
+
+
+    def benchmarks(self):
+        self.flush()
+        return self.sink.benchmarks()
+
+
+    def observations(self, benchmark_id, since=None):
+        self.flush()
+        return self.sink.observations(benchmark_id, since=since)
+
+
+    def observations_many(self, benchmark_ids):
+        self.flush()
+        return self.sink.observations_many(benchmark_ids)
+
+
+    def close(self):
+
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+        self.sink.close()
+
+
+def from_spec(spec, conn=None):
+    """Return sink for spec string.
+
+    Args:
+        spec: None, 'es:HOST[:PORT]', 'jsonl:PATH', or 'sqlite:PATH'; when
+            None, records go to the cluster connected to with 'conn'
+        conn: esbench.api.Conn
+
+    Raises:
+        ValueError: invalid spec
+    """
+
+    if not spec:
+        return EsSink(conn)
+    kind, _, rest = spec.partition(':')
+    if not rest:
+        raise ValueError("invalid stats sink: '%s'" % spec)
+    if kind == 'es':
+        host, _, port = rest.partition(':')
+        return EsSink(esbench.api.Conn(host=host, port=int(port or 9200)))
+    if kind == 'jsonl':
+        return JsonlSink(rest)
+    if kind == 'sqlite':
+        return SqliteSink(rest)
+    raise ValueError("invalid stats sink: '%s'" % spec)
+
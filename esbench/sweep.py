@@ -0,0 +1,249 @@
+# -*- coding: UTF-8 -*-
+# (c)2013 Mik Kocikowski, MIT License (http://opensource.org/licenses/MIT)
+# https://github.com/mkocikowski/esbench
+
+"""Run a benchmark for each combination of a set of parameters.
+
+A sweep matrix is a json object mapping parameters to lists of values to
+try. Parameters are dotted paths into the config (as in config.json):
+
+    {
+        "index.settings.index.number_of_shards": [1, 2, 4],
+        "index.settings.index.refresh_interval": ["1s", "30s"],
+        "config.segments": [null, 5, 1],
+        "queries.match.esbench.weight": [1, 3]
+    }
+
+Each combination of values is a 'cell', and for each cell a benchmark is
+recorded, with observations taken over the same data. The data is loaded
+only once, and reused between cells whenever that is valid:
+
+    - 'config' and 'queries' parameters, and dynamic index settings (see
+      DYNAMIC_SETTINGS), only need the settings updated, or are applied
+      by the observations themselves (for example optimize)
+    - other index parameters (number of shards, mappings, analysis) need a
+      new index; it is filled by copying from the data loaded first,
+      server side with the _reindex api where the cluster has it, or else
+      with scan / bulk, which is still much faster than loading the data
+
+Cells are run grouped by their static index settings, so that each group
+is copied only once, and within a group in order of decreasing number of
+segments (no optimize first), as optimize can't be undone. Benchmark and
+observation records are tagged with the sweep id and the cell.
+
+"""
+
+import copy
+import json
+import logging
+import itertools
+
+import esbench
+import esbench.api
+import esbench.bench
+
+
+logger = logging.getLogger(__name__)
+
+
+SWEEP_SOURCE_INDEX_NAME = 'esbench_sweep_source'
+
+# index settings which can be changed on an existing index (prefixes)
+DYNAMIC_SETTINGS = (
+    'number_of_replicas',
+    'refresh_interval',
+    'translog.',
+    'merge.',
+    'routing.',
+    'cache.',
+    'warmer.',
+    'search.slowlog.',
+    'indexing.slowlog.',
+)
+
+
+def set_path(d, path, value):
+    """Set value in nested dict at dotted path, creating dicts as needed."""
+
+    keys = path.split('.')
+    for key in keys[:-1]:
+        d = d.setdefault(key, {})
+    d[keys[-1]] = value
+
+
+def kind(path):
+    """Return 'static', 'dynamic', or 'run' for a matrix parameter.
+
+    Raises:
+        ValueError: not an 'index', 'config', or 'queries' parameter
+    """
+
+    if path.startswith('index.settings.index.'):
+        setting = path[len('index.settings.index.'):]
+        if any([setting == s or setting.startswith(s) for s in DYNAMIC_SETTINGS]):
+            return 'dynamic'
+        return 'static'
+    if path.startswith('index.'):
+        return 'static'
+    if path.startswith('config.') or path.startswith('queries.'):
+        return 'run'
+    raise ValueError("invalid sweep parameter: '%s'" % path)
+
+
+def _optimize_order(segments):
+    # None (no optimize) first, then from most to fewest segments
+    return (segments is not None, -(segments or 0))
+
+
+def cells(matrix):
+    """Return list of (cell_no, cell) in the order they are to be run.
+
+    Each cell is a dict {path: value}; cell_no is the cell's position in
+    the cartesian product of the matrix, with parameters sorted by path.
+    """
+
+    for path in matrix:
+        kind(path)
+    paths = sorted(matrix)
+    product = [dict(zip(paths, values)) for values in itertools.product(*[matrix[p] for p in paths])]
+    numbered = list(enumerate(product, 1))
+
+    def _key(item):
+        _, cell = item
+        static = [json.dumps(cell[p], sort_keys=True) for p in paths if kind(p) == 'static']
+        return (static, _optimize_order(cell.get('config.segments')))
+
+    return sorted(numbered, key=_key)
+
+
+def _static(cell):
+    return sorted([(p, json.dumps(v, sort_keys=True)) for p, v in cell.items() if kind(p) == 'static'])
+
+
+def copy_index(conn, source, dest, doctype=esbench.TEST_DOCTYPE_NAME, page_size=500):
+    """Copy all documents from source to dest index.
+
+    Uses the _reindex api if the cluster has it, else scans the source and
+    bulk indexes into dest. Returns the number of documents copied by scan /
+    bulk, None if _reindex was used.
+    """
+
+    resp = esbench.api.reindex(conn, source, dest)
+    if resp.status < 400:
+        logger.info("copied index '%s' to '%s' with _reindex", source, dest)
+        return None
+
+    count = 0
+    resp = esbench.api.scroll_start(conn, source, doctype, json.dumps({"query": {"match_all": {}}, "size": page_size}))
+    scroll_id = json.loads(resp.data).get('_scroll_id')
+    while scroll_id:
+        resp = esbench.api.scroll_next(conn, scroll_id)
+        data = json.loads(resp.data)
+        hits = data.get('hits', {}).get('hits', [])
+        if not hits:
+            break
+        lines = []
+        for hit in hits:
+            lines.append(json.dumps({"index": {"_index": dest, "_type": hit.get('_type', doctype), "_id": hit['_id']}}))
+            lines.append(json.dumps(hit['_source']))
+        resp = esbench.api.bulk(conn, "\n".join(lines) + "\n")
+        if resp.status >= 400 or '"errors":true' in (resp.data or ''):
+            logger.warning("errors copying documents to '%s': %s", dest, (resp.data or '')[:200])
+        count += len(hits)
+        scroll_id = data.get('_scroll_id', scroll_id)
+    if scroll_id:
+        esbench.api.scroll_clear(conn, scroll_id)
+    esbench.api.index_refresh(conn, dest)
+    logger.info("copied %i documents from index '%s' to '%s' with scan / bulk", count, source, dest)
+    return count
+
+
+class Sweep(object):
+    """Runs a benchmark for each cell of the sweep matrix."""
+
+    def __init__(self, config=None, conn=None, sink=None, matrix=None, bench_cls=esbench.bench.Benchmark, copy_f=copy_index, coordinator=None):
+
+        self.sweep_id = esbench.bench.uuid()
+        self.config = config
+        self.conn = conn
+        self.sink = sink
+        self.matrix = matrix
+        self.bench_cls = bench_cls
+        self.copy_f = copy_f
+        self.coordinator = coordinator # see esbench.distributed
+        self.cells = cells(matrix)
+        self.benchmarks = []
+
+
+    def cell_config(self, cell):
+
+        config = copy.deepcopy(self.config)
+        for path, value in cell.items():
+            set_path(config, path, value)
+        return config
+
+
+    def _create_test_index(self, config):
+
+        esbench.api.index_delete(self.conn, esbench.TEST_INDEX_NAME)
+        esbench.api.index_create(self.conn, esbench.TEST_INDEX_NAME, config['index'])
+
+
+    def run(self, lines):
+
+        logger.info("sweep %s: %i cells", self.sweep_id, len(self.cells))
+        if self.sink:
+            self.sink.prepare()
+        source = None
+        groups = [list(g) for _, g in itertools.groupby(self.cells, key=lambda c: _static(c[1]))]
+
+        for group_no, group in enumerate(groups):
+            config = self.cell_config(group[0][1])
+            if group_no == 0:
+                self._create_test_index(config)
+                loader = self.bench_cls(config=config, conn=self.conn, sink=self.sink, coordinator=self.coordinator)
+                count, size_b = loader.load(lines)
+                esbench.api.index_refresh(self.conn, esbench.TEST_INDEX_NAME)
+                logger.info("sweep %s: loaded %i documents", self.sweep_id, count)
+            else:
+                if source is None:
+                    # keep a copy of the data as loaded
+                    source = SWEEP_SOURCE_INDEX_NAME
+                    esbench.api.index_delete(self.conn, source)
+                    esbench.api.index_create(self.conn, source, self.config['index'])
+                    self.copy_f(self.conn, esbench.TEST_INDEX_NAME, source)
+                self._create_test_index(config)
+                self.copy_f(self.conn, source, esbench.TEST_INDEX_NAME)
+
+            for cell_no, cell in group:
+                self.run_cell(cell_no, cell)
+
+        if source:
+            esbench.api.index_delete(self.conn, source)
+
+
+    def run_cell(self, cell_no, cell):
+
+        config = self.cell_config(cell)
+        dynamic = {}
+        for path, value in cell.items():
+            if kind(path) == 'dynamic':
+                dynamic[path[len('index.settings.index.'):]] = value
+        if dynamic:
+            esbench.api.index_put_settings(self.conn, esbench.TEST_INDEX_NAME, dynamic)
+
+        benchmark = self.bench_cls(config=config, conn=self.conn, sink=self.sink, coordinator=self.coordinator)
+        benchmark.sweep = {
+            'sweep_id': self.sweep_id,
+            'cell_no': cell_no,
+            'cell_count': len(self.cells),
+            'cell': cell,
+        }
+        logger.info("sweep %s: running cell %i of %i: %s", self.sweep_id, cell_no, len(self.cells), json.dumps(cell, sort_keys=True))
+        benchmark.prepare()
+        for _ in range(config['config']['observations']):
+            benchmark.observe()
+        benchmark.record()
+        self.benchmarks.append(benchmark)
+        return benchmark
+
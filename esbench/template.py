@@ -0,0 +1,299 @@
+# -*- coding: UTF-8 -*-
+# (c)2013 Mik Kocikowski, MIT License (http://opensource.org/licenses/MIT)
+# https://github.com/mkocikowski/esbench
+
+"""Query templates with named, typed parameters.
+
+Any string in a query defined in the config file can contain named slots,
+"%(name)s", which get a new value each time the query is executed. The
+values come from parameter sources, defined per slot in the query's
+'esbench' settings:
+
+    "esbench": {
+        "params": {
+            "variable": {"type": "string", "length": 6},
+            "term": {"type": "terms", "values": ["foo", "bar", "baz"]},
+            "year": {"type": "range", "min": 2005, "max": 2012},
+            "published": {"type": "date", "min": "2005-01-01", "max": "2012-12-31"},
+            "tags": {"type": "list", "values": ["a", "b", "c", "d"], "size": 2}
+        }
+    }
+
+Source types:
+
+    - string: random string of ascii letters, 'length' long (default 6)
+    - terms: random item of 'values', or of lines of the file at 'path'
+    - range: random number between 'min' and 'max' (inclusive); integer
+      unless either bound is a float
+    - date: random date between 'min' and 'max', formatted with 'format'
+      (default '%Y-%m-%d')
+    - list: list of 'size' (default 1) distinct random items of 'values'
+
+When a slot makes up a whole string ("%(year)s"), the value is substituted
+as json, so numbers and lists stay numbers and lists; when it is embedded in
+a longer string, the value is inserted as text (list items joined with
+spaces). For compatibility with older config files, a 'variable' slot with
+no source defined gets a random 6 letter string, and '%%' stands for '%'.
+
+Templates are compiled once into a list of literal parts and slot positions.
+Parameter values are generated, and queries rendered, in blocks, so
+rendering a query costs little more than taking the next string off a list.
+Blocks are rendered ahead, outside of the timed executions: prepare() renders
+the executions expected in a run before it starts. Nothing is rendered while
+the run is timed, unless it runs out of rendered queries; then render()
+renders the next block.
+
+"""
+
+import re
+import json
+import json.encoder
+import random
+import string
+import datetime
+import threading
+import collections
+
+
+DEFAULT_PARAMS = {
+    'variable': {'type': 'string', 'length': 6},
+}
+
+DEFAULT_BLOCK_SIZE = 1024
+
+SLOT_RE = re.compile(r'"%\((\w+)\)s"|%\((\w+)\)s|%%')
+
+
+def _string_source(spec, rng):
+
+    length = int(spec.get('length', 6))
+    letters = string.ascii_letters
+    n_letters = len(letters)
+
+    def block(n):
+        s = "".join([letters[int(rng.random() * n_letters)] for _ in xrange(n * length)])
+        return [s[i:i+length] for i in xrange(0, n * length, length)]
+
+    return block
+
+
+def _terms_source(spec, rng):
+
+    if 'path' in spec:
+        with open(spec['path'], 'rU') as f:
+            values = [line.strip() for line in f if line.strip()]
+    else:
+        values = list(spec['values'])
+    if not values:
+        raise ValueError("'terms' source needs at least one value")
+    n_values = len(values)
+
+    def block(n):
+        return [values[int(rng.random() * n_values)] for _ in xrange(n)]
+
+    return block
+
+
+def _range_source(spec, rng):
+
+    lo = spec['min']
+    hi = spec['max']
+
+    if type(lo) is float or type(hi) is float:
+        def block(n):
+            return [lo + (rng.random() * (hi - lo)) for _ in xrange(n)]
+    else:
+        def block(n):
+            return [lo + int(rng.random() * (hi - lo + 1)) for _ in xrange(n)]
+
+    return block
+
+
+def _date_source(spec, rng):
+
+    fmt = spec.get('format', '%Y-%m-%d')
+    lo = datetime.datetime.strptime(spec['min'], '%Y-%m-%d')
+    days = (datetime.datetime.strptime(spec['max'], '%Y-%m-%d') - lo).days + 1
+
+    def block(n):
+        return [(lo + datetime.timedelta(days=int(rng.random() * days))).strftime(fmt) for _ in xrange(n)]
+
+    return block
+
+
+def _list_source(spec, rng):
+
+    values = list(spec['values'])
+    size = int(spec.get('size', 1))
+
+    def block(n):
+        return [rng.sample(values, size) for _ in xrange(n)]
+
+    return block
+
+
+SOURCES = {
+    'string': _string_source,
+    'terms': _terms_source,
+    'range': _range_source,
+    'date': _date_source,
+    'list': _list_source,
+}
+
+
+def source(spec, rng=random):
+    """Return block generator for a parameter spec.
+
+    Args:
+        spec: dict, with 'type' being one of the SOURCES keys, and the rest
+            being type specific settings (see module docstring)
+        rng: source of randomness, random.Random instance or the 'random'
+            module (default)
+
+    Returns:
+        function, which when called with n returns a list of n values
+
+    Raises:
+        ValueError: unknown source type
+
+    """
+
+    try:
+        return SOURCES[spec['type']](spec, rng)
+    except KeyError:
+        raise ValueError("invalid parameter source: %s" % (spec, ))
+
+
+# C accelerated, much faster than json.dumps() for plain strings
+_encode_string = json.encoder.encode_basestring_ascii
+
+
+def _encode_json(value):
+    """Return value encoded as json, for substituting a whole string."""
+
+    if type(value) in (str, unicode):
+        return _encode_string(value)
+    if type(value) in (int, long):
+        return str(value)
+    return json.dumps(value)
+
+
+def _encode_text(value):
+    """Return value as json-escaped text, for embedding in a string."""
+
+    if type(value) is list:
+        value = u" ".join([unicode(v) for v in value])
+    elif type(value) not in (str, unicode):
+        value = unicode(value)
+    return _encode_string(value)[1:-1]
+
+
+def compile_template(template):
+    """Compile template string into a concatenation plan.
+
+    Returns:
+        tuple (parts, slots), where parts is a list of strings, and slots a
+        list of (position, name, whole) tuples, one for each slot; position
+        is the index in parts which the slot's value fills, and whole is
+        True when the slot made up a whole json string.
+
+    """
+
+    parts = []
+    slots = []
+    literal = []
+    pos = 0
+    for match in SLOT_RE.finditer(template):
+        literal.append(template[pos:match.start()])
+        pos = match.end()
+        if match.group(0) == '%%':
+            literal.append('%')
+            continue
+        parts.append("".join(literal))
+        literal = []
+        if match.group(1):
+            slots.append((len(parts), match.group(1), True))
+        else:
+            slots.append((len(parts), match.group(2), False))
+        parts.append('')
+    literal.append(template[pos:])
+    parts.append("".join(literal))
+    return parts, slots
+
+
+class Template(object):
+    """Compiled query template, renders query strings.
+
+    Rendering is thread safe.
+    """
+
+    def __init__(self, template, params=None, rng=None, block_size=DEFAULT_BLOCK_SIZE):
+
+        self.parts, self.slots = compile_template(template)
+        self.block_size = block_size
+
+        specs = dict(DEFAULT_PARAMS)
+        specs.update(params or {})
+        rng = rng or random
+        self.sources = {}
+        for _, name, _ in self.slots:
+            if name not in specs:
+                raise ValueError("no parameter source defined for slot '%s'" % name)
+            if name not in self.sources:
+                self.sources[name] = source(specs[name], rng)
+
+        self._rendered = collections.deque()
+        self._lock = threading.Lock()
+        # held while rendering, so that blocks are rendered one at a time,
+        # in order
+        self._render_lock = threading.Lock()
+
+
+    def _render_block(self):
+
+        # each slot gets one value per rendered query, even if the slot
+        # appears in the template more than once
+        values = {name: f(self.block_size) for name, f in self.sources.items()}
+        encoded = []
+        for position, name, whole in self.slots:
+            encode = _encode_json if whole else _encode_text
+            encoded.append((position, [encode(v) for v in values[name]]))
+
+        rendered = []
+        parts = list(self.parts)
+        for i in xrange(self.block_size):
+            for position, e in encoded:
+                parts[position] = e[i]
+            rendered.append("".join(parts))
+        return rendered
+
+
+    def _refill(self, n):
+        """Render blocks until at least 'n' queries are ready."""
+
+        with self._render_lock:
+            while len(self._rendered) < n:
+                block = self._render_block()
+                with self._lock:
+                    self._rendered.extend(block)
+
+
+    def prepare(self, n):
+        """Render ahead, until at least 'n' queries are ready."""
+
+        if not self.slots:
+            return
+        self._refill(n)
+
+
+    def render(self):
+
+        if not self.slots:
+            return self.parts[0]
+        while True:
+            with self._lock:
+                if self._rendered:
+                    return self._rendered.popleft()
+            # nothing rendered ahead
+            self._refill(1)
+
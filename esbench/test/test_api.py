@@ -6,6 +6,7 @@ import datetime
 import os.path
 import unittest
 import json
+import itertools
 import httplib
 import logging
 
@@ -68,6 +69,13 @@ class ApiConnTest(unittest.TestCase):
         c.close()
         self.assertIsNone(c.conn)
 
+    def test_clone(self):
+        c = esbench.api.Conn(host='foo', port=9201, timeout=5, conn_cls=MockHTTPConnection)
+        c.connect()
+        c2 = c.clone()
+        self.assertEqual(c2.__dict__, {'conn': None, 'host': 'foo', 'port': 9201, 'timeout': 5, 'conn_cls': MockHTTPConnection})
+        self.assertIsNot(c.conn, c2.conn)
+
     def test_connect(self):
         with esbench.api.connect(conn_cls=MockHTTPConnection) as c:
             resp = c.get("foo/bar")
@@ -122,6 +130,25 @@ class ApiConnTest(unittest.TestCase):
         self.assertEqual("/foo", esbench.api._massage_request_path("//foo"))
         self.assertEqual("/foo?bar", esbench.api._massage_request_path("foo?bar"))
 
+class SearchSummaryTest(unittest.TestCase):
+
+    def test_search_summary(self):
+        data = '{"took":12,"timed_out":false,"_shards":{"total":5,"successful":5,"failed":0},"hits":{"total":1234,"max_score":1.0,"hits":[%s]}}' % ",".join(['{"_id":"%i","_source":{"took":1,"hits":{"total":0}}}' % i for i in range(100)])
+        self.assertEqual(esbench.api.SearchSummary(12, False, 0, 1234), esbench.api.search_summary(data))
+        # shard failures push the hits past the prefix
+        data = '{"took":3,"timed_out":true,"_shards":{"total":5,"successful":4,"failed":1,"failures":[{"index":"i1","shard":2,"status":500,"reason":"%s"}]},"hits":{"total":10,"max_score":1.0,"hits":[]}}' % ("x" * 1000)
+        self.assertEqual(esbench.api.SearchSummary(3, True, 1, 10), esbench.api.search_summary(data))
+        self.assertIsNone(esbench.api.search_summary('{"foo": "bar"}'))
+        self.assertIsNone(esbench.api.search_summary('<html>'))
+        self.assertIsNone(esbench.api.search_summary(None))
+
+    def test_msearch_summaries(self):
+        data = '{"responses":[{"took":2,"timed_out":false,"_shards":{"total":5,"successful":5,"failed":0},"hits":{"total":7,"hits":[]}},{"error":"SearchPhaseExecutionException[...]"}]}'
+        self.assertEqual([esbench.api.SearchSummary(2, False, 0, 7), None], esbench.api.msearch_summaries(data))
+        self.assertIsNone(esbench.api.msearch_summaries('{"took":2}'))
+        self.assertIsNone(esbench.api.msearch_summaries(None))
+
+
 class ApiFuncTest(unittest.TestCase):
 
     def setUp(self):
@@ -131,6 +158,53 @@ class ApiFuncTest(unittest.TestCase):
         resp = esbench.api.document_post(self.c, 'i1', 'd1', 'foo')
         self.assertEqual(resp.curl, "curl -XPOST http://localhost:9200/i1/d1 -d 'foo'")
 
+    def test_msearch(self):
+        resp = esbench.api.msearch(self.c, 'i1', 'd1', ['{"query": 1}', '{"query": 2}'])
+        self.assertEqual(resp.curl, "curl -XPOST http://localhost:9200/i1/d1/_msearch -d '{}\n{\"query\": 1}\n{}\n{\"query\": 2}\n'")
+
+    def test_scroll(self):
+        resp = esbench.api.scroll_start(self.c, 'i1', 'd1', 'foo', scroll='2m')
+        self.assertEqual(resp.curl, "curl -XPOST http://localhost:9200/i1/d1/_search?search_type=scan&scroll=2m -d 'foo'")
+        resp = esbench.api.scroll_start(self.c, 'i1', 'd1', 'foo', scan=False)
+        self.assertEqual(resp.curl, "curl -XPOST http://localhost:9200/i1/d1/_search?scroll=1m -d 'foo'")
+        resp = esbench.api.scroll_next(self.c, 'abc')
+        self.assertEqual(resp.curl, "curl -XGET http://localhost:9200/_search/scroll?scroll=1m -d 'abc'")
+        resp = esbench.api.scroll_clear(self.c, 'abc')
+        self.assertEqual(resp.curl, "curl -XDELETE http://localhost:9200/_search/scroll/abc")
+
+    def test_search_hits(self):
+
+        docs = [{'_id': str(i)} for i in range(7)]
+
+        class _Scroll(MockHTTPConnection):
+            # pages of 3 hits, over the scroll api
+            def getresponse(self):
+                method, url, body = self.req
+                if method == 'DELETE':
+                    return MockHTTPResponse((method, url, '{}'))
+                page = 0 if method == 'POST' else int(body)
+                data = {'_scroll_id': str(page + 1), 'hits': {'total': len(docs), 'hits': docs[page*3:page*3+3]}}
+                return MockHTTPResponse((method, url, json.dumps(data)))
+
+        c = esbench.api.Conn(conn_cls=_Scroll)
+        hits = esbench.api.search_hits(c, 'i1', 'd1', {'sort': [{'f': 'asc'}]}, size=3)
+        self.assertEqual(docs, list(hits))
+        self.assertEqual(
+            [('POST', '/i1/d1/_search?scroll=1m'), ('GET', '/_search/scroll?scroll=1m'), ('GET', '/_search/scroll?scroll=1m'), ('DELETE', '/_search/scroll/3')],
+            [r[:2] for r in c.conn.requests]
+        )
+        self.assertEqual({'sort': [{'f': 'asc'}], 'size': 3}, json.loads(c.conn.requests[0][2]))
+
+        # closing the generator early clears the scroll
+        c = esbench.api.Conn(conn_cls=_Scroll)
+        hits = esbench.api.search_hits(c, 'i1', 'd1', {}, size=3)
+        self.assertEqual(docs[:4], list(itertools.islice(hits, 4)))
+        hits.close()
+        self.assertEqual(('DELETE', '/_search/scroll/2'), c.conn.requests[-1][:2])
+
+        # not a search response
+        self.assertEqual([], list(esbench.api.search_hits(self.c, 'i1', 'd1', {})))
+
     def test_index_create(self):
         resp = esbench.api.index_create(self.c, 'i1', config={'mapping': 'foo'})
         self.assertEqual(resp.curl, """curl -XPUT http://localhost:9200/i1 -d \'{"mapping": "foo"}\'""")
@@ -143,15 +217,36 @@ class ApiFuncTest(unittest.TestCase):
         resp = esbench.api.index_get_stats(self.c, 'i1', '123_mlt,123_match')
         self.assertEqual(resp.curl, """curl -XGET http://localhost:9200/i1/_stats?clear=true&docs=true&store=true&search=true&merge=true&indexing=true&fielddata=true&fields=*&groups=123_mlt,123_match""")
 
+    def test_index_count(self):
+        resp = esbench.api.index_count(self.c, 'i1')
+        self.assertEqual(resp.curl, """curl -XGET http://localhost:9200/i1/_count""")
+
     def test_index_set_refresh_interval(self):
         resp = esbench.api.index_set_refresh_interval(self.c, 'i1', '5s')
         self.assertEqual(resp.curl, """curl -XPUT http://localhost:9200/i1/_settings -d \'{"index": {"refresh_interval": "5s"}}\'""")
 
+    def test_index_put_settings(self):
+        resp = esbench.api.index_put_settings(self.c, 'i1', {'refresh_interval': '5s'})
+        self.assertEqual(resp.curl, """curl -XPUT http://localhost:9200/i1/_settings -d '{"index": {"refresh_interval": "5s"}}'""")
+
+    def test_reindex(self):
+        resp = esbench.api.reindex(self.c, 'i1', 'i2')
+        self.assertEqual(resp.curl, """curl -XPOST http://localhost:9200/_reindex?refresh=true -d '{"dest": {"index": "i2"}, "source": {"index": "i1"}}'""")
+        resp = esbench.api.index_refresh(self.c, 'i2')
+        self.assertEqual(resp.curl, """curl -XPOST http://localhost:9200/i2/_refresh""")
+
+    def test_index_clear_cache(self):
+        resp = esbench.api.index_clear_cache(self.c, 'i1')
+        self.assertEqual(resp.curl, """curl -XPOST http://localhost:9200/i1/_cache/clear""")
+
+
     def test_index_optimize(self):
         resp = esbench.api.index_optimize(self.c, 'i1')
         self.assertEqual(resp.curl, """curl -XPOST http://localhost:9200/i1/_optimize?refresh=true&flush=true&wait_for_merge=true""")
         resp = esbench.api.index_optimize(self.c, 'i1', nseg=10)
         self.assertEqual(resp.curl, """curl -XPOST http://localhost:9200/i1/_optimize?max_num_segments=10&refresh=true&flush=true&wait_for_merge=true""")
+        resp = esbench.api.index_optimize(self.c, 'i1', nseg=10, wait_for_merge=False)
+        self.assertEqual(resp.curl, """curl -XPOST http://localhost:9200/i1/_optimize?max_num_segments=10&refresh=true&flush=true&wait_for_merge=false""")
 
     def test_index_get_segments(self):
         resp = esbench.api.index_get_segments(self.c, 'i1')
@@ -8,9 +8,18 @@ import unittest
 import json
 import itertools
 import logging
+import time
+import functools
+import shutil
+import tempfile
 
 import esbench.bench
+import esbench.checkpoint
+import esbench.data
 import esbench.api
+import esbench.sampler
+import esbench.replay
+import esbench.sink
 import esbench.client
 import esbench.test.test_api
 
@@ -27,8 +36,145 @@ class BenchTest(unittest.TestCase):
 
 
 
+class MockSearchHTTPConnection(esbench.test.test_api.MockHTTPConnection):
+    """Responds to every request with the same search response."""
+
+    response = '{"took":2,"timed_out":false,"_shards":{"total":1,"successful":1,"failed":0},"hits":{"total":0,"max_score":null,"hits":[]}}'
+
+    def getresponse(self):
+        resp = esbench.test.test_api.MockHTTPResponse((self.req[0], self.req[1], self.response))
+        self.responses.append(resp)
+        return resp
+
+
+class MockMultiSearchHTTPConnection(esbench.test.test_api.MockHTTPConnection):
+    """Responds to _msearch requests with one response per search, with
+    searches whose body contains 'fail' failing."""
+
+    def getresponse(self):
+        bodies = self.req[2].splitlines()[1::2]
+        items = [
+            '{"error":"failed"}' if 'fail' in body else MockSearchHTTPConnection.response
+            for body in bodies
+        ]
+        data = '{"responses":[%s]}' % ",".join(items)
+        resp = esbench.test.test_api.MockHTTPResponse((self.req[0], self.req[1], data))
+        self.responses.append(resp)
+        return resp
+
+
+class MockTraversalHTTPConnection(esbench.test.test_api.MockHTTPConnection):
+    """Serves a result set of 'total' hits, to scrolls and paged searches.
+
+    Scroll ids are the offset of the next page; with 'scan' the first
+    response has no hits.
+    """
+
+    total = 25
+
+    def getresponse(self):
+        method, url, body = self.req
+        d = {"took": 1, "timed_out": False, "_shards": {"total": 1, "successful": 1, "failed": 0}}
+        if url.startswith('/_search/scroll?'):
+            start, size = [int(x) for x in body.split(':')]
+            d['_scroll_id'] = "%i:%i" % (start + size, size)
+        elif method == 'DELETE':
+            d = {}
+            start, size = 0, 0
+        elif url.startswith('/_cluster/nodes/stats'):
+            self.heap = getattr(self, 'heap', 0) + 1000
+            d = {'nodes': {'n1': {'jvm': {'mem': {'heap_used_in_bytes': self.heap}}}, 'n2': {'jvm': {'mem': {'heap_used_in_bytes': 1}}}}}
+            start, size = 0, 0
+        else:
+            q = json.loads(body)
+            start, size = q.get('from', 0), q['size']
+            if 'scroll=' in url:
+                if 'search_type=scan' in url:
+                    d['_scroll_id'] = "%i:%i" % (start, size)
+                    size = 0
+                else:
+                    d['_scroll_id'] = "%i:%i" % (start + size, size)
+        d['hits'] = {'total': self.total, 'hits': [{'_id': str(i)} for i in range(start, min(start + size, self.total))]}
+        resp = esbench.test.test_api.MockHTTPResponse((method, url, json.dumps(d)))
+        self.responses.append(resp)
+        return resp
+
+
+class TraversalQueryTest(unittest.TestCase):
+
+    def setUp(self):
+        self.conn = esbench.api.Conn(conn_cls=MockTraversalHTTPConnection)
+
+    def test_search_query(self):
+        q = esbench.bench.search_query('match', {'match': {'foo': 'bar'}}, 'ABC', 'test', 'doc')
+        self.assertIs(type(q), esbench.bench.SearchQuery)
+        q = esbench.bench.search_query('match', {'esbench': {'type': 'scroll'}, 'match': {'foo': 'bar'}}, 'ABC', 'test', 'doc')
+        self.assertIs(type(q), esbench.bench.ScrollQuery)
+        with self.assertRaises(ValueError):
+            esbench.bench.search_query('match', {'esbench': {'type': 'foo'}}, 'ABC', 'test', 'doc')
+
+    def test_scroll(self):
+        q = esbench.bench.search_query('all', {'esbench': {'type': 'scroll', 'size': 10}, 'query': {'match_all': {}}}, 'ABC', 'test', 'doc')
+        q.execute(self.conn)
+        q.execute(self.conn)
+        # scan response, 3 pages of hits, empty page; clear
+        self.assertEqual(12, len(self.conn.conn.requests))
+        self.assertEqual('DELETE', self.conn.conn.requests[-1][0])
+        self.assertEqual(2, q.execution_count)
+        self.assertEqual(10, q.pages)
+        self.assertEqual(50, q.docs)
+        self.assertEqual(10, q.page_latency.count)
+        self.assertEqual(2, q.latency.count)
+        self.assertEqual(5000, q.took.max)
+        self.assertEqual(50, q.responses['hits_total'])
+        s = q.traversal_stats()
+        self.assertEqual(25, s['docs_per_traversal'])
+        self.assertEqual(5, s['pages_per_traversal'])
+        self.assertIsNone(s['heap_used_delta_in_bytes'])
+
+        q = esbench.bench.search_query('all', {'esbench': {'type': 'scroll', 'size': 10, 'scan': False, 'max_pages': 2}, 'query': {'match_all': {}}}, 'ABC', 'test', 'doc')
+        q.execute(self.conn)
+        self.assertEqual(2, q.pages)
+        self.assertEqual(20, q.docs)
+
+    def test_paginate(self):
+        q = esbench.bench.search_query('all', {'esbench': {'type': 'paginate', 'size': 10}, 'query': {'match_all': {}}}, 'ABC', 'test', 'doc')
+        q.execute(self.conn)
+        self.assertEqual(3, len(self.conn.conn.requests))
+        self.assertEqual([0, 10, 20], [json.loads(r[2])['from'] for r in self.conn.conn.requests])
+        self.assertEqual(3, q.pages)
+        self.assertEqual(25, q.docs)
+        self.assertEqual(0, q.responses['errors'])
+
+
 class SearchQueryTest(unittest.TestCase):
 
+    def test_execute_summary(self):
+
+        q = esbench.bench.SearchQuery(
+                name='match',
+                query={'match': {'foo': 'bar'}},
+                observation_id='ABCDEFGH',
+                index='test',
+                doctype='doc'
+        )
+        # mock returns the request as the response, not a search response
+        c = esbench.api.Conn(conn_cls=esbench.test.test_api.MockHTTPConnection)
+        q.execute(c)
+        self.assertEqual(0, q.responses['parsed'])
+        self.assertEqual(0, q.took.count)
+
+        c = esbench.api.Conn(conn_cls=MockSearchHTTPConnection)
+        for _ in range(3):
+            q.execute(c)
+        self.assertEqual(3, q.responses['parsed'])
+        self.assertEqual(3, q.responses['zero_hits'])
+        self.assertEqual(0, q.responses['partial'])
+        self.assertEqual(3, q.took.count)
+        self.assertEqual(2000, q.took.max)
+        self.assertEqual(3, q.overhead.count)
+
+
     def test_execute(self):
 
         with self.assertRaises(ValueError):
@@ -51,6 +197,48 @@ class SearchQueryTest(unittest.TestCase):
         resp = q.execute(c)
         self.assertEqual(resp.curl, """curl -XPOST http://localhost:9200/test/doc/_search -d \'{"match": {"foo": "bar"}, "stats": ["ABCDEFGH_match"]}\'""")
         self.assertEqual(1, q.execution_count)
+        self.assertEqual(1, q.latency.count)
+        self.assertEqual(0, q.send_lag.count)
+        q.execute(c, t_intended=time.time()-1)
+        self.assertEqual(2, q.execution_count)
+        self.assertTrue(q.latency.max >= 1000000)
+        self.assertTrue(q.send_lag.max >= 1000000)
+
+        # per-query esbench settings are not sent to ES
+        q = esbench.bench.SearchQuery(
+                name='match',
+                query={'match': {'foo': 'bar'}, 'esbench': {'warmup': 10}},
+                observation_id='ABCDEFGH',
+                index='test',
+                doctype='doc'
+        )
+        self.assertEqual({'warmup': 10}, q.options)
+        resp = q.execute(c)
+        self.assertNotIn('esbench', json.loads(c.conn.req[2]))
+
+
+    def test_state(self):
+
+        def _query():
+            return esbench.bench.SearchQuery(name='match', query={'match': {'foo': 'bar'}}, observation_id='ABCDEFGH', index='test', doctype='doc')
+
+        c = esbench.api.Conn(conn_cls=MockSearchHTTPConnection)
+        q1 = _query()
+        q1.execute(c)
+        q1.t_client = 2.0
+        q2 = _query()
+        for _ in range(3):
+            q2.execute(c)
+        q2.skip()
+        q2.t_client = 3.0
+        # state goes over the wire as json
+        q1.merge_state(json.loads(json.dumps(q2.state())))
+        self.assertEqual(4, q1.execution_count)
+        self.assertEqual(1, q1.missed)
+        self.assertEqual(3.0, q1.t_client)
+        self.assertEqual(4, q1.latency.count)
+        self.assertEqual(4, q1.took.count)
+        self.assertEqual(4, q1.responses['parsed'])
 
 
 class ObservationTest(unittest.TestCase):
@@ -101,6 +289,13 @@ class ObservationTest(unittest.TestCase):
         self.assertEqual(s['docs']['count'], 100)
         self.assertIsNone(s['search']['groups']['mlt']['client_time'])
         self.assertEqual(0, s['search']['groups']['mlt']['client_total'])
+        self.assertEqual(0, s['search']['groups']['mlt']['client_latency']['count'])
+        self.assertIsNone(s['search']['groups']['mlt']['client_qps'])
+        # no precision target, no precision stats
+        self.assertNotIn('client_precision', s['search']['groups']['mlt'])
+        self.observation.precision = 0.05
+        s = self.observation._stats(stats_f=_f)
+        self.assertIsNone(s['search']['groups']['mlt']['client_precision']['precision'])
         self.assertEqual(s['store']['size_in_bytes'], 3024230)
 
 
@@ -116,14 +311,436 @@ class ObservationTest(unittest.TestCase):
             json.loads(self.conn.conn.req[2])['stats'][0])
 
 
+    def test_run_clients(self):
+        observation = esbench.bench.Observation(
+                        conn = self.conn,
+                        benchmark_id = 'bench1',
+                        queries = self.queries,
+                        reps = 10,
+                        clients = 4,
+        )
+        observation.run()
+        # each client has its own connection
+        self.assertIsNone(self.conn.conn)
+        for query in observation.queries:
+            self.assertEqual(10, query.execution_count)
+            self.assertEqual(10, query.latency.count)
+            self.assertIsNotNone(query.t_client)
+
+
+    def test_run_clients_closed(self):
+        # the clients' connections are closed even if the run fails
+        def _execute(jobs, conns):
+            for conn in conns:
+                conn.connect()
+            raise ValueError("failed")
+        for replay in [False, True]:
+            observation = esbench.bench.Observation(
+                            conn = self.conn,
+                            benchmark_id = 'bench1',
+                            queries = self.queries,
+                            reps = 10,
+                            clients = 3,
+            )
+            clones = []
+            observation.conn.clone = lambda: clones.append(esbench.api.Conn(conn_cls=esbench.test.test_api.MockHTTPConnection)) or clones[-1]
+            observation._execute = _execute
+            observation._execute_closed_loop = _execute
+            if replay:
+                observation.replay = esbench.replay.Replay(os.devnull, speed=0.0)
+                self.assertRaises(ValueError, observation._run_replay)
+            else:
+                self.assertRaises(ValueError, observation._run_local)
+            self.assertEqual(3, len(clones))
+            self.assertEqual([None] * 3, [c.conn for c in clones])
+
+
+    def test_run_failures(self):
+        class FailingConn(object):
+            def post(self, path, data):
+                raise IOError("connection refused")
+        for clients in [1, 3]:
+            query = esbench.bench.SearchQuery('q1', {'query': {}}, 'obs1', 'i', 'd')
+            self.observation._execute_closed_loop(iter([query] * 6), [FailingConn() for _ in range(clients)])
+            self.assertEqual(6, query.responses['errors'])
+            self.assertEqual(0, query.execution_count)
+
+
+    def test_run_open_loop(self):
+        observation = esbench.bench.Observation(
+                        conn = self.conn,
+                        benchmark_id = 'bench1',
+                        queries = self.queries,
+                        reps = 10,
+                        clients = 2,
+                        rate = 500,
+        )
+        t1 = time.time()
+        observation.run()
+        # 2 queries, 10 reps each, 500 per second
+        self.assertTrue(time.time() - t1 >= 0.036)
+        for query in observation.queries:
+            self.assertEqual(10, query.execution_count)
+            self.assertEqual(10, query.send_lag.count)
+            self.assertEqual(0, query.missed)
+            s = observation._open_loop_stats(query)
+            self.assertEqual(10, s['sent'])
+            self.assertEqual(10, s['send_lag']['count'])
+
+
+    def test_schedule(self):
+        self.observation.rate = 10
+        schedule = list(itertools.islice(self.observation._schedule(100), 10))
+        self.assertEqual(10, len(schedule))
+        self.assertEqual(100, schedule[0])
+        self.assertAlmostEqual(100.9, schedule[-1])
+        self.observation.arrivals = 'poisson'
+        schedule = list(itertools.islice(self.observation._schedule(100), 10))
+        self.assertEqual(10, len(schedule))
+        self.assertEqual(sorted(schedule), schedule)
+        self.assertNotAlmostEqual(100.9, schedule[-1])
+
+
+    def test_run_warmup(self):
+        queries = dict(self.queries)
+        queries['match'] = dict(queries['match'], esbench={'warmup': 5})
+        observation = esbench.bench.Observation(
+                        conn = self.conn,
+                        benchmark_id = 'bench1',
+                        queries = queries,
+                        reps = 10,
+                        warmup = 2,
+        )
+        observation.run()
+        self.assertEqual(27, len(self.conn.conn.requests))
+        self.assertEqual(2, observation.warmup_queries['mlt'].execution_count)
+        self.assertEqual(5, observation.warmup_queries['match'].execution_count)
+        for query in observation.queries:
+            self.assertEqual(10, query.execution_count)
+            self.assertEqual(10, query.latency.count)
+        groups = [json.loads(r[2])['stats'][0] for r in self.conn.conn.requests]
+        self.assertEqual(groups.count("%s_match_warmup" % observation.observation_id), 5)
+        self.assertEqual(groups.count("%s_match" % observation.observation_id), 10)
+
+        # time based warmup
+        observation = esbench.bench.Observation(
+                        conn = self.conn,
+                        benchmark_id = 'bench1',
+                        queries = self.queries,
+                        reps = 1,
+                        warmup_time = 0.01,
+        )
+        observation.run()
+        for query in observation.warmup_queries.values():
+            self.assertTrue(query.t_client >= 0.01)
+            self.assertTrue(query.execution_count > 1)
+
+
+    def test_run_cold(self):
+        queries = dict(self.queries)
+        queries['match'] = dict(queries['match'], esbench={'cold': 3})
+        observation = esbench.bench.Observation(
+                        conn = self.conn,
+                        benchmark_id = 'bench1',
+                        queries = queries,
+                        reps = 2,
+                        cold = 1,
+                        warmup = 1,
+        )
+        observation.run()
+        self.assertEqual(1, observation.cold_queries['mlt'].execution_count)
+        self.assertEqual(3, observation.cold_queries['match'].execution_count)
+        self.assertEqual(3, observation.cold_queries['match'].latency.count)
+        for query in observation.queries:
+            self.assertEqual(2, query.execution_count)
+        # caches are cleared before each cold execution, and cold
+        # executions come before the warmup
+        paths = [r[1] for r in self.conn.conn.requests]
+        groups = [json.loads(r[2])['stats'][0] if r[2] else None for r in self.conn.conn.requests]
+        self.assertEqual(4, paths.count('/esbench_test/_cache/clear'))
+        for i, group in enumerate(groups):
+            if group and group.endswith('_cold'):
+                self.assertEqual('/esbench_test/_cache/clear', paths[i-1])
+        match_cold = "%s_match_cold" % observation.observation_id
+        match_warmup = "%s_match_warmup" % observation.observation_id
+        self.assertTrue(len(groups) - 1 - groups[::-1].index(match_cold) < groups.index(match_warmup))
+
+        self.assertEqual({}, self.observation.cold_queries)
+
+
+    def test_drop_os_cache(self):
+        synced = []
+        self.assertFalse(esbench.bench.drop_os_cache(path='/nonexistent/drop_caches', sync_f=lambda: synced.append(True)))
+        self.assertEqual([True], synced)
+
+
+    def test_mix(self):
+        queries = dict(self.queries)
+        queries['match'] = dict(queries['match'], esbench={'weight': 3})
+        observation = esbench.bench.Observation(
+                        conn = self.conn,
+                        benchmark_id = 'bench1',
+                        queries = queries,
+                        reps = 10,
+                        mix = True,
+                        seed = 1,
+        )
+        jobs = observation._mix()
+        self.assertEqual(20, len(jobs))
+        self.assertEqual(15, len([q for q in jobs if q.name == 'match']))
+        self.assertEqual(5, len([q for q in jobs if q.name == 'mlt']))
+        # deterministic
+        self.assertEqual([q.name for q in jobs], [q.name for q in observation._mix()])
+        observation.seed = 2
+        self.assertNotEqual([q.name for q in jobs], [q.name for q in observation._mix()])
+        # interleaved
+        self.assertNotEqual([q.name for q in jobs], sorted([q.name for q in jobs]))
+
+        observation.seed = 1
+        observation.run()
+        self.assertEqual(20, len(self.conn.conn.requests))
+        executed = [json.loads(r[2])['stats'][0].split('_', 1)[1] for r in self.conn.conn.requests]
+        self.assertEqual(executed, [q.name for q in jobs])
+        for query in observation.queries:
+            self.assertEqual(query.t_client, observation.t_client)
+            self.assertEqual(query.execution_count, query.latency.count)
+
+        for weights in [(0, 0), (-1, 2)]:
+            for query, weight in zip(observation.queries, weights):
+                query.options['weight'] = weight
+            self.assertRaises(ValueError, observation._mix)
+
+
+    def test_run_msearch(self):
+        queries = dict(self.queries)
+        queries['fail'] = {'match': {'fail': 'bar'}}
+        conn = esbench.api.Conn(conn_cls=MockMultiSearchHTTPConnection)
+        observation = esbench.bench.Observation(
+                        conn = conn,
+                        benchmark_id = 'bench1',
+                        queries = queries,
+                        reps = 10,
+                        msearch = 4,
+        )
+        observation.run()
+        # 3 queries, 10 reps each, in batches of 4, 4, 2
+        self.assertEqual(9, len(conn.conn.requests))
+        self.assertTrue(all([r[1] == '/%s/%s/_msearch' % (esbench.TEST_INDEX_NAME, esbench.TEST_DOCTYPE_NAME) for r in conn.conn.requests]))
+        self.assertEqual(8, len(conn.conn.requests[0][2].splitlines()))
+        for query in observation.queries:
+            self.assertEqual(10, query.execution_count)
+            self.assertEqual(10, query.latency.count)
+            if query.name == 'fail':
+                self.assertEqual(10, query.responses['errors'])
+                self.assertEqual(0, query.responses['parsed'])
+            else:
+                self.assertEqual(0, query.responses['errors'])
+                self.assertEqual(10, query.responses['parsed'])
+                self.assertEqual(10, query.took.count)
+
+        # mixed batches, concurrent clients
+        observation = esbench.bench.Observation(
+                        conn = conn,
+                        benchmark_id = 'bench1',
+                        queries = self.queries,
+                        reps = 10,
+                        msearch = 3,
+                        mix = True,
+                        clients = 2,
+        )
+        observation.run()
+        for query in observation.queries:
+            self.assertEqual(10, query.execution_count)
+            self.assertEqual(10, query.responses['parsed'])
+
+
+    def test_run_traversal(self):
+        queries = dict(self.queries)
+        queries['all'] = {'esbench': {'type': 'paginate', 'size': 10}, 'query': {'match_all': {}}}
+        conn = esbench.api.Conn(conn_cls=MockTraversalHTTPConnection)
+        observation = esbench.bench.Observation(
+                        conn = conn,
+                        benchmark_id = 'bench1',
+                        queries = queries,
+                        reps = 2,
+                        msearch = 2,
+        )
+        jobs = list(observation._batches(iter(observation.queries * 2), 2))
+        self.assertEqual(4, len(jobs))
+        self.assertEqual(2, len([j for j in jobs if isinstance(j, esbench.bench.PaginateQuery)]))
+        observation.msearch = None
+        observation.run()
+        queries = {q.name: q for q in observation.queries}
+        self.assertEqual(2, queries['all'].execution_count)
+        self.assertEqual(6, queries['all'].pages)
+        s = queries['all'].traversal_stats()
+        self.assertEqual(1001, s['heap_used_before_in_bytes'])
+        self.assertEqual(1000, s['heap_used_delta_in_bytes'])
+        self.assertIsNotNone(s['docs_per_second'])
+        self.assertIsNone(observation._heap_used(cluster_f=lambda conn: esbench.api.ApiResponse(200, 'ok', '{}', '')))
+
+
+    def test_adaptive(self):
+        query = self.observation.queries[0]
+        self.observation.precision = 0.05
+        # no latencies, never converges
+        jobs = list(self.observation._adaptive(itertools.repeat(query), [query], max_reps=50))
+        self.assertEqual(50, len(jobs))
+        self.assertFalse(self.observation._precision(query)['converged'])
+        # constant latency converges as soon as checked
+        for _ in range(5):
+            query.latency.record(0.01)
+        jobs = list(self.observation._adaptive(itertools.repeat(query), [query], min_reps=5))
+        self.assertEqual(10, len(jobs))
+        p = self.observation._precision(query)
+        self.assertTrue(p['converged'])
+        self.assertEqual(0, p['precision'])
+        self.assertEqual(0.05, p['target'])
+        self.assertEqual('mean', p['stat'])
+        self.assertAlmostEqual(10, p['estimate_in_millis'])
+        jobs = list(self.observation._adaptive(itertools.repeat(query), [query], duration=0))
+        self.assertEqual(esbench.bench.ADAPTIVE_MIN_REPS, len(jobs))
+
+
+    def test_run_adaptive(self):
+        queries = dict(self.queries)
+        queries['match'] = dict(queries['match'], esbench={'precision_stat': 'p90', 'max_reps': 30, 'precision': 0.0000001})
+        observation = esbench.bench.Observation(
+                        conn = self.conn,
+                        benchmark_id = 'bench1',
+                        queries = queries,
+                        reps = 10,
+                        precision = 10,
+                        max_reps = 1000,
+        )
+        observation.run()
+        queries = {q.name: q for q in observation.queries}
+        # +/- 1000% converges at the first check
+        self.assertEqual(esbench.bench.ADAPTIVE_MIN_REPS, queries['mlt'].execution_count)
+        self.assertTrue(observation._precision(queries['mlt'])['converged'])
+        self.assertEqual(30, queries['match'].execution_count)
+        self.assertEqual('p90', observation._precision(queries['match'])['stat'])
+
+        observation = esbench.bench.Observation(
+                        conn = self.conn,
+                        benchmark_id = 'bench1',
+                        queries = self.queries,
+                        reps = 10,
+                        precision = 10,
+                        mix = True,
+        )
+        observation.run()
+        self.assertEqual(esbench.bench.ADAPTIVE_MIN_REPS, sum([q.execution_count for q in observation.queries]))
+
+
+    def test_bounded(self):
+        jobs = list(self.observation._bounded(itertools.repeat(1), 0.01))
+        self.assertTrue(len(jobs) > 10)
+        jobs = list(self.observation._bounded(itertools.repeat(1), 0.01, max_reps=5))
+        self.assertEqual(5, len(jobs))
+        jobs = list(self.observation._bounded(itertools.repeat(1), 0, min_reps=5))
+        self.assertEqual(5, len(jobs))
+        jobs = list(self.observation._bounded(iter([1, 2]), 10))
+        self.assertEqual(2, len(jobs))
+
+
+    def test_run_duration(self):
+        queries = dict(self.queries)
+        queries['match'] = dict(queries['match'], esbench={'duration': 0.1, 'max_reps': 1000000})
+        observation = esbench.bench.Observation(
+                        conn = self.conn,
+                        benchmark_id = 'bench1',
+                        queries = queries,
+                        reps = 10,
+                        duration = 0.01,
+                        max_reps = 20,
+        )
+        observation.run()
+        queries = {q.name: q for q in observation.queries}
+        self.assertEqual(20, queries['mlt'].execution_count)
+        self.assertTrue(queries['match'].execution_count > 20)
+        self.assertTrue(queries['match'].t_client >= 0.1)
+
+        observation = esbench.bench.Observation(
+                        conn = self.conn,
+                        benchmark_id = 'bench1',
+                        queries = self.queries,
+                        reps = 10,
+                        duration = 0.1,
+                        mix = True,
+        )
+        observation.run()
+        self.assertTrue(observation.t_client >= 0.1)
+        self.assertTrue(sum([q.execution_count for q in observation.queries]) > 20)
+
+
     def test_record(self):
         self.observation.run()
         self.observation._stats = lambda: {}
         self.observation._segments = lambda: {}
         resp = self.observation.record()
         data = json.loads(resp.data)
-        self.assertEqual(set(['cluster', 'segments', 'meta', 'stats']), set(data.keys()))
+        self.assertEqual(set(['cluster', 'segments', 'meta', 'stats', 'client']), set(data.keys()))
         self.assertEqual(data['meta']['benchmark_id'], self.observation.benchmark_id)
+        self.assertEqual(data['meta']['clients'], 1)
+        self.assertTrue(data['meta']['client_qps'] > 0)
+        self.assertEqual(['observe'], data['client'].keys())
+        self.assertEqual(data['client']['observe']['saturated'], data['meta']['client_saturated'])
+
+        self.observation.client['load'] = {'saturated': True}
+        self.assertTrue(self.observation.client_saturated())
+        del self.observation.client['load']
+
+        self.observation.mixed = [{'window_no': 1, 'docs': 10}]
+        resp = self.observation.record()
+        data = json.loads(resp.data)
+        self.assertEqual(set(['cluster', 'segments', 'meta', 'stats', 'client', 'mixed']), set(data.keys()))
+        self.assertEqual(data['mixed'][0]['docs'], 10)
+
+
+class QueryWorkerTest(unittest.TestCase):
+
+    def test_run(self):
+        conn = esbench.api.Conn(conn_cls=esbench.test.test_api.MockHTTPConnection)
+        queries = {'match': {'query': {'match': {'foo': 'V%(variable)s'}}}}
+        worker = esbench.bench.QueryWorker(conn=conn, queries=queries, window=0.01)
+        worker.start()
+        for _ in range(5):
+            worker.docs += 10
+            time.sleep(0.01)
+        windows = worker.finish()
+        self.assertFalse(worker.is_alive())
+        self.assertTrue(windows)
+        self.assertEqual(range(1, len(windows)+1), [w['window_no'] for w in windows])
+        self.assertEqual(50, sum([w['docs'] for w in windows]))
+        self.assertEqual(worker.queries[0].execution_count, sum([w['groups']['match']['count'] for w in windows]))
+        self.assertEqual(0, sum([w['errors'] for w in windows]))
+        self.assertIsNone(conn.conn)
+
+        def _fail(conn):
+            raise IOError("failed")
+
+        def _crash(conn):
+            raise ZeroDivisionError("crashed")
+
+        # IOErrors are counted, and the worker carries on
+        conn = esbench.api.Conn(conn_cls=esbench.test.test_api.MockHTTPConnection)
+        worker = esbench.bench.QueryWorker(conn=conn, queries=queries, window=0.01)
+        worker.queries[0].execute = _fail
+        worker.start()
+        time.sleep(0.02)
+        windows = worker.finish()
+        self.assertTrue(sum([w['errors'] for w in windows]) > 1)
+        self.assertEqual(sum([w['errors'] for w in windows]), worker.queries[0].responses['errors'])
+
+        # any other exception stops the worker, and is raised by finish()
+        conn = esbench.api.Conn(conn_cls=esbench.test.test_api.MockHTTPConnection)
+        worker = esbench.bench.QueryWorker(conn=conn, queries=queries, window=0.01)
+        worker.queries[0].execute = _crash
+        worker.start()
+        worker.join()
+        self.assertRaises(ZeroDivisionError, worker.finish)
+        self.assertIsNone(conn.conn)
 
 
 class MockObservation(object):
@@ -136,6 +753,7 @@ class MockObservation(object):
 
     def run(self):
         self.did_run = True
+        self.cluster_samples = None
 
     def record(self):
         self.did_record = True
@@ -166,13 +784,14 @@ class BenchmarkTest(unittest.TestCase):
         lines = ("line_%02i" % i for i in range(12))
         counts = [self.bench.load(itertools.islice(lines, 10)) for _ in range(3)]
         self.assertEqual(counts, [(10, 70), (2, 14), (0, 0)])
+        self.assertIn('saturated', self.bench.client_load)
 
 
     def test_run(self):
 
         self.obs_count = 0
 
-        def _obs():
+        def _obs(**kwargs):
             self.obs_count += 1
 
         batches = esbench.data.batches_iterator(("line_%02i" % i for i in range(100)), batch_count=10, max_n=100, max_byte_size=0)
@@ -209,6 +828,56 @@ class BenchmarkTest(unittest.TestCase):
         self.assertEqual(self.obs_count, 5)
 
 
+    def test_run_mixed(self):
+
+        self.mixed = []
+
+        def _obs(mixed=None, sampler=None):
+            self.mixed.append(mixed)
+
+        self.bench.config['config']['mixed'] = True
+        self.bench.config['config']['mixed_window'] = 0.01
+        batches = esbench.data.batches_iterator(("line_%02i" % i for i in range(20)), batch_count=2, max_n=20, max_byte_size=0)
+        self.bench.observe = _obs
+        self.bench.run(batches)
+        self.assertEqual(2, len(self.mixed))
+        for windows in self.mixed:
+            self.assertEqual(10, sum([w['docs'] for w in windows]))
+            self.assertEqual(set(self.config['queries'].keys()), set(windows[0]['groups'].keys()))
+
+
+    def test_run_sample(self):
+
+        self.samplers = []
+
+        def _obs(mixed=None, sampler=None):
+            self.assertEqual('load', sampler.phase)
+            self.samplers.append(sampler)
+            sampler.finish()
+
+        self.bench.config['config']['sample_interval'] = 0.01
+        batches = esbench.data.batches_iterator(("line_%02i" % i for i in range(20)), batch_count=2, max_n=20, max_byte_size=0)
+        self.bench.observe = _obs
+        self.bench.run(batches)
+        self.assertEqual(2, len(self.samplers))
+        self.assertTrue(all([not s.is_alive() for s in self.samplers]))
+
+        # sampler is stopped before the observation is recorded
+        del self.bench.observe
+        sampler = esbench.sampler.ClusterSampler(conn=self.conn.clone(), interval=0.01)
+        sampler.start()
+        obs = self.bench.observe(obs_cls=MockObservation, sampler=sampler)
+        self.assertFalse(sampler.is_alive())
+        self.assertEqual(sampler.series, obs.cluster_samples)
+
+        # without data loaded, the observation is sampled on its own
+        obs = self.bench.observe(obs_cls=MockObservation)
+        self.assertEqual(0.01, obs.cluster_samples['interval'])
+        self.bench.config['config']['sample_interval'] = None
+        obs = self.bench.observe(obs_cls=MockObservation)
+        self.assertIsNone(obs.cluster_samples)
+
+
     def test_observe(self):
         self.bench.config['config']['segments'] = 10
         obs = self.bench.observe(obs_cls=MockObservation)
@@ -216,6 +885,72 @@ class BenchmarkTest(unittest.TestCase):
         self.assertTrue(obs.did_run)
         self.assertTrue(obs.did_record)
 
+        # asynchronous, the mock response is not segments data, so the
+        # target is never reached
+        self.conn.conn.requests = []
+        self.bench.config['config']['optimize_async'] = True
+        self.bench.config['config']['optimize_timeout'] = 0.01
+        obs = self.bench.observe(obs_cls=MockObservation)
+        # merge stats are read before the optimize call
+        self.assertEqual('GET', self.conn.conn.requests[0][0])
+        self.assertEqual(self.conn.conn.requests[1], ('POST', '/esbench_test/_optimize?max_num_segments=10&refresh=true&flush=true&wait_for_merge=false', None))
+        self.assertTrue(obs.optimize['timed_out'])
+
+
+    def test_checkpoint(self):
+
+        tmp = tempfile.mkdtemp()
+        try:
+            self.bench.checkpoint_dir = tmp
+            self.bench.observe = functools.partial(self.bench.observe, obs_cls=MockObservation)
+            self.bench.prepare()
+            batches = esbench.data.batches_iterator(("line_%02i" % i for i in range(100)), batch_count=20, max_n=100, max_byte_size=0)
+            self.bench.run(itertools.islice(batches, 3))
+            checkpoint = esbench.checkpoint.load(tmp, self.bench.benchmark_id)
+            self.assertEqual(3, checkpoint['observations'])
+            self.assertEqual({'path': None, 'lines': 15, 'size_b': 105}, checkpoint['feed'])
+            self.assertEqual(15, checkpoint['doc_count'])
+            self.assertEqual(esbench.checkpoint.config_hash(self.config), checkpoint['config_hash'])
+
+            # resumed after 3 more lines were loaded; the index isn't
+            # recreated, and observation numbers carry on
+            conn = esbench.api.Conn(conn_cls=esbench.test.test_api.MockHTTPConnection)
+            bench = esbench.bench.Benchmark(self.config, conn, checkpoint_dir=tmp)
+            bench.prepare()
+            bench.observe = functools.partial(bench.observe, obs_cls=MockObservation)
+            bench.resume(checkpoint, (3, 21))
+            self.assertEqual(self.bench.benchmark_id, bench.benchmark_id)
+            self.assertEqual(self.bench.ts_start, bench.ts_start)
+            self.assertEqual(3, esbench.bench.Observation._count)
+            batches = esbench.data.batches_iterator(("line_%02i" % i for i in range(18, 100)), batch_count=1, max_n=2, max_byte_size=0)
+            bench.run(batches)
+            self.assertEqual([('POST', '/esbench_test/doc', 'line_18'), ('POST', '/esbench_test/doc', 'line_19')], [r for r in conn.conn.requests if r[1].startswith('/esbench_test')])
+            checkpoint = esbench.checkpoint.load(tmp, bench.benchmark_id)
+            self.assertEqual(4, checkpoint['observations'])
+            self.assertEqual({'path': None, 'lines': 20, 'size_b': 140}, checkpoint['feed'])
+        finally:
+            shutil.rmtree(tmp)
+
+        # with an async sink, the checkpoint is saved by the writer thread,
+        # once the observation is written
+        tmp = tempfile.mkdtemp()
+        try:
+            sink = esbench.sink.AsyncSink(esbench.sink.JsonlSink(os.path.join(tmp, 'stats.jsonl')))
+            bench = esbench.bench.Benchmark(self.config, self.conn, sink=sink, checkpoint_dir=tmp)
+            bench.prepare()
+            written = []
+            sink.when_written = lambda f: written.append(f)
+            bench.observe(obs_cls=MockObservation)
+            self.assertRaises(IOError, esbench.checkpoint.load, tmp, bench.benchmark_id)
+            written[0]()
+            self.assertEqual(1, esbench.checkpoint.load(tmp, bench.benchmark_id)['observations'])
+            bench.remove_checkpoint()
+            written[1]()
+            self.assertRaises(IOError, esbench.checkpoint.load, tmp, bench.benchmark_id)
+            sink.close()
+        finally:
+            shutil.rmtree(tmp)
+
 
     def test_record(self):
         # must call .prepare() first
@@ -0,0 +1,129 @@
+# -*- coding: UTF-8 -*-
+# (c)2013 Mik Kocikowski, MIT License (http://opensource.org/licenses/MIT)
+# https://github.com/mkocikowski/esbench
+
+import os
+import os.path
+import shutil
+import tempfile
+import unittest
+import logging
+import StringIO
+import json
+
+import esbench.api
+import esbench.analyze
+import esbench.cache
+import esbench.sink
+
+
+def _bench(benchmark_id, start, **kwargs):
+    return {'meta': dict({'benchmark_id': benchmark_id, 'benchmark_start': start}, **kwargs)}
+
+def _obs(benchmark_id, observation_id, start, seq, **stats):
+    return {
+        'meta': {'benchmark_id': benchmark_id, 'observation_id': observation_id, 'observation_start': start, 'observation_sequence_no': seq},
+        'stats': dict({'search': {'groups': {}}}, **stats),
+    }
+
+
+class CountingSink(esbench.sink.JsonlSink):
+
+    def __init__(self, path):
+        esbench.sink.JsonlSink.__init__(self, path)
+        self.read = []
+
+    def observations(self, benchmark_id, since=None):
+        observations = esbench.sink.JsonlSink.observations(self, benchmark_id, since=since)
+        self.read.extend([o['_id'] for o in observations])
+        return observations
+
+
+class CacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.source = CountingSink(os.path.join(self.tmpdir, 'stats.jsonl'))
+        self.source.write_many([
+            ('bench', 'b1', _bench('b1', '2014-01-01T00:00:00Z')),
+            ('obs', 'o2', _obs('b1', 'o2', '2014-01-01T00:00:02Z', 2, docs={'count': 20})),
+            ('obs', 'o1', _obs('b1', 'o1', '2014-01-01T00:00:01Z', 1, docs={'count': 10}, foo=None)),
+            ('bench', 'b2', _bench('b2', '2014-01-02T00:00:00Z')),
+            ('obs', 'o3', _obs('b2', 'o3', '2014-01-02T00:00:01Z', 1, docs={'count': 30})),
+        ])
+        self.cache = esbench.cache.open_cache(self.source, os.path.join(self.tmpdir, 'cache'))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+
+    def test_source_name(self):
+        self.assertEqual('jsonl_%s_stats.jsonl' % self.tmpdir.strip('/').replace('/', '_'), esbench.cache.source_name(self.source))
+        conn = esbench.api.Conn(host='stats.local', port=9201)
+        self.assertEqual('http_stats.local_9201_esbench_stats', esbench.cache.source_name(esbench.sink.EsSink(conn)))
+
+
+    def test_sync(self):
+        self.assertEqual([], self.cache.benchmarks())
+        self.assertEqual(3, self.cache.sync(self.source))
+        self.assertEqual(['b1', 'b2'], [b['_id'] for b in self.cache.benchmarks()])
+        self.assertEqual(self.source.observations('b1'), self.cache.observations('b1'))
+        self.assertEqual(['o2'], [o['_id'] for o in self.cache.observations('b1', since='2014-01-01T00:00:02Z')])
+
+        # nothing changed, nothing read
+        self.source.read = []
+        self.assertEqual(0, self.cache.sync(self.source))
+        self.assertEqual([], self.source.read)
+
+        # resumed benchmark, recorded again; only the newer observations are read
+        self.source.write_many([
+            ('obs', 'o4', _obs('b1', 'o4', '2014-01-01T00:00:03Z', 3, docs={'count': 40})),
+            ('bench', 'b1', _bench('b1', '2014-01-01T00:00:00Z', benchmark_stop='2014-01-01T00:00:04Z')),
+        ])
+        self.assertEqual(1, self.cache.sync(self.source))
+        self.assertEqual(['o2', 'o4'], self.source.read)
+        self.assertEqual(['o1', 'o2', 'o4'], [o['_id'] for o in self.cache.observations('b1')])
+
+        # source gone, cache read from disk
+        os.remove(self.source.path)
+        cache = esbench.cache.open_cache(self.source, os.path.join(self.tmpdir, 'cache'))
+        self.assertEqual(['b1', 'b2'], [b['_id'] for b in cache.benchmarks()])
+        self.assertEqual('2014-01-01T00:00:04Z', cache.benchmarks()[0]['_source']['meta']['benchmark_stop'])
+        self.assertEqual([10, 20, 40], cache.table('b1').columns['observation.stats.docs.count'])
+        self.assertEqual({'observation.stats.foo': set([1, 2])}, cache.table('b1').missing)
+        self.assertEqual(0, esbench.cache.Cache(os.path.join(self.tmpdir, 'nonexistent')).table('b1').count)
+
+
+    def test_table(self):
+        table = esbench.cache.Table()
+        table.append([{'meta': {'observation_sequence_no': 3}, 'a': 3}, {'meta': {'observation_sequence_no': 1}, 'b': 1}])
+        table.append([{'meta': {'observation_sequence_no': 2}, 'a': None}])
+        self.assertEqual(3, table.count)
+        self.assertEqual([None, None, 3], table.columns['observation.a'])
+        self.assertEqual({'observation.a': set([0]), 'observation.b': set([1, 2])}, table.missing)
+        self.assertEqual({'observation.meta.observation_sequence_no': 2, 'observation.a': None}, table.row(1))
+        self.assertEqual(table.dumps(), esbench.cache.Table.loads(json.loads(json.dumps(table.dumps()))).dumps())
+
+
+    def test_select(self):
+        self.cache.sync(self.source)
+        for pattern in [esbench.analyze.FIELDS, '.*', '.*foo', 'benchmark', 'x']:
+            expected = esbench.analyze.group_observations(data=esbench.analyze.get_data(sink=self.source), fields=pattern)
+            selected = [self.cache.table(b['_id']).select(pattern) for b in self.cache.benchmarks()]
+            self.assertEqual(expected, selected)
+
+
+    def test_show(self):
+        self.cache.sync(self.source)
+        for ids in [['all'], ['last'], ['b1']]:
+            expected = StringIO.StringIO()
+            esbench.analyze.show_benchmarks(benchmark_ids=ids, fields=esbench.analyze.FIELDS, fmt='csv', fh=expected, sink=self.source)
+            shown = StringIO.StringIO()
+            esbench.analyze.show_benchmarks(benchmark_ids=ids, fields=esbench.analyze.FIELDS, fmt='csv', fh=shown, cache=self.cache)
+            self.assertEqual(expected.getvalue(), shown.getvalue())
+            self.assertTrue(shown.getvalue())
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.DEBUG)
+    unittest.main()
@@ -0,0 +1,84 @@
+# -*- coding: UTF-8 -*-
+# (c)2013 Mik Kocikowski, MIT License (http://opensource.org/licenses/MIT)
+# https://github.com/mkocikowski/esbench
+
+import os.path
+import copy
+import shutil
+import tempfile
+import unittest
+import logging
+
+import esbench.checkpoint
+import esbench.client
+
+
+class CheckpointTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = os.path.join(tempfile.mkdtemp(), 'checkpoints')
+        argv = esbench.client.args_parser().parse_args("run --observations 4 100".split())
+        self.config = esbench.client.merge_config(argv, esbench.client.load_config(argv.config_file_path))
+        self.checkpoint = {
+            'benchmark_id': 'bench1',
+            'benchmark_start': '2014-01-07T00:01:02Z',
+            't_elapsed': 10.0,
+            'observations': 2,
+            'feed': {'path': None, 'lines': 50, 'size_b': 350},
+            'doc_count': 50,
+            'config_hash': esbench.checkpoint.config_hash(self.config),
+        }
+
+    def tearDown(self):
+        shutil.rmtree(os.path.dirname(self.dir))
+
+
+    def test_config_hash(self):
+        c = copy.deepcopy(self.config)
+        c['config']['resume'] = 'bench1'
+        c['config']['name'] = 'foo'
+        self.assertEqual(esbench.checkpoint.config_hash(self.config), esbench.checkpoint.config_hash(c))
+        c['config']['reps'] = 1000
+        self.assertNotEqual(esbench.checkpoint.config_hash(self.config), esbench.checkpoint.config_hash(c))
+
+
+    def test_save_load(self):
+        self.assertRaises(IOError, esbench.checkpoint.load, self.dir, 'bench1')
+        fn = esbench.checkpoint.save(self.dir, self.checkpoint)
+        self.assertEqual(os.path.join(self.dir, 'bench1.json'), fn)
+        self.assertEqual(self.checkpoint, esbench.checkpoint.load(self.dir, 'bench1'))
+        self.checkpoint['observations'] = 3
+        esbench.checkpoint.save(self.dir, self.checkpoint)
+        self.assertEqual(3, esbench.checkpoint.load(self.dir, 'bench1')['observations'])
+        self.assertEqual(['bench1.json'], os.listdir(self.dir))
+        esbench.checkpoint.remove(self.dir, 'bench1')
+        self.assertRaises(IOError, esbench.checkpoint.load, self.dir, 'bench1')
+        esbench.checkpoint.remove(self.dir, 'bench1')
+
+
+    def test_verify(self):
+        esbench.checkpoint.verify(self.checkpoint, self.config, 50)
+        esbench.checkpoint.verify(self.checkpoint, self.config, 60)
+        self.assertRaises(ValueError, esbench.checkpoint.verify, self.checkpoint, self.config, 40)
+        c = copy.deepcopy(self.config)
+        c['config']['workers'] = ['localhost:9400']
+        checkpoint = dict(self.checkpoint, config_hash=esbench.checkpoint.config_hash(c))
+        self.assertRaises(ValueError, esbench.checkpoint.verify, checkpoint, c, 50)
+        self.config['config']['reps'] = 1000
+        self.assertRaises(ValueError, esbench.checkpoint.verify, self.checkpoint, self.config, 50)
+
+
+    def test_resume_feed(self):
+        lines = iter(["line_%02i" % i for i in range(100)])
+        self.assertEqual((5, 35), esbench.checkpoint.resume_feed(lines, self.checkpoint, 55))
+        self.assertEqual("line_55", next(lines))
+        lines = iter(["line_%02i" % i for i in range(100)])
+        self.assertEqual((0, 0), esbench.checkpoint.resume_feed(lines, self.checkpoint, 50))
+        self.assertEqual("line_50", next(lines))
+        lines = iter(["line_%02i" % i for i in range(10)])
+        self.assertRaises(ValueError, esbench.checkpoint.resume_feed, lines, self.checkpoint, 50)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.DEBUG)
+    unittest.main()
@@ -15,6 +15,8 @@ import tempfile
 import time
 import copy
 
+import esbench.cache
+import esbench.checkpoint
 import esbench.client
 
 
@@ -38,6 +40,20 @@ class ClientTest(unittest.TestCase):
                 'verbose': False,
                 'segments': None,
                 'reps': None,
+                'duration': None,
+                'min_reps': None,
+                'max_reps': None,
+                'precision': None,
+                'precision_stat': None,
+                'confidence': None,
+                'warmup': None,
+                'warmup_time': None,
+                'clients': None,
+                'mix': False,
+                'seed': None,
+                'rate': None,
+                'arrivals': None,
+                'msearch': None,
                 'maxsize': '1mb',
                 'name': args.name, # cheating, but no clean way around it as it contains timestamp
                 'no_load': False,
@@ -45,6 +61,21 @@ class ClientTest(unittest.TestCase):
                 'observations': None,
                 'data': None,
                 'append': False,
+                'mixed': False,
+                'mixed_window': None,
+                'sample_interval': None,
+                'stats': None,
+                'workers': None,
+                'client_profile': None,
+                'optimize_async': False,
+                'optimize_timeout': None,
+                'cold': None,
+                'drop_os_cache': False,
+                'replay': None,
+                'replay_speed': None,
+                'resume': None,
+                'checkpoint': False,
+                'checkpoint_dir': None,
                 'config_file_path': os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "../", "config.json")),
                 'host': 'localhost',
                 'port': 9200,
@@ -56,6 +87,48 @@ class ClientTest(unittest.TestCase):
         self.assertRaises(SystemExit, parser.parse_args, "run -h".split())
 
 
+    def test_checkpoint_dir(self):
+
+        parser = esbench.client.args_parser()
+        for argv, expected in [
+                ("run", None),
+                ("run --checkpoint", esbench.checkpoint.DEFAULT_DIR),
+                ("run --resume b1", esbench.checkpoint.DEFAULT_DIR),
+                ("run --checkpoint-dir foo", "foo"),
+                ("run --resume b1 --checkpoint-dir foo", "foo"),
+        ]:
+            args = parser.parse_args(argv.split())
+            config = esbench.client.merge_config(args, esbench.client.load_config(args.config_file_path))
+            self.assertEqual(expected, esbench.client.checkpoint_dir(config))
+
+
+    def test_args_sweep(self):
+
+        parser = esbench.client.args_parser()
+        args = parser.parse_args("sweep --matrix foo.json --observations 2".split())
+        self.assertEqual('sweep', args.command)
+        self.assertEqual('foo.json', args.matrix)
+        self.assertEqual(2, args.observations)
+        # same options as 'run', except for resuming
+        run_args = parser.parse_args("run --observations 2".split())
+        self.assertEqual((set(run_args.__dict__) - set(['resume', 'checkpoint', 'checkpoint_dir'])) | set(['matrix']), set(args.__dict__))
+        self.assertRaises(SystemExit, parser.parse_args, "sweep".split())
+        self.assertRaises(SystemExit, esbench.client.parse_args, "sweep --matrix foo.json --mixed".split())
+        self.assertTrue(esbench.client.parse_args("sweep --matrix foo.json --sample-interval 1".split()).sample_interval)
+
+
+    def test_args_worker(self):
+
+        parser = esbench.client.args_parser()
+        args = parser.parse_args("worker".split())
+        self.assertEqual('0.0.0.0:9400', args.listen)
+        args = parser.parse_args("run --workers host1:9401,host2".split())
+        self.assertEqual(['host1:9401', 'host2'], args.workers)
+
+        self.assertEqual('p99_9', parser.parse_args("run --precision-stat p99_9".split()).precision_stat)
+        self.assertRaises(SystemExit, parser.parse_args, "run --precision-stat p9x".split())
+
+
     def test_args_show(self):
 
         parser = esbench.client.args_parser()
@@ -63,10 +136,15 @@ class ClientTest(unittest.TestCase):
         self.assertEqual(args.__dict__,
             {
                 'command': 'show',
-                'fields': '(?!observation.segments.segments)((benchmark.meta.benchmark_start)|(observation.meta.benchmark_id)|(observation.meta.observation_id)|(observation.meta.observation_sequence_no)|(observation.segments.num_committed_segments)|(observation.segments.num_search_segments)|(observation.segments.t_optimize_in_millis)|(observation.stats.docs.count)|(observation.stats.store.size_in_bytes)|(observation.stats.fielddata.memory_size_in_bytes)|(observation.stats.search.groups.*query_time_in_millis_per_query$))',
+                'fields': '(?!observation.segments.segments)((benchmark.meta.benchmark_start)|(observation.meta.benchmark_id)|(observation.meta.observation_id)|(observation.meta.observation_sequence_no)|(observation.segments.num_committed_segments)|(observation.segments.num_search_segments)|(observation.segments.t_optimize_in_millis)|(observation.stats.docs.count)|(observation.stats.store.size_in_bytes)|(observation.stats.fielddata.memory_size_in_bytes)|(observation.stats.search.groups.*query_time_in_millis_per_query$)|(observation.stats.search.groups.*client_latency.p(50|99|99_9)_in_millis$)|(observation.stats.search.groups.*client_traversal.docs_per_second$))',
                 'host': 'localhost',
                 'port': 9200,
                 'format': 'csv',
+                'latency': False,
+                'stats': None,
+                'cache': False,
+                'cache_dir': esbench.cache.DEFAULT_DIR,
+                'offline': False,
                 'verbose': False,
                 'ids': ['all'],
             }
@@ -76,6 +154,19 @@ class ClientTest(unittest.TestCase):
         self.assertRaises(SystemExit, parser.parse_args, "show -h".split())
 
 
+    def test_batches(self):
+
+        argv = esbench.client.args_parser().parse_args("run --observations 4 100".split())
+        config = esbench.client.merge_config(argv, esbench.client.load_config(argv.config_file_path))
+        lines = ("line_%02i" % i for i in range(100))
+        self.assertEqual([25, 25, 25, 25], [len(list(b)) for b in esbench.client.batches(lines, config, 4)])
+        # resuming after 2 observations, 5 lines loaded since
+        lines = ("line_%02i" % i for i in range(55, 100))
+        self.assertEqual([20, 25], [len(list(b)) for b in esbench.client.batches(lines, config, 2, (5, 35))])
+        lines = ("line_%02i" % i for i in range(75, 100))
+        self.assertEqual([25], [len(list(b)) for b in esbench.client.batches(lines, config, 1)])
+
+
     def test_parse_maxsize(self):
 
         self.assertRaises(AttributeError, esbench.client.parse_maxsize, (10,))
@@ -134,6 +225,20 @@ class TestConfig(unittest.TestCase):
                     'verbose': False,
                     'segments': None,
                     'reps': 100,
+                    'duration': None,
+                    'min_reps': None,
+                    'max_reps': None,
+                    'precision': None,
+                    'precision_stat': None,
+                    'confidence': None,
+                    'warmup': None,
+                    'warmup_time': None,
+                    'clients': None,
+                    'mix': False,
+                    'seed': None,
+                    'rate': None,
+                    'arrivals': None,
+                    'msearch': None,
                     'shards': None,
                     'maxsize': '1mb',
                     'no_load': False,
@@ -144,6 +249,21 @@ class TestConfig(unittest.TestCase):
                     'data': None,
                     'port': 9200,
                     'append': False,
+                    'mixed': False,
+                    'mixed_window': None,
+                    'sample_interval': None,
+                    'stats': None,
+                    'workers': None,
+                    'client_profile': None,
+                    'optimize_async': False,
+                    'optimize_timeout': None,
+                    'cold': None,
+                    'drop_os_cache': False,
+                    'replay': None,
+                    'replay_speed': None,
+                    'resume': None,
+                    'checkpoint': False,
+                    'checkpoint_dir': None,
                     'name': None,
                     'max_byte_size': 1048576,
                     'max_n': 0
@@ -0,0 +1,205 @@
+# -*- coding: UTF-8 -*-
+# (c)2013 Mik Kocikowski, MIT License (http://opensource.org/licenses/MIT)
+# https://github.com/mkocikowski/esbench
+
+import unittest
+import logging
+import socket
+import threading
+import multiprocessing
+import BaseHTTPServer
+import SocketServer
+
+import esbench
+import esbench.api
+import esbench.bench
+import esbench.distributed
+
+
+SEARCH_RESPONSE = '{"took": 2, "timed_out": false, "_shards": {"total": 1, "successful": 1, "failed": 0}, "hits": {"total": 5, "hits": []}}'
+
+
+class StandInHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    """Stands in for ES: searches return SEARCH_RESPONSE, documents are counted."""
+
+    protocol_version = 'HTTP/1.1'
+
+    def _reply(self, data, status=200):
+        self.send_response(status)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _body(self):
+        return self.rfile.read(int(self.headers.getheader('Content-Length') or 0))
+
+    def do_POST(self):
+        self._body()
+        if self.path.endswith('/_search'):
+            self._reply(SEARCH_RESPONSE)
+        else:
+            with self.server.lock:
+                self.server.docs += 1
+            self._reply('{"ok": true}', 201)
+
+    def do_GET(self):
+        self._reply('{}')
+
+    def log_message(self, *args):
+        pass
+
+
+class StandInServer(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+
+    daemon_threads = True
+
+    def __init__(self):
+        BaseHTTPServer.HTTPServer.__init__(self, ('localhost', 0), StandInHandler)
+        self.lock = threading.Lock()
+        self.docs = 0
+
+
+def _worker_process(es_port, ports):
+
+    worker = esbench.distributed.Worker(('localhost', 0), esbench.api.Conn(port=es_port))
+    ports.put(worker.server_address[1])
+    worker.serve_forever()
+
+
+class DistributedTest(unittest.TestCase):
+
+    def setUp(self):
+
+        self.server = StandInServer()
+        self.server_thread = threading.Thread(target=self.server.serve_forever)
+        self.server_thread.daemon = True
+        self.server_thread.start()
+        es_port = self.server.server_address[1]
+
+        ports = multiprocessing.Queue()
+        self.processes = [multiprocessing.Process(target=_worker_process, args=(es_port, ports)) for _ in range(3)]
+        for process in self.processes:
+            process.daemon = True
+            process.start()
+        addresses = ["localhost:%i" % ports.get(timeout=10) for _ in self.processes]
+        self.coordinator = esbench.distributed.Coordinator(addresses)
+        self.conn = esbench.api.Conn(port=es_port)
+
+
+    def tearDown(self):
+
+        self.coordinator.close()
+        self.conn.close()
+        for process in self.processes:
+            process.terminate()
+            process.join()
+        self.server.shutdown()
+        self.server.server_close()
+
+
+    def test_parse_address(self):
+
+        self.assertEqual(('foo', 9401), esbench.distributed.parse_address('foo:9401'))
+        self.assertEqual(('foo', 9400), esbench.distributed.parse_address('foo'))
+
+
+    def test_load(self):
+
+        chunk_size = esbench.distributed.LOAD_CHUNK_SIZE
+        esbench.distributed.LOAD_CHUNK_SIZE = 7
+        try:
+            lines = ['{"n": %i}' % i for i in range(100)]
+            count, size_b = self.coordinator.load(lines)
+        finally:
+            esbench.distributed.LOAD_CHUNK_SIZE = chunk_size
+        self.assertEqual(100, count)
+        self.assertEqual(sum([len(l) for l in lines]), size_b)
+        self.assertEqual(100, self.server.docs)
+
+
+    def test_observe(self):
+
+        queries = {
+            'q1': {"query": {"match_all": {}}, "esbench": {"warmup": 2, "cold": 2}},
+            'q2': {"query": {"match": {"f": "%(variable)s"}}},
+        }
+        observation = esbench.bench.Observation(conn=self.conn, queries=queries, reps=10, coordinator=self.coordinator)
+        observation.run()
+        self.assertEqual(3, len(observation.workers))
+        for query in observation.queries:
+            self.assertEqual(30, query.execution_count)
+            self.assertEqual(30, query.latency.count)
+            self.assertEqual(30, query.took.count)
+            self.assertEqual(30, query.responses['parsed'])
+            self.assertEqual(150, query.responses['hits_total'])
+            self.assertTrue(query.t_client > 0)
+        self.assertEqual(6, observation.warmup_queries['q1'].execution_count)
+        # cold executions are run by the coordinator only
+        self.assertEqual(2, observation.cold_queries['q1'].execution_count)
+        self.assertTrue(observation.t_client > 0)
+
+        # errors on the workers are raised on the coordinator
+        observation = esbench.bench.Observation(conn=self.conn, queries=queries, precision=0.1, precision_stat='foo', coordinator=self.coordinator)
+        self.assertRaises(IOError, observation.run)
+
+
+    def test_observe_open_loop(self):
+
+        queries = {'q1': {"query": {"match_all": {}}}}
+        observation = esbench.bench.Observation(conn=self.conn, queries=queries, reps=6, rate=300, coordinator=self.coordinator)
+        self.assertEqual(300, observation.settings()['rate'])
+        observation.run()
+        query = observation.queries[0]
+        self.assertEqual(18, query.execution_count + query.missed)
+        self.assertEqual(query.execution_count, query.send_lag.count)
+
+
+
+class WorkerClientTest(unittest.TestCase):
+
+    def setUp(self):
+        self.listener = socket.socket()
+        self.listener.bind(('localhost', 0))
+        self.listener.listen(1)
+        self.port = self.listener.getsockname()[1]
+
+    def tearDown(self):
+        self.listener.close()
+
+
+    def test_call(self):
+
+        # worker which never replies
+        client = esbench.distributed.WorkerClient('localhost', self.port, timeout=0.05)
+        sock, _ = self.listener.accept()
+        try:
+            self.assertRaisesRegexp(IOError, "localhost:%i didn't reply to 'clock'" % self.port, client.call, {'cmd': 'clock'})
+        finally:
+            sock.close()
+            client.close()
+
+        # worker which goes away
+        client = esbench.distributed.WorkerClient('localhost', self.port)
+        sock, _ = self.listener.accept()
+        sock.close()
+        self.assertRaisesRegexp(IOError, "localhost:%i" % self.port, client.call, {'cmd': 'clock'})
+        client.close()
+
+        self.listener.close()
+        self.assertRaisesRegexp(IOError, "localhost:%i" % self.port, esbench.distributed.WorkerClient, 'localhost', self.port)
+
+
+    def test_observe_timeout(self):
+
+        queries = {'q1': {"query": {"match_all": {}}}, 'q2': {"query": {"match_all": {}}, "esbench": {"duration": 5}}}
+        observation = esbench.bench.Observation(queries=queries, duration=10, warmup_time=1)
+        slack = esbench.distributed.START_DELAY + esbench.distributed.OBSERVE_TIMEOUT
+        self.assertEqual(slack + 10 + 5 + 2, esbench.distributed._observe_timeout(observation))
+        observation.mix = True
+        self.assertEqual(slack + 10 + 2, esbench.distributed._observe_timeout(observation))
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.DEBUG)
+    unittest.main()
+
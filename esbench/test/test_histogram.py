@@ -0,0 +1,99 @@
+# -*- coding: UTF-8 -*-
+# (c)2013 Mik Kocikowski, MIT License (http://opensource.org/licenses/MIT)
+# https://github.com/mkocikowski/esbench
+
+import unittest
+import logging
+import random
+
+import esbench.histogram
+
+
+class HistogramTest(unittest.TestCase):
+
+    def test_index(self):
+        h = esbench.histogram.Histogram(sub_bucket_bits=2)
+        # values below 2 * sub_bucket_count are exact
+        self.assertEqual([0, 1, 7], [h._index(v) for v in [0, 1, 7]])
+        # indexes are contiguous, bucket values grow with the index
+        indexes = [h._index(v) for v in range(10000)]
+        self.assertEqual(range(max(indexes)+1), sorted(set(indexes)))
+        values = [h._value(i) for i in range(max(indexes)+1)]
+        self.assertEqual(sorted(values), values)
+        for v in range(1, 10000):
+            self.assertTrue(abs(h._value(h._index(v)) - v) <= v / 4.0)
+
+    def test_empty(self):
+        h = esbench.histogram.Histogram()
+        self.assertIsNone(h.percentile(50))
+        s = h.stats()
+        self.assertEqual(0, s['count'])
+        self.assertIsNone(s['mean_in_millis'])
+        self.assertIsNone(s['p99_9_in_millis'])
+
+    def test_stats(self):
+        h = esbench.histogram.Histogram()
+        for ms in range(1000, 0, -1):
+            h.record(ms / 1000.0)
+        s = h.stats()
+        self.assertEqual(1000, s['count'])
+        self.assertAlmostEqual(500.5, s['mean_in_millis'])
+        self.assertEqual(1, s['min_in_millis'])
+        self.assertEqual(1000, s['max_in_millis'])
+        for p, key in [(50, 'p50_in_millis'), (90, 'p90_in_millis'), (99, 'p99_in_millis'), (99.9, 'p99_9_in_millis')]:
+            self.assertTrue(abs(s[key] - p * 10) <= p * 10 / 128.0, (key, s[key]))
+        self.assertTrue(abs(100 - h.count_above(0.9)) <= 1)
+
+    def test_confidence_interval(self):
+        h = esbench.histogram.Histogram()
+        h.record(0.01)
+        self.assertIsNone(h.stddev())
+        self.assertIsNone(h.confidence_interval())
+        for ms in range(1000, 1, -1):
+            h.record(ms / 1000.0)
+        # uniform 0..1s, stddev ~0.289s
+        self.assertTrue(abs(h.stddev() - 0.289) < 0.005)
+        estimate, low, high = h.confidence_interval('mean', 0.95)
+        self.assertAlmostEqual(0.5, estimate, places=2)
+        self.assertTrue(abs((high - low) / 2 - 1.96 * 0.289 / (1000 ** 0.5)) < 0.001)
+        estimate, low, high = h.confidence_interval('p90', 0.99)
+        self.assertTrue(low < estimate < high)
+        self.assertTrue(abs(estimate - 0.9) < 0.01)
+        # more confidence, wider interval
+        _, low95, high95 = h.confidence_interval('p90', 0.95)
+        self.assertTrue(low <= low95 and high95 <= high)
+        self.assertIsNotNone(h.confidence_interval('p99_9'))
+        self.assertRaises(ValueError, h.confidence_interval, 'mean', 0.5)
+        self.assertRaises(ValueError, h.confidence_interval, 'foo')
+        self.assertRaises(ValueError, h.confidence_interval, 'p100')
+
+    def test_merge(self):
+        values = [random.random() for _ in range(1000)]
+        h1 = esbench.histogram.Histogram()
+        h2 = esbench.histogram.Histogram()
+        h3 = esbench.histogram.Histogram()
+        for v in values[:300]:
+            h1.record(v)
+        for v in values[300:]:
+            h2.record(v)
+        for v in values:
+            h3.record(v)
+        h1.merge(h2)
+        self.assertEqual(h3.stats(), h1.stats())
+        self.assertRaises(ValueError, h1.merge, esbench.histogram.Histogram(sub_bucket_bits=3))
+
+    def test_serialize(self):
+        h = esbench.histogram.Histogram()
+        for _ in range(10000):
+            h.record(random.expovariate(100))
+        s = h.dumps()
+        self.assertIsInstance(s, str)
+        self.assertTrue(len(s) < 2000)
+        h2 = esbench.histogram.Histogram.loads(s)
+        self.assertEqual(h.stats(), h2.stats())
+        self.assertEqual(h.buckets, h2.buckets)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.DEBUG)
+    unittest.main()
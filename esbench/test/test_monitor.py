@@ -0,0 +1,72 @@
+# -*- coding: UTF-8 -*-
+# (c)2013 Mik Kocikowski, MIT License (http://opensource.org/licenses/MIT)
+# https://github.com/mkocikowski/esbench
+
+import unittest
+import logging
+import os.path
+import pstats
+import tempfile
+import shutil
+import time
+
+import esbench.monitor
+
+
+class ClientMonitorTest(unittest.TestCase):
+
+    def test_idle(self):
+
+        monitor = esbench.monitor.ClientMonitor(interval=0.001)
+        monitor.start()
+        time.sleep(0.1)
+        stats = monitor.finish()
+        self.assertFalse(monitor.is_alive())
+        self.assertTrue(stats['t_wall_in_millis'] >= 100)
+        self.assertTrue(stats['timer_lag']['count'] > 10)
+        self.assertTrue(stats['cpu_percent'] < esbench.monitor.SATURATION_CPU)
+        self.assertNotIn('cpu', stats['saturation'])
+        self.assertIsNone(stats['profile'])
+
+
+    def test_busy(self):
+
+        monitor = esbench.monitor.ClientMonitor(interval=0.001)
+        monitor.start()
+        t_stop = time.time() + 0.2
+        while time.time() < t_stop:
+            pass
+        stats = monitor.finish()
+        self.assertTrue(stats['saturated'])
+        self.assertIn('cpu', stats['saturation'])
+
+
+    def test_profile(self):
+
+        d = tempfile.mkdtemp()
+        try:
+            # the directory is created if needed
+            path = esbench.monitor.profile_path(os.path.join(d, 'profiles'), 'obs_foo')
+            self.assertEqual(os.path.join(d, 'profiles', 'obs_foo.prof'), path)
+            monitor = esbench.monitor.ClientMonitor(profile_path=path)
+            monitor.start()
+            sorted(range(1000))
+            stats = monitor.finish()
+            self.assertEqual(path, stats['profile'])
+            self.assertTrue(pstats.Stats(path).total_calls > 0)
+
+            # a profile which can't be written is logged, not raised
+            open(os.path.join(d, 'file'), 'w').close()
+            monitor = esbench.monitor.ClientMonitor(profile_path=esbench.monitor.profile_path(os.path.join(d, 'file'), 'obs_foo'))
+            monitor.start()
+            stats = monitor.finish()
+            self.assertFalse(monitor.is_alive())
+            self.assertIsNone(stats['profile'])
+        finally:
+            shutil.rmtree(d)
+        self.assertIsNone(esbench.monitor.profile_path(None, 'obs_foo'))
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.DEBUG)
+    unittest.main()
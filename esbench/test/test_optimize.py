@@ -0,0 +1,112 @@
+# -*- coding: UTF-8 -*-
+# (c)2013 Mik Kocikowski, MIT License (http://opensource.org/licenses/MIT)
+# https://github.com/mkocikowski/esbench
+
+import unittest
+import logging
+import json
+
+import esbench
+import esbench.api
+import esbench.optimize
+
+
+def _segments_data(counts):
+    """Segments api response, one primary per count."""
+
+    shards = {str(i): [{"num_search_segments": n, "num_committed_segments": n}] for i, n in enumerate(counts)}
+    return json.dumps({"indices": {"i1": {"shards": shards}}})
+
+
+def _stats_data(current, merged):
+    return json.dumps({"indices": {"i1": {"total": {"merges": {"current": current, "total_size_in_bytes": merged}}}}})
+
+
+class OptimizeTest(unittest.TestCase):
+
+    def setUp(self):
+        self.calls = []
+        # segments per shard, merges running, merged bytes, per poll
+        self.polls = [([10, 8], 2, 1000), ([4, 3], 2, 1000 + (1<<20)), ([1, 1], 0, 1000 + (3<<20))]
+        self.poll = -1
+
+    def _optimize_f(self, conn, index, nseg, wait_for_merge=True):
+        self.calls.append(('optimize', index, nseg, wait_for_merge))
+        return esbench.api.ApiResponse(200, 'ok', '{"ok": true}', '')
+
+    def _segments_f(self, conn, index):
+        self.poll = min(self.poll + 1, len(self.polls) - 1)
+        self.calls.append(('segments', index))
+        counts, _, _ = self.polls[self.poll]
+        return esbench.api.ApiResponse(200, 'ok', _segments_data(counts), '')
+
+    def _stats_f(self, conn, index, groups):
+        # called once before the optimize call, and then with each poll
+        _, current, merged = self.polls[max(0, self.poll)]
+        return esbench.api.ApiResponse(200, 'ok', _stats_data(current, merged), '')
+
+    def _optimize(self, **kwargs):
+        return esbench.optimize.optimize(
+            None, 'i1', 1,
+            optimize_f=self._optimize_f,
+            segments_f=self._segments_f,
+            stats_f=self._stats_f,
+            **kwargs
+        )
+
+
+    def test_segment_counts(self):
+
+        self.assertEqual((18, 10), esbench.optimize._segment_counts(json.loads(_segments_data([10, 8])), 'i1'))
+        self.assertEqual((0, 0), esbench.optimize._segment_counts(json.loads(_segments_data([])), 'i1'))
+
+
+    def test_optimize(self):
+
+        r = self._optimize(sleep_f=lambda t: None)
+        self.assertEqual(('optimize', 'i1', 1, False), self.calls[0])
+        self.assertTrue(r['reached'])
+        self.assertFalse(r['timed_out'])
+        self.assertIsNotNone(r['t_target_in_millis'])
+        self.assertEqual([18, 7, 2], r['timeline']['num_search_segments'])
+        self.assertEqual([10, 4, 1], r['timeline']['max_shard_segments'])
+        self.assertEqual([2, 2, 0], r['timeline']['merges_current'])
+        self.assertEqual([0, 1<<20, 3<<20], r['timeline']['merged_in_bytes'])
+        self.assertIsNone(r['timeline']['merge_mb_per_second'][0])
+        self.assertEqual(3<<20, r['merged_in_bytes'])
+
+
+    def test_timeout(self):
+
+        self.polls = [([10, 8], 2, 1000)]
+        r = self._optimize(interval=0.001, timeout=0.01)
+        self.assertFalse(r['reached'])
+        self.assertTrue(r['timed_out'])
+        self.assertIsNone(r['t_target_in_millis'])
+        self.assertTrue(len(r['timeline']['t']) > 1)
+
+        # stats which can't be read
+        self._segments_f = lambda conn, index: esbench.api.ApiResponse(500, 'error', 'not json', '')
+        r = self._optimize(sleep_f=lambda t: None)
+        self.assertFalse(r['reached'])
+        self.assertFalse(r['timed_out'])
+        self.assertEqual([], r['timeline']['t'])
+
+        # merges which never finish, no timeout given
+        self._segments_f = OptimizeTest._segments_f.__get__(self)
+        default_timeout = esbench.optimize.DEFAULT_TIMEOUT
+        esbench.optimize.DEFAULT_TIMEOUT = 0.01
+        try:
+            r = self._optimize(sleep_f=lambda t: None)
+        finally:
+            esbench.optimize.DEFAULT_TIMEOUT = default_timeout
+        self.assertTrue(r['timed_out'])
+
+        # failed optimize call
+        self._optimize_f = lambda conn, index, nseg, wait_for_merge: esbench.api.ApiResponse(500, 'error', '{}', '')
+        self.assertRaises(IOError, self._optimize)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.DEBUG)
+    unittest.main()
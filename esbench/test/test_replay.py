@@ -0,0 +1,144 @@
+# -*- coding: UTF-8 -*-
+# (c)2013 Mik Kocikowski, MIT License (http://opensource.org/licenses/MIT)
+# https://github.com/mkocikowski/esbench
+
+import os
+import gzip
+import json
+import time
+import tempfile
+import unittest
+import logging
+
+import esbench.api
+import esbench.bench
+import esbench.replay
+import esbench.test.test_api
+
+
+LOG = [
+    {"timestamp": 1389052862.0, "path": "/myindex/_search", "body": {"query": {"match": {"title": "foo"}}}},
+    {"timestamp": 1389052862.1, "path": "/myindex/doc/_search?routing=1", "body": {"query": {"match_all": {}}}},
+    {"timestamp": "2014-01-07 00:01:02,200", "path": "/myindex/_search", "source": "{\"query\": {\"match\": {\"title\": \"bar\"}}}"},
+    {"timestamp": 1389052862300, "path": "/myindex/_search", "body": {"query": {"term": {"tag": "baz"}}}},
+]
+
+
+class ReplayTest(unittest.TestCase):
+
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp(suffix='.json')
+        with os.fdopen(fd, 'w') as f:
+            for entry in LOG:
+                f.write(json.dumps(entry) + "\n")
+            f.write("\n")
+            f.write("not json\n")
+            f.write('{"path": "/myindex/_search", "body": {}}\n')
+
+    def tearDown(self):
+        os.remove(self.path)
+
+
+    def test_parse_timestamp(self):
+        self.assertEqual(1389052862.5, esbench.replay.parse_timestamp(1389052862.5))
+        self.assertEqual(1389052862.5, esbench.replay.parse_timestamp(1389052862500))
+        self.assertEqual(1389052862.0, esbench.replay.parse_timestamp("2014-01-07T00:01:02Z"))
+        self.assertAlmostEqual(1389052862.123, esbench.replay.parse_timestamp("2014-01-07 00:01:02,123"))
+        self.assertRaises(ValueError, esbench.replay.parse_timestamp, "yesterday")
+
+
+    def test_parse_speed(self):
+        self.assertEqual(1.0, esbench.replay.parse_speed(None))
+        self.assertEqual(0.0, esbench.replay.parse_speed('max'))
+        self.assertEqual(2.5, esbench.replay.parse_speed('2.5'))
+        self.assertRaises(ValueError, esbench.replay.parse_speed, '-1')
+        self.assertRaises(ValueError, esbench.replay.parse_speed, 'fast')
+
+
+    def test_log(self):
+        log = esbench.replay.Log(self.path)
+        entries = list(log)
+        self.assertEqual(4, log.entries)
+        self.assertEqual(2, log.invalid)
+        self.assertEqual({'query': {'match': {'title': 'bar'}}}, entries[2]['body'])
+        self.assertEqual([0.0, 0.1, 0.2, 0.3], [round(e['t'] - entries[0]['t'], 3) for e in entries])
+        # read from the file again each time
+        self.assertEqual(4, len(list(log)))
+
+        gz = self.path + '.gz'
+        with open(self.path) as f, gzip.open(gz, 'wb') as g:
+            g.write(f.read())
+        try:
+            self.assertEqual(entries, list(esbench.replay.Log(gz)))
+        finally:
+            os.remove(gz)
+
+
+    def test_classifier(self):
+        queries = [
+            esbench.bench.SearchQuery('title', {'esbench': {'replay_match': '"title"'}, 'query': {}}, 'obs1', 'i', 'd'),
+            esbench.bench.SearchQuery('routed', {'esbench': {'replay_match': ['routing=', 'preference=']}, 'query': {}}, 'obs1', 'i', 'd'),
+            esbench.bench.SearchQuery('plain', {'query': {}}, 'obs1', 'i', 'd'),
+        ]
+        classifier = esbench.replay.Classifier(queries, default='other')
+        entries = list(esbench.replay.Log(self.path))
+        self.assertEqual(['title', 'routed', 'title'], [classifier.classify(e).name for e in entries[:3]])
+        self.assertEqual('other', classifier.classify(entries[3]))
+
+
+    def test_request(self):
+        query = esbench.bench.SearchQuery('q1', {'query': {}}, 'obs1', 'esbench_test', 'doc')
+        conn = esbench.api.Conn(conn_cls=esbench.test.test_api.MockHTTPConnection)
+        entries = list(esbench.replay.Log(self.path))
+        esbench.replay.ReplayRequest(query, entries[1]).execute(conn)
+        method, url, body = conn.conn.requests[-1]
+        self.assertEqual('/esbench_test/doc/_search?routing=1', url)
+        self.assertEqual({'query': {'match_all': {}}, 'stats': ['obs1_q1']}, json.loads(body))
+        self.assertEqual(1, query.execution_count)
+
+
+    def test_observation(self):
+        queries = {
+            'title': {'esbench': {'replay_match': '"title"'}, 'query': {'match': {'title': 'V%(variable)s'}}},
+            'tag': {'esbench': {'replay_match': '"tag"'}, 'query': {'term': {'tag': 'V%(variable)s'}}},
+        }
+
+        # original timing, 10x faster
+        conn = esbench.api.Conn(conn_cls=esbench.test.test_api.MockHTTPConnection)
+        replay = esbench.replay.Replay(self.path, speed=10.0)
+        observation = esbench.bench.Observation(conn=conn, benchmark_id='bench1', queries=queries, reps=100, warmup=5, replay=replay)
+        self.assertEqual({}, observation.warmup_queries)
+        t1 = time.time()
+        observation.run()
+        self.assertTrue(time.time() - t1 >= 0.03)
+        self.assertEqual(4, len(conn.conn.requests))
+        counts = {q.name: q.execution_count for q in observation.queries}
+        self.assertEqual({'title': 2, 'tag': 1, esbench.replay.DEFAULT_GROUP: 1}, counts)
+        self.assertEqual(4, sum([q.send_lag.count for q in observation.queries]))
+        self.assertEqual(4, observation.replay_stats['requests'])
+        self.assertEqual(2, observation.replay_stats['invalid'])
+
+        # as fast as possible, at most 3 requests
+        conn = esbench.api.Conn(conn_cls=esbench.test.test_api.MockHTTPConnection)
+        replay = esbench.replay.Replay(self.path, speed=0.0)
+        observation = esbench.bench.Observation(conn=conn, benchmark_id='bench1', queries=queries, max_reps=3, replay=replay)
+        observation.run()
+        self.assertEqual(3, sum([q.execution_count for q in observation.queries]))
+        self.assertEqual(0, sum([q.send_lag.count for q in observation.queries]))
+        self.assertEqual('max', observation.replay_stats['speed'])
+
+        # groups with no requests have no ES stats
+        def _f(conn, index, groups):
+            data = {'indices': {'esbench_test': {'primaries': {'search': {'groups': {
+                '%s_title' % observation.observation_id: {'query_time_in_millis': 10, 'fetch_time_in_millis': 2},
+                '%s_%s' % (observation.observation_id, esbench.replay.DEFAULT_GROUP): {'query_time_in_millis': 10, 'fetch_time_in_millis': 2},
+            }}}}}}
+            return esbench.api.ApiResponse(200, 'ok', json.dumps(data), '')
+        stats = observation._stats(stats_f=_f)
+        self.assertEqual(0, stats['search']['groups']['tag']['client_total'])
+        self.assertIsNone(stats['search']['groups']['tag']['query_time_in_millis_per_query'])
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.DEBUG)
+    unittest.main()
@@ -0,0 +1,104 @@
+# -*- coding: UTF-8 -*-
+# (c)2013 Mik Kocikowski, MIT License (http://opensource.org/licenses/MIT)
+# https://github.com/mkocikowski/esbench
+
+import unittest
+import logging
+import json
+import time
+
+import esbench.api
+import esbench.sampler
+import esbench.test.test_api
+
+
+NODE_STATS = {
+    "cluster_name": "elasticsearch",
+    "nodes": {
+        "n1": {
+            "jvm": {
+                "mem": {"heap_used_in_bytes": 1000, "heap_used_percent": 10},
+                "gc": {"collectors": {
+                    "young": {"collection_count": 5, "collection_time_in_millis": 50},
+                    "old": {"collection_count": 1, "collection_time_in_millis": 100},
+                }},
+            },
+            "thread_pool": {"search": {"queue": 3, "rejected": 1}, "index": {"queue": 0, "rejected": 0}},
+            "indices": {"merges": {"current": 1, "total_time_in_millis": 500}, "fielddata": {"memory_size_in_bytes": 10, "evictions": 0}},
+            "os": {"cpu": {"usage": 40}, "load_average": [1.5, 1.0, 0.5]},
+            "process": {"cpu": {"percent": 80}},
+        },
+        "n2": {
+            "jvm": {
+                "mem": {"heap_used_in_bytes": 2000, "heap_used_percent": 20},
+                "gc": {"collectors": {
+                    "young": {"collection_count": 7, "collection_time_in_millis": 70},
+                }},
+            },
+            "thread_pool": {"search": {"queue": 2, "rejected": 0}},
+            "indices": {"merges": {"current": 0, "total_time_in_millis": 250}},
+            "os": {"cpu_percent": 60, "load_average": 2.5},
+            "process": {"cpu": {"percent": 20}},
+        },
+    },
+}
+
+
+class SamplerTest(unittest.TestCase):
+
+    def test_values(self):
+        self.assertEqual([1000], esbench.sampler._values(NODE_STATS['nodes']['n1'], 'jvm.mem.heap_used_in_bytes'))
+        self.assertEqual([1, 5], sorted(esbench.sampler._values(NODE_STATS['nodes']['n1'], 'jvm.gc.collectors.*.collection_count')))
+        self.assertEqual([1.5], esbench.sampler._values(NODE_STATS['nodes']['n1'], 'os.load_average'))
+        self.assertEqual([], esbench.sampler._values(NODE_STATS['nodes']['n1'], 'jvm.foo'))
+
+    def test_extract(self):
+        sample = esbench.sampler.extract(NODE_STATS)
+        self.assertEqual(set([m[0] for m in esbench.sampler.METRICS]), set(sample.keys()))
+        self.assertEqual(3000, sample['heap_used_in_bytes'])
+        self.assertEqual(20, sample['heap_used_percent'])
+        self.assertEqual(13, sample['gc_collection_count'])
+        self.assertEqual(220, sample['gc_collection_time_in_millis'])
+        self.assertEqual(5, sample['search_queue'])
+        self.assertEqual(1, sample['search_rejected'])
+        self.assertEqual(0, sample['index_queue'])
+        self.assertIsNone(sample['bulk_queue'])
+        self.assertEqual(750, sample['merges_total_time_in_millis'])
+        self.assertEqual(10, sample['fielddata_memory_size_in_bytes'])
+        # different versions report cpu differently
+        self.assertEqual(60, sample['os_cpu_percent'])
+        self.assertEqual(2.5, sample['os_load_average'])
+        self.assertEqual(80, sample['process_cpu_percent'])
+
+    def test_sampler(self):
+
+        def _f(conn):
+            return esbench.api.ApiResponse(200, 'ok', json.dumps(NODE_STATS), '')
+
+        conn = esbench.api.Conn(conn_cls=esbench.test.test_api.MockHTTPConnection)
+        sampler = esbench.sampler.ClusterSampler(conn=conn, interval=0.01, cluster_f=_f)
+        sampler.phase = 'load'
+        sampler.start()
+        time.sleep(0.05)
+        sampler.phase = 'observe'
+        time.sleep(0.05)
+        series = sampler.finish()
+        self.assertFalse(sampler.is_alive())
+        n = len(series['t'])
+        self.assertTrue(n >= 4)
+        self.assertEqual(sorted(series['t']), series['t'])
+        self.assertEqual(['load', 'observe'], sorted(set(series['phase'])))
+        self.assertEqual([3000] * n, series['heap_used_in_bytes'])
+        json.dumps(series)
+
+        # failed samples are skipped
+        sampler = esbench.sampler.ClusterSampler(conn=conn, interval=0.01)
+        sampler.start()
+        time.sleep(0.02)
+        self.assertEqual([], sampler.finish()['t'])
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.DEBUG)
+    unittest.main()
+
@@ -0,0 +1,148 @@
+# -*- coding: UTF-8 -*-
+# (c)2013 Mik Kocikowski, MIT License (http://opensource.org/licenses/MIT)
+# https://github.com/mkocikowski/esbench
+
+import unittest
+import logging
+import json
+import os.path
+import shutil
+import tempfile
+import StringIO
+
+import esbench
+import esbench.api
+import esbench.analyze
+import esbench.sink
+import esbench.test.test_api
+
+
+def _bench(benchmark_id, start):
+    return {'meta': {'benchmark_id': benchmark_id, 'benchmark_start': start}}
+
+def _obs(benchmark_id, observation_id, start, seq):
+    return {
+        'meta': {'benchmark_id': benchmark_id, 'observation_id': observation_id, 'observation_start': start, 'observation_sequence_no': seq},
+        'stats': {'search': {'groups': {}}},
+    }
+
+
+class LocalSinkTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def _test_sink(self, sink):
+        self.assertEqual([], sink.benchmarks())
+        sink.prepare()
+        self.assertEqual([], sink.benchmarks())
+        sink.write('bench', 'b2', _bench('b2', '2014-01-02T00:00:00Z'))
+        sink.write_many([
+            ('obs', 'o2', _obs('b1', 'o2', '2014-01-01T00:00:02Z', 2)),
+            ('obs', 'o1', _obs('b1', 'o1', '2014-01-01T00:00:01Z', 1)),
+            ('obs', 'o3', _obs('b2', 'o3', '2014-01-02T00:00:01Z', 1)),
+            ('bench', 'b1', _bench('b1', '2014-01-01T00:00:00Z')),
+        ])
+        # rewritten record replaces the old one
+        sink.write('bench', 'b1', dict(_bench('b1', '2014-01-01T00:00:00Z'), foo='bar'))
+        benchmarks = sink.benchmarks()
+        self.assertEqual(['b1', 'b2'], [b['_id'] for b in benchmarks])
+        self.assertEqual('bar', benchmarks[0]['_source']['foo'])
+        self.assertEqual(['o1', 'o2'], [o['_id'] for o in sink.observations('b1')])
+        self.assertEqual(['o3'], [o['_id'] for o in sink.observations('b2')])
+        self.assertEqual([], sink.observations('foo'))
+        self.assertEqual(['o2'], [o['_id'] for o in sink.observations('b1', since='2014-01-01T00:00:02Z')])
+        observations = sink.observations_many(['b1', 'b2', 'foo'])
+        self.assertEqual({'b1': ['o1', 'o2'], 'b2': ['o3'], 'foo': []}, {k: [o['_id'] for o in v] for k, v in observations.items()})
+
+        data = list(esbench.analyze.get_data(benchmark_ids=['last'], sink=sink))
+        self.assertEqual(1, len(data))
+        self.assertEqual('b2', data[0]['benchmark']['meta']['benchmark_id'])
+        self.assertEqual('o3', data[0]['observation']['meta']['observation_id'])
+
+    def test_jsonl(self):
+        path = os.path.join(self.tmpdir, 'stats.jsonl')
+        self._test_sink(esbench.sink.JsonlSink(path))
+        with open(path) as f:
+            self.assertEqual(6, len(f.readlines()))
+
+    def test_sqlite(self):
+        self._test_sink(esbench.sink.SqliteSink(os.path.join(self.tmpdir, 'stats.db')))
+
+    def test_async(self):
+        sink = esbench.sink.AsyncSink(esbench.sink.JsonlSink(os.path.join(self.tmpdir, 'stats.jsonl')))
+        self._test_sink(sink)
+        for i in range(100):
+            sink.write('obs', 'o%03i' % i, _obs('b3', 'o%03i' % i, '2014-01-03T00:00:00Z', i))
+        sink.close()
+        self.assertFalse(sink._thread.is_alive())
+        self.assertEqual(100, len(esbench.sink.JsonlSink(os.path.join(self.tmpdir, 'stats.jsonl')).observations('b3')))
+
+    def test_when_written(self):
+        path = os.path.join(self.tmpdir, 'stats.jsonl')
+        sink = esbench.sink.AsyncSink(esbench.sink.JsonlSink(path))
+        written = []
+        for i in range(3):
+            sink.write('obs', 'o%i' % i, _obs('b1', 'o%i' % i, '2014-01-01T00:00:0%iZ' % i, i))
+            # called in the writer thread, once the records before are stored
+            sink.when_written(lambda: written.append(len(esbench.sink.JsonlSink(path).observations('b1'))))
+        sink.close()
+        self.assertEqual([1, 2, 3], written)
+
+        # without an async sink, called right away
+        sink = esbench.sink.JsonlSink(path)
+        sink.when_written(lambda: written.append(True))
+        self.assertEqual(True, written[-1])
+
+    def test_async_errors(self):
+        # write errors are logged, writer thread keeps going
+        sink = esbench.sink.AsyncSink(esbench.sink.JsonlSink(os.path.join(self.tmpdir, 'nonexistent', 'stats.jsonl')))
+        sink.write('bench', 'b1', _bench('b1', '2014-01-01T00:00:00Z'))
+        sink.flush()
+        self.assertTrue(sink._thread.is_alive())
+        # once a record is lost, nothing depending on records being stored
+        # is done
+        called = []
+        sink.when_written(lambda: called.append(True))
+        sink.close()
+        self.assertEqual([], called)
+
+
+class EsSinkTest(unittest.TestCase):
+
+    def test_es(self):
+        conn = esbench.api.Conn(conn_cls=esbench.test.test_api.MockHTTPConnection)
+        sink = esbench.sink.EsSink(conn)
+        sink.prepare()
+        resp = sink.write('obs', 'o1', _obs('b1', 'o1', '2014-01-01T00:00:01Z', 1))
+        self.assertEqual(('PUT', '/%s/obs/o1' % esbench.STATS_INDEX_NAME), conn.conn.requests[-1][:2])
+        self.assertEqual('o1', json.loads(resp.data)['meta']['observation_id'])
+        # mock echoes requests, no hits
+        self.assertEqual([], list(sink.benchmarks()))
+        self.assertEqual([], list(sink.observations('b1')))
+        list(sink.observations('b1', since='2014-01-01T00:00:01Z'))
+        body = json.loads([r for r in conn.conn.requests if r[0] in ('GET', 'POST')][-1][2])
+        self.assertEqual({'gte': '2014-01-01T00:00:01Z'}, body['query']['filtered']['filter']['range']['meta.observation_start'])
+        self.assertEqual("http://localhost:9200/esbench_stats", str(sink))
+
+    def test_from_spec(self):
+        conn = esbench.api.Conn()
+        sink = esbench.sink.from_spec(None, conn)
+        self.assertIs(conn, sink.conn)
+        sink = esbench.sink.from_spec('es:stats.local')
+        self.assertEqual(('stats.local', 9200), (sink.conn.host, sink.conn.port))
+        sink = esbench.sink.from_spec('es:stats.local:9201')
+        self.assertEqual(9201, sink.conn.port)
+        self.assertEqual('/tmp/foo.jsonl', esbench.sink.from_spec('jsonl:/tmp/foo.jsonl').path)
+        self.assertIsInstance(esbench.sink.from_spec('sqlite:/tmp/foo.db'), esbench.sink.SqliteSink)
+        self.assertRaises(ValueError, esbench.sink.from_spec, 'foo:bar')
+        self.assertRaises(ValueError, esbench.sink.from_spec, 'jsonl')
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.DEBUG)
+    unittest.main()
+
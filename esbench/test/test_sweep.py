@@ -0,0 +1,144 @@
+# -*- coding: UTF-8 -*-
+# (c)2013 Mik Kocikowski, MIT License (http://opensource.org/licenses/MIT)
+# https://github.com/mkocikowski/esbench
+
+import unittest
+import logging
+import json
+
+import esbench
+import esbench.api
+import esbench.bench
+import esbench.client
+import esbench.sweep
+import esbench.test.test_api
+
+
+class MockScanHTTPConnection(esbench.test.test_api.MockHTTPConnection):
+    """No _reindex api; scan / scroll over 3 documents, in pages of 2."""
+
+    def getresponse(self):
+        method, url, body = self.req
+        data = '{}'
+        status = 200
+        if url.startswith('/_reindex'):
+            status = 400
+        elif 'search_type=scan' in url:
+            data = '{"_scroll_id": "0", "hits": {"total": 3, "hits": []}}'
+        elif url.startswith('/_search/scroll?'):
+            start = int(body)
+            hits = [{"_id": str(i), "_type": "doc", "_source": {"n": i}} for i in range(start, min(start + 2, 3))]
+            data = json.dumps({"_scroll_id": str(start + 2), "hits": {"total": 3, "hits": hits}})
+        resp = esbench.test.test_api.MockHTTPResponse((method, url, data))
+        resp.status = status
+        self.responses.append(resp)
+        return resp
+
+
+class MockFailedBulkHTTPConnection(MockScanHTTPConnection):
+    """Bulk requests fail, with no response body."""
+
+    def getresponse(self):
+        method, url, body = self.req
+        if url == '/_bulk':
+            resp = esbench.test.test_api.MockHTTPResponse((method, url, None))
+            resp.status = 500
+            return resp
+        return MockScanHTTPConnection.getresponse(self)
+
+
+class MockBenchmark(esbench.bench.Benchmark):
+
+    def observe(self, **kwargs):
+        self.observed = getattr(self, 'observed', 0) + 1
+
+    def record(self):
+        self.recorded = True
+
+
+class SweepTest(unittest.TestCase):
+
+    def setUp(self):
+        self.matrix = {
+            "index.settings.index.number_of_shards": [1, 2],
+            "index.settings.index.refresh_interval": ["1s", "30s"],
+            "config.segments": [1, None, 5],
+        }
+        self.conn = esbench.api.Conn(conn_cls=esbench.test.test_api.MockHTTPConnection)
+        argv = esbench.client.args_parser().parse_args("sweep --matrix foo.json --observations 2".split())
+        self.config = esbench.client.merge_config(argv, esbench.client.load_config(argv.config_file_path))
+
+    def test_kind(self):
+        self.assertEqual('static', esbench.sweep.kind('index.settings.index.number_of_shards'))
+        self.assertEqual('static', esbench.sweep.kind('index.mappings.doc.properties.abstract.type'))
+        self.assertEqual('dynamic', esbench.sweep.kind('index.settings.index.refresh_interval'))
+        self.assertEqual('dynamic', esbench.sweep.kind('index.settings.index.merge.policy.segments_per_tier'))
+        self.assertEqual('run', esbench.sweep.kind('config.segments'))
+        self.assertEqual('run', esbench.sweep.kind('queries.match.esbench.weight'))
+        self.assertRaises(ValueError, esbench.sweep.kind, 'foo.bar')
+
+    def test_set_path(self):
+        d = {'a': {'b': 1}}
+        esbench.sweep.set_path(d, 'a.c.d', 2)
+        esbench.sweep.set_path(d, 'a.b', 3)
+        self.assertEqual({'a': {'b': 3, 'c': {'d': 2}}}, d)
+
+    def test_cells(self):
+        cells = esbench.sweep.cells(self.matrix)
+        self.assertEqual(12, len(cells))
+        self.assertEqual(range(1, 13), sorted([n for n, _ in cells]))
+        # grouped by shards, no optimize first, then decreasing segments
+        self.assertEqual([1] * 6 + [2] * 6, [c["index.settings.index.number_of_shards"] for _, c in cells])
+        self.assertEqual([None, None, 5, 5, 1, 1] * 2, [c["config.segments"] for _, c in cells])
+        self.assertRaises(ValueError, esbench.sweep.cells, {'foo': [1]})
+
+    def test_run(self):
+        copies = []
+
+        def _copy(conn, source, dest):
+            copies.append((source, dest))
+
+        sweep = esbench.sweep.Sweep(config=self.config, conn=self.conn, matrix=self.matrix, bench_cls=MockBenchmark, copy_f=_copy)
+        sweep.run(iter(["line_%i" % i for i in range(10)]))
+
+        # data loaded once, copied to the source index, and from it
+        posts = [r for r in self.conn.conn.requests if r[:2] == ('POST', '/esbench_test/doc')]
+        self.assertEqual(10, len(posts))
+        self.assertEqual([(esbench.TEST_INDEX_NAME, esbench.sweep.SWEEP_SOURCE_INDEX_NAME), (esbench.sweep.SWEEP_SOURCE_INDEX_NAME, esbench.TEST_INDEX_NAME)], copies)
+        self.assertEqual(('DELETE', '/%s' % esbench.sweep.SWEEP_SOURCE_INDEX_NAME, None), self.conn.conn.requests[-1])
+        creates = [json.loads(r[2]) for r in self.conn.conn.requests if r[:2] == ('PUT', '/esbench_test')]
+        self.assertEqual([1, 2], [c['settings']['index']['number_of_shards'] for c in creates])
+        settings = [json.loads(r[2]) for r in self.conn.conn.requests if r[:2] == ('PUT', '/esbench_test/_settings')]
+        self.assertEqual(12, len(settings))
+
+        self.assertEqual(12, len(sweep.benchmarks))
+        for b in sweep.benchmarks:
+            self.assertEqual(2, b.observed)
+            self.assertTrue(b.recorded)
+            self.assertEqual(sweep.sweep_id, b.sweep['sweep_id'])
+            self.assertEqual(b.sweep['cell']['config.segments'], b.config['config']['segments'])
+            self.assertEqual(b.sweep['cell']['index.settings.index.number_of_shards'], b.config['index']['settings']['index']['number_of_shards'])
+        # base config not changed
+        self.assertEqual(None, self.config['config']['segments'])
+
+    def test_copy_index(self):
+        conn = esbench.api.Conn(conn_cls=esbench.test.test_api.MockHTTPConnection)
+        self.assertIsNone(esbench.sweep.copy_index(conn, 'i1', 'i2'))
+        self.assertEqual(1, len(conn.conn.requests))
+
+        conn = esbench.api.Conn(conn_cls=MockScanHTTPConnection)
+        self.assertEqual(3, esbench.sweep.copy_index(conn, 'i1', 'i2'))
+        bulks = [r[2] for r in conn.conn.requests if r[1] == '/_bulk']
+        self.assertEqual(2, len(bulks))
+        self.assertEqual({"index": {"_index": "i2", "_type": "doc", "_id": "0"}}, json.loads(bulks[0].splitlines()[0]))
+        self.assertEqual(('POST', '/i2/_refresh', None), conn.conn.requests[-1])
+
+        # failed bulk requests are logged, not raised
+        conn = esbench.api.Conn(conn_cls=MockFailedBulkHTTPConnection)
+        self.assertEqual(3, esbench.sweep.copy_index(conn, 'i1', 'i2'))
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.DEBUG)
+    unittest.main()
+
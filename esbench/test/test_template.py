@@ -0,0 +1,118 @@
+# -*- coding: UTF-8 -*-
+# (c)2013 Mik Kocikowski, MIT License (http://opensource.org/licenses/MIT)
+# https://github.com/mkocikowski/esbench
+
+import unittest
+import logging
+import json
+import random
+import tempfile
+
+import esbench.template
+
+
+class SourceTest(unittest.TestCase):
+
+    def test_string(self):
+        l = esbench.template.source({'type': 'string', 'length': 4})(100)
+        self.assertEqual(100, len(l))
+        self.assertEqual(set([4]), set([len(s) for s in l]))
+        self.assertTrue(len(set(l)) > 90)
+
+    def test_terms(self):
+        l = esbench.template.source({'type': 'terms', 'values': ['foo', 'bar']})(100)
+        self.assertEqual(set(['foo', 'bar']), set(l))
+        with tempfile.NamedTemporaryFile() as f:
+            f.write("foo\nbar\n\nbaz\n")
+            f.flush()
+            l = esbench.template.source({'type': 'terms', 'path': f.name})(100)
+        self.assertEqual(set(['foo', 'bar', 'baz']), set(l))
+        self.assertRaises(ValueError, esbench.template.source, {'type': 'terms', 'values': []})
+
+    def test_range(self):
+        l = esbench.template.source({'type': 'range', 'min': 1, 'max': 3})(100)
+        self.assertEqual(set([1, 2, 3]), set(l))
+        l = esbench.template.source({'type': 'range', 'min': 0, 'max': 1.0})(100)
+        self.assertTrue(all([type(v) is float and 0 <= v <= 1 for v in l]))
+
+    def test_date(self):
+        l = esbench.template.source({'type': 'date', 'min': '2012-12-30', 'max': '2013-01-01'})(100)
+        self.assertEqual(set(['2012-12-30', '2012-12-31', '2013-01-01']), set(l))
+        l = esbench.template.source({'type': 'date', 'min': '2012-12-30', 'max': '2012-12-30', 'format': '%Y/%m'})(1)
+        self.assertEqual(['2012/12'], l)
+
+    def test_list(self):
+        l = esbench.template.source({'type': 'list', 'values': ['a', 'b', 'c'], 'size': 2})(100)
+        self.assertTrue(all([len(set(v)) == 2 and set(v) <= set('abc') for v in l]))
+
+    def test_invalid(self):
+        self.assertRaises(ValueError, esbench.template.source, {'type': 'foo'})
+        self.assertRaises(ValueError, esbench.template.source, {})
+
+    def test_seeded(self):
+        spec = {'type': 'string'}
+        a = esbench.template.source(spec, rng=random.Random(1))(10)
+        b = esbench.template.source(spec, rng=random.Random(1))(10)
+        self.assertEqual(a, b)
+
+
+class TemplateTest(unittest.TestCase):
+
+    def test_compile(self):
+        parts, slots = esbench.template.compile_template('{"a": "x %(foo)s y", "b": "%(bar)s", "c": "100%%"}')
+        self.assertEqual(['{"a": "x ', '', ' y", "b": ', '', ', "c": "100%"}'], parts)
+        self.assertEqual([(1, 'foo', False), (3, 'bar', True)], slots)
+        parts, slots = esbench.template.compile_template('{"a": 1}')
+        self.assertEqual(['{"a": 1}'], parts)
+        self.assertEqual([], slots)
+
+    def test_render(self):
+        query = {
+            "query": {"match": {"description": "computing V%(variable)s device %(tag)s"}},
+            "filter": {"range": {"year": {"gte": "%(year)s"}}, "terms": {"tags": "%(tags)s"}},
+            "size": "%(year)s",
+        }
+        params = {
+            'year': {'type': 'range', 'min': 2005, 'max': 2012},
+            'tag': {'type': 'terms', 'values': ['a"b']},
+            'tags': {'type': 'list', 'values': ['x', 'y'], 'size': 2},
+        }
+        t = esbench.template.Template(json.dumps(query), params=params, block_size=8)
+        rendered = [json.loads(t.render()) for _ in range(20)]
+        for r in rendered:
+            self.assertTrue(r['query']['match']['description'].startswith('computing V'))
+            self.assertTrue(r['query']['match']['description'].endswith(' device a"b'))
+            self.assertTrue(2005 <= r['filter']['range']['year']['gte'] <= 2012)
+            # same slot, same value
+            self.assertEqual(r['size'], r['filter']['range']['year']['gte'])
+            self.assertEqual(set(['x', 'y']), set(r['filter']['terms']['tags']))
+        self.assertTrue(len(set([r['query']['match']['description'] for r in rendered])) > 15)
+
+        # compatible with old style templates
+        t = esbench.template.Template('{"a": "V%(variable)s", "b": "%%"}')
+        r = json.loads(t.render())
+        self.assertEqual(7, len(r['a']))
+        self.assertEqual('%', r['b'])
+
+        self.assertRaises(ValueError, esbench.template.Template, '{"a": "%(foo)s"}')
+        t = esbench.template.Template('{"a": 1}')
+        self.assertEqual('{"a": 1}', t.render())
+
+
+    def test_render_ahead(self):
+        t = esbench.template.Template('{"a": "%(year)s"}', params={'year': {'type': 'range', 'min': 1, 'max': 9}}, rng=random.Random(1), block_size=8)
+        t.prepare(20)
+        self.assertEqual(24, len(t._rendered))
+        rendered = [t.render() for _ in range(20)]
+        # nothing more is rendered until the rendered queries run out
+        self.assertEqual(4, len(t._rendered))
+        rendered += [t.render() for _ in range(80)]
+        # blocks are rendered in order, ahead of time or as they run out
+        u = esbench.template.Template('{"a": "%(year)s"}', params={'year': {'type': 'range', 'min': 1, 'max': 9}}, rng=random.Random(1), block_size=100)
+        u.prepare(100)
+        self.assertEqual(rendered, [u.render() for _ in range(100)])
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.DEBUG)
+    unittest.main()